@@ -6,7 +6,13 @@ hmmlearn
 Hiden Markov Models.
 """
 
+import os as _os
+
 try:
+    # Importing setuptools_scm is slow, only do so in a source checkout.
+    if not _os.path.exists(_os.path.join(
+            _os.path.dirname(__file__), "..", "..", ".git")):
+        raise ImportError
     import setuptools_scm
     __version__ = setuptools_scm.get_version(  # xref setup.py
         root="../..", relative_to=__file__,
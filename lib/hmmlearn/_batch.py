@@ -0,0 +1,102 @@
+"""
+Vectorized forward, backward and Viterbi passes over padded batches.
+
+A batch holds ``n_sequences`` sequences sorted by decreasing length and
+padded to the length of the first one, so that the sequences still active
+at time ``t`` are the first ``n_active(lengths, t)`` rows. Padded frames
+are never read; their content in the returned lattices is unspecified.
+"""
+
+import numpy as np
+from scipy.special import logsumexp
+
+
+def _n_active(lengths, t):
+    # Number of sequences with more than ``t`` samples.
+    return np.searchsorted(-lengths, -t, side="left")
+
+
+def _row_max(a):
+    # Maximum of each row, with non-finite maxima replaced by zero, so that
+    # ``a - _row_max(a)`` is safe to exponentiate.
+    a_max = a.max(axis=-1, keepdims=True)
+    a_max[~np.isfinite(a_max)] = 0
+    return a_max
+
+
+def _forward(log_startprob, transmat, framelogprob, lengths):
+    n_sequences, n_samples, n_components = framelogprob.shape
+    fwdlattice = np.zeros_like(framelogprob)
+    fwdlattice[:, 0] = log_startprob + framelogprob[:, 0]
+    with np.errstate(divide="ignore", under="ignore"):
+        for t in range(1, n_samples):
+            n = _n_active(lengths, t)
+            prev = fwdlattice[:n, t - 1]
+            prev_max = _row_max(prev)
+            fwdlattice[:n, t] = (np.log(np.exp(prev - prev_max) @ transmat)
+                                 + prev_max + framelogprob[:n, t])
+    last = fwdlattice[np.arange(n_sequences), lengths - 1]
+    with np.errstate(under="ignore"):
+        logprob = logsumexp(last, axis=1)
+    return logprob, fwdlattice
+
+
+def _backward(transmat, framelogprob, lengths):
+    n_sequences, n_samples, n_components = framelogprob.shape
+    bwdlattice = np.zeros_like(framelogprob)
+    with np.errstate(divide="ignore", under="ignore"):
+        for t in range(n_samples - 2, -1, -1):
+            n = _n_active(lengths, t + 1)
+            nxt = framelogprob[:n, t + 1] + bwdlattice[:n, t + 1]
+            nxt_max = _row_max(nxt)
+            bwdlattice[:n, t] = (np.log(np.exp(nxt - nxt_max) @ transmat.T)
+                                 + nxt_max)
+    return bwdlattice
+
+
+def _compute_posteriors(fwdlattice, bwdlattice):
+    log_gamma = fwdlattice + bwdlattice
+    with np.errstate(under="ignore"):
+        log_gamma -= logsumexp(log_gamma, axis=2, keepdims=True)
+        return np.exp(log_gamma)
+
+
+def _compute_xi_sum(transmat, logprob, framelogprob, fwdlattice, bwdlattice,
+                    mask):
+    # Sums the expected transition counts over all sequences and time
+    # steps with a single product of the flattened valid frames.
+    transitions = mask[:, 1:]
+    alpha = fwdlattice[:, :-1][transitions]
+    beta = (framelogprob + bwdlattice)[:, 1:][transitions]
+    alpha_max = _row_max(alpha)
+    beta_max = _row_max(beta)
+    offset = (alpha_max + beta_max
+              - np.broadcast_to(logprob[:, None], transitions.shape)
+              [transitions][:, None])
+    with np.errstate(under="ignore"):
+        alpha = np.exp(alpha - alpha_max + offset)
+        beta = np.exp(beta - beta_max)
+        return transmat * (alpha.T @ beta)
+
+
+def _viterbi(log_startprob, log_transmat, framelogprob, lengths):
+    n_sequences, n_samples, n_components = framelogprob.shape
+    viterbi_lattice = np.zeros_like(framelogprob)
+    backpointers = np.zeros(framelogprob.shape, dtype=np.intp)
+    viterbi_lattice[:, 0] = log_startprob + framelogprob[:, 0]
+    for t in range(1, n_samples):
+        n = _n_active(lengths, t)
+        work_buffer = viterbi_lattice[:n, t - 1, :, None] + log_transmat
+        backpointers[:n, t] = work_buffer.argmax(axis=1)
+        viterbi_lattice[:n, t] = work_buffer.max(axis=1) + framelogprob[:n, t]
+
+    rows = np.arange(n_sequences)
+    state_sequences = np.zeros((n_sequences, n_samples), dtype=np.intp)
+    last = viterbi_lattice[rows, lengths - 1]
+    state_sequences[rows, lengths - 1] = last.argmax(axis=1)
+    logprob = last.max(axis=1)
+    for t in range(n_samples - 2, -1, -1):
+        n = _n_active(lengths, t + 1)
+        state_sequences[:n, t] = backpointers[
+            rows[:n], t + 1, state_sequences[:n, t + 1]]
+    return logprob, state_sequences
@@ -8,7 +8,7 @@ import numpy as np
 ctypedef double dtype_t
 
 
-cdef inline int _argmax(dtype_t[:] X) nogil:
+cdef inline int _argmax(const dtype_t[:] X) nogil:
     cdef dtype_t X_max = -INFINITY
     cdef int pos = 0
     cdef int i
@@ -19,11 +19,11 @@ cdef inline int _argmax(dtype_t[:] X) nogil:
     return pos
 
 
-cdef inline dtype_t _max(dtype_t[:] X) nogil:
+cdef inline dtype_t _max(const dtype_t[:] X) nogil:
     return X[_argmax(X)]
 
 
-cdef inline dtype_t _logsumexp(dtype_t[:] X) nogil:
+cdef inline dtype_t _logsumexp(const dtype_t[:] X) nogil:
     cdef dtype_t X_max = _max(X)
     if isinf(X_max):
         return -INFINITY
@@ -45,9 +45,9 @@ cdef inline dtype_t _logaddexp(dtype_t a, dtype_t b) nogil:
 
 
 def _forward(int n_samples, int n_components,
-             dtype_t[:] log_startprob,
-             dtype_t[:, :] log_transmat,
-             dtype_t[:, :] framelogprob,
+             const dtype_t[:] log_startprob,
+             const dtype_t[:, :] log_transmat,
+             const dtype_t[:, :] framelogprob,
              dtype_t[:, :] fwdlattice):
 
     cdef int t, i, j
@@ -65,10 +65,33 @@ def _forward(int n_samples, int n_components,
                 fwdlattice[t, j] = _logsumexp(work_buffer) + framelogprob[t, j]
 
 
+def _forward_update(int n_samples, int n_components,
+                    const dtype_t[:, :] log_transmat,
+                    const dtype_t[:, :] framelogprob,
+                    dtype_t[:] fwdrow):
+    # Advances the last row of the forward lattice by ``n_samples``
+    # frames in place, without materializing the lattice.
+
+    cdef int t, i, j
+    cdef dtype_t[::view.contiguous] work_buffer = np.zeros(n_components)
+    cdef dtype_t[::view.contiguous] next_fwdrow = np.zeros(n_components)
+
+    with nogil:
+        for t in range(n_samples):
+            for j in range(n_components):
+                for i in range(n_components):
+                    work_buffer[i] = fwdrow[i] + log_transmat[i, j]
+
+                next_fwdrow[j] = _logsumexp(work_buffer) + framelogprob[t, j]
+
+            for j in range(n_components):
+                fwdrow[j] = next_fwdrow[j]
+
+
 def _backward(int n_samples, int n_components,
-              dtype_t[:] log_startprob,
-              dtype_t[:, :] log_transmat,
-              dtype_t[:, :] framelogprob,
+              const dtype_t[:] log_startprob,
+              const dtype_t[:, :] log_transmat,
+              const dtype_t[:, :] framelogprob,
               dtype_t[:, :] bwdlattice):
 
     cdef int t, i, j
@@ -88,10 +111,10 @@ def _backward(int n_samples, int n_components,
 
 
 def _compute_log_xi_sum(int n_samples, int n_components,
-                        dtype_t[:, :] fwdlattice,
-                        dtype_t[:, :] log_transmat,
-                        dtype_t[:, :] bwdlattice,
-                        dtype_t[:, :] framelogprob,
+                        const dtype_t[:, :] fwdlattice,
+                        const dtype_t[:, :] log_transmat,
+                        const dtype_t[:, :] bwdlattice,
+                        const dtype_t[:, :] framelogprob,
                         dtype_t[:, :] log_xi_sum):
 
     cdef int t, i, j
@@ -116,9 +139,9 @@ def _compute_log_xi_sum(int n_samples, int n_components,
 
 
 def _viterbi(int n_samples, int n_components,
-             dtype_t[:] log_startprob,
-             dtype_t[:, :] log_transmat,
-             dtype_t[:, :] framelogprob):
+             const dtype_t[:] log_startprob,
+             const dtype_t[:, :] log_transmat,
+             const dtype_t[:, :] framelogprob):
 
     cdef int i, j, t, where_from
     cdef dtype_t logprob
@@ -59,3 +59,65 @@ def distribute_covar_matrix_to_match_covariance_type(
         raise ValueError("covariance_type must be one of " +
                          "'spherical', 'tied', 'diag', 'full'")
     return cv
+
+
+def _project_stochastic(a, min_prob=1e-10):
+    """Projects ``a`` onto the set of (row-)stochastic arrays.
+
+    Entries which are exactly zero are kept at zero, so that forbidden
+    states or transitions stay forbidden.
+    """
+    a = np.where(a == 0, 0., np.maximum(a, min_prob))
+    a_sum = a.sum(axis=-1, keepdims=True)
+    a_sum[a_sum == 0] = 1
+    return a / a_sum
+
+
+def _keep_unvisited(new, old, occupancy):
+    """Returns ``new`` with the parameters of the states of zero
+    ``occupancy``, e.g. on no Viterbi path, replaced by ``old``.
+
+    The M-step of such states divides zero by zero.
+    """
+    unvisited = ~(np.asarray(occupancy) > 0)
+    if not unvisited.any():
+        return new
+    new = np.array(new, dtype=float)
+    new[unvisited] = old[unvisited]
+    return new
+
+
+def _row_bounds(view, source):
+    """Returns the ``(start, end)`` rows of ``source`` which ``view`` is
+    a slice of, or ``None``.
+
+    ``source`` must be kept alive by the caller, so that its memory
+    cannot be reused by another array.
+    """
+    if (view.dtype != source.dtype or view.strides != source.strides
+            or view.shape[1:] != source.shape[1:] or not len(source)
+            or source.strides[0] <= 0):
+        return None
+    offset = (view.__array_interface__["data"][0]
+              - source.__array_interface__["data"][0])
+    start, remainder = divmod(offset, source.strides[0])
+    end = start + len(view)
+    if remainder or start < 0 or end > len(source):
+        return None
+    return start, end
+
+
+def _project_covars(covars, covariance_type, min_covar):
+    """Projects covariance parameters onto the positive-definite cone.
+
+    Full and tied covariances are symmetrized and their eigenvalues are
+    floored at ``min_covar``; any leading dimensions are broadcast over.
+    """
+    if covariance_type in ('full', 'tied'):
+        covars = (covars + np.swapaxes(covars, -1, -2)) / 2
+        eigvals, eigvecs = np.linalg.eigh(covars)
+        eigvals = np.maximum(eigvals, min_covar)
+        return np.matmul(eigvecs * eigvals[..., np.newaxis, :],
+                         np.swapaxes(eigvecs, -1, -2))
+    else:
+        return np.maximum(covars, min_covar)
@@ -1,22 +1,46 @@
 from __future__ import print_function
 
+import copy
+import hashlib
+import itertools
+import pickle
 import string
 import sys
-from collections import deque
+import time
+from collections import OrderedDict, deque
 
 import numpy as np
+from scipy import sparse
 from scipy.special import logsumexp
 from sklearn.base import BaseEstimator, _pprint
 from sklearn.utils import check_array, check_random_state
 from sklearn.utils.validation import check_is_fitted
 
-from . import _hmmc
-from .utils import normalize, log_normalize, iter_from_X_lengths, log_mask_zero
+from . import _batch, _hmmc, _utils
+from .utils import (normalize, log_normalize, iter_from_X_lengths,
+                    log_mask_zero, Sequences)
 
 
 #: Supported decoder algorithms.
 DECODER_ALGORITHMS = frozenset(("viterbi", "map"))
 
+#: Quantities which can be computed by :meth:`_BaseHMM.infer`.
+INFERENCE_OUTPUTS = frozenset(("logprob", "posteriors", "viterbi", "map"))
+
+#: Supported training algorithms.
+TRAINING_ALGORITHMS = frozenset(("baum-welch", "viterbi"))
+
+#: Supported EM acceleration methods.
+ACCELERATION_METHODS = frozenset(("squarem",))
+
+#: Maximum number of samples whose emission log probabilities are held
+#: in memory at once by :meth:`_BaseHMM.score`.
+SCORE_CHUNK_SIZE = 1024
+
+#: Number of EM iterations after which hopeless restarts are discarded
+#: when fitting with ``n_init > 1``.
+N_INIT_PROBE_ITER = 5
+
 
 class ConvergenceMonitor(object):
     """Monitors and reports convergence to :data:`sys.stderr`.
@@ -43,6 +67,9 @@ class ConvergenceMonitor(object):
         iterations. If the values are not strictly increasing, the
         model did not converge.
 
+    full_history : list
+        The log probability of the data for all training iterations.
+
     iter : int
         Number of iterations performed while training the model.
 
@@ -74,6 +101,7 @@ class ConvergenceMonitor(object):
         self.n_iter = n_iter
         self.verbose = verbose
         self.history = deque(maxlen=2)
+        self.full_history = []
         self.iter = 0
 
     def __repr__(self):
@@ -86,6 +114,7 @@ class ConvergenceMonitor(object):
         """Reset the monitor's state."""
         self.iter = 0
         self.history.clear()
+        del self.full_history[:]
 
     def report(self, logprob):
         """Reports convergence to :data:`sys.stderr`.
@@ -108,6 +137,7 @@ class ConvergenceMonitor(object):
             print(message, file=sys.stderr)
 
         self.history.append(logprob)
+        self.full_history.append(logprob)
         self.iter += 1
 
     def report_decreasing_logprob(self, logprob):
@@ -133,6 +163,7 @@ class ConvergenceMonitor(object):
             print(message, file=sys.stderr)
 
         self.history.append(logprob)
+        self.full_history.append(logprob)
         self.iter += 1
 
     @property
@@ -144,6 +175,117 @@ class ConvergenceMonitor(object):
                  self.history[1] - self.history[0] < self.tol))
 
 
+class SufficientStatistics(dict):
+    """Sufficient statistics accumulated by the E-step of EM algorithm.
+
+    A dictionary mapping the name of each statistic to its value, e.g.
+    an array, a sparse matrix or a count. All statistics are sums over
+    the samples or the sequences, so that the statistics of disjoint
+    chunks of data can be accumulated separately, e.g. in parallel, and
+    then combined with :meth:`merge`.
+
+    Examples
+    --------
+    >>> stats = model._initialize_sufficient_statistics()  # doctest: +SKIP
+    >>> for X_chunk, lengths_chunk in chunks:  # doctest: +SKIP
+    ...     chunk_stats, _ = model._do_estep(X_chunk, lengths_chunk)
+    ...     stats.merge(chunk_stats)
+    >>> model._do_mstep(stats)  # doctest: +SKIP
+    """
+    def merge(self, other):
+        """Adds the statistics of another chunk of data in place.
+
+        Parameters
+        ----------
+        other : dict
+            Statistics with the same names, accumulated with the same
+            parameters.
+
+        Returns
+        -------
+        self : SufficientStatistics
+            The merged statistics.
+
+        Raises
+        ------
+        ValueError
+            If ``other`` does not have the same statistics.
+        """
+        if self.keys() != other.keys():
+            raise ValueError(
+                "Cannot merge statistics {} with {}".format(
+                    sorted(other), sorted(self)))
+        for name, value in other.items():
+            # Not in place: sparse matrices do not support it.
+            self[name] = self[name] + value
+        return self
+
+
+def _fit_restart(model, X, lengths, n_iter, init, kwargs):
+    """Runs EM for a single restart, possibly in a worker process."""
+    if init:
+        model._init(X, lengths=lengths)
+        model._check()
+        model.monitor_._reset()
+        if model.profile:
+            model.fit_profile_ = []
+    model._fit_em(X, lengths, n_iter, **kwargs)
+    return model
+
+
+def _is_picklable(obj):
+    """Whether ``obj`` can be sent to a worker process."""
+    try:
+        pickle.dumps(obj)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
+def _nbytes(obj):
+    """Total size of the arrays in ``obj``, possibly nested in tuples
+    and dicts."""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    elif isinstance(obj, tuple):
+        return sum(_nbytes(item) for item in obj)
+    elif isinstance(obj, dict):
+        return sum(_nbytes(item) for item in obj.values())
+    return 0
+
+
+class _FitProfiler(object):
+    """Records wall time and size of the arrays produced by each phase
+    of an EM iteration.
+
+    Phases which update their arguments in place rather than returning
+    a result should pass the updated object as ``output``.
+    """
+    def __init__(self):
+        self.record = {}
+
+    def __call__(self, phase, func, *args, output=None):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        entry = self.record.get(phase)
+        if entry is None:
+            entry = self.record[phase] = {"time": 0., "bytes": 0, "calls": 0}
+        entry["time"] += elapsed
+        entry["bytes"] += _nbytes(result if output is None else output)
+        entry["calls"] += 1
+        return result
+
+
+def _unprofiled(phase, func, *args, output=None):
+    return func(*args)
+
+
+def _final_logprob(model):
+    history = model.monitor_.history
+    return history[-1] if history else -np.inf
+
+
 class _BaseHMM(BaseEstimator):
     r"""Base class for Hidden Markov Models.
 
@@ -198,6 +340,68 @@ class _BaseHMM(BaseEstimator):
         subclass-specific emission parameters. Defaults to all
         parameters.
 
+    n_init : int, optional
+        Number of differently seeded initializations to perform. The
+        restarts are fitted in parallel worker processes and the one with
+        the best log probability is kept. If ``callback`` or ``profile``
+        cannot be pickled, e.g. a lambda, the restarts are fitted one
+        after the other in the calling process instead. Defaults to 1.
+
+    acceleration : string, optional
+        EM acceleration method. If "squarem", every two EM steps are
+        followed by a SQUAREM extrapolation, which is discarded if it
+        does not improve log probability. Defaults to ``None``, i.e.
+        plain EM.
+
+    profile : bool or callable, optional
+        If true, the wall time and the size of the arrays produced by
+        each phase of every EM iteration are recorded in
+        :attr:`fit_profile_`. If callable, it is additionally called with
+        the record of each iteration as soon as it is complete. With
+        ``n_init > 1`` it is called with the records of every restart,
+        in the worker processes if it can be pickled. Defaults to
+        ``False``.
+
+    max_time : float, optional
+        Time budget of :meth:`fit` in seconds, including initialization.
+        EM stops before an iteration which would likely exceed the budget,
+        judging by the duration of the previous one. Defaults to ``None``,
+        i.e. no time limit.
+
+    callback : callable, optional
+        Called after every EM iteration as
+        ``callback(iter_time, logprob, history)``, where ``iter_time`` is
+        the duration of the iteration in seconds, ``logprob`` the log
+        probability of the data at the iteration and ``history`` the list
+        of log probabilities of all iterations so far. It is also called
+        after iterations whose SQUAREM extrapolation is rejected, whose
+        log probability is then missing from ``history``, and after the
+        last iteration. If it returns a true value, EM is stopped and the
+        best parameters found so far are kept; the value is ignored after
+        the last iteration. With ``n_init > 1`` it is called for every
+        restart, in the worker processes if it can be pickled.
+
+    cache_size : int, optional
+        Number of emission log-likelihood matrices memoized by
+        :meth:`score`, :meth:`score_samples`, :meth:`decode` and the
+        methods based on them, so that e.g. calling :meth:`score` and
+        :meth:`predict` on the same samples evaluates the emissions only
+        once. Samples are identified by a hash of their contents. The
+        cache is cleared whenever a parameter, i.e. an attribute whose
+        name ends with an underscore, is assigned; parameters modified in
+        place are not detected. Defaults to 0, i.e. no caching.
+
+    batch_size : int, optional
+        If set, the sequences are sorted by length and processed in
+        buckets of up to ``batch_size`` sequences, each padded to its
+        longest sequence, with forward, backward and Viterbi passes
+        vectorized across the bucket. This removes the per-sequence
+        overhead of :meth:`fit`, :meth:`score`, :meth:`decode` and the
+        methods based on them for many short sequences, at the cost of
+        evaluating the emissions of all samples at once. Ignored by
+        clusterless models. Defaults to ``None``, i.e. sequences are
+        processed one at a time.
+
     Attributes
     ----------
     monitor\_ : ConvergenceMonitor
@@ -208,13 +412,39 @@ class _BaseHMM(BaseEstimator):
 
     transmat\_ : array, shape (n_components, n_components)
         Matrix of transition probabilities between states.
+
+    valid_history\_ : list
+        Log probabilities of the held-out samples passed to :meth:`fit`,
+        one per evaluation. Empty if no held-out samples were given.
+
+    fit_profile\_ : list
+        Only set if ``profile`` is true. One dict per EM iteration,
+        holding the iteration number under ``"iter"`` and, for each of
+        ``"compute_log_likelihood"``, ``"forward_pass"``,
+        ``"backward_pass"``, ``"compute_posteriors"``, ``"viterbi_pass"``,
+        ``"accumulate_sufficient_statistics"`` and ``"do_mstep"`` that
+        was run (the M-step is skipped if log probability decreased), a
+        dict with the total wall time in seconds (``"time"``), the total size
+        in bytes of the arrays returned or updated (``"bytes"``) and the
+        number of calls (``"calls"``).
     """
+    # Attributes computed from the parameters, which are dropped whenever
+    # a parameter is assigned and are not pickled.
+    _derived_attributes = ("_loglik_cache",)
+    # Attributes without a trailing underscore which the derived
+    # attributes depend on, e.g. fixed emission parameters.
+    _derived_from = ()
+    # Sparse matrix formats accepted as samples, see check_array.
+    _accept_sparse = False
+
     def __init__(self, n_components=1,
                  startprob_prior=1.0, transmat_prior=1.0,
                  algorithm="viterbi", random_state=None,
                  n_iter=10, tol=1e-2, verbose=False,
                  params=string.ascii_letters,
-                 init_params=string.ascii_letters):
+                 init_params=string.ascii_letters, n_init=1,
+                 acceleration=None, profile=False, max_time=None,
+                 callback=None, cache_size=0, batch_size=None):
         self.n_components = n_components
         self.params = params
         self.init_params = init_params
@@ -225,10 +455,52 @@ class _BaseHMM(BaseEstimator):
         self.n_iter = n_iter
         self.tol = tol
         self.verbose = verbose
+        self.n_init = n_init
+        self.acceleration = acceleration
+        self.profile = profile
+        self.max_time = max_time
+        self.callback = callback
+        self.cache_size = cache_size
+        self.batch_size = batch_size
         self.monitor_ = ConvergenceMonitor(self.tol, self.n_iter, self.verbose)
         self.final_logprob = None
         self.__is_clusterless = False
 
+    def __setattr__(self, name, value):
+        # Assigning a new parameter invalidates memoized log-likelihoods
+        # and other derived attributes.
+        if ((name.endswith("_") or name in self._derived_from)
+                and self.__dict__.get(name) is not value):
+            self._drop_derived_attributes()
+        super(_BaseHMM, self).__setattr__(name, value)
+
+    def _drop_derived_attributes(self):
+        for derived in self._derived_attributes:
+            self.__dict__.pop(derived, None)
+
+    def __getstate__(self):
+        state = dict(super(_BaseHMM, self).__getstate__())
+        for derived in self._derived_attributes:
+            state.pop(derived, None)
+        return state
+
+    def _check_sequences(self, X, lengths):
+        """Validates the input and unwraps a
+        :class:`~hmmlearn.utils.Sequences`.
+
+        Returns the samples and the sequence boundaries, which are either
+        ``lengths`` or the :class:`~hmmlearn.utils.Sequences` itself, so
+        that its precomputed offsets are reused.
+        """
+        if isinstance(X, Sequences):
+            if lengths is not None:
+                raise ValueError(
+                    "lengths must be None when X is a Sequences")
+            X, lengths = X.data, X
+        if not self.__is_clusterless:
+            X = check_array(X, accept_sparse=self._accept_sparse)
+        return X, lengths
+
     def score_samples(self, X, lengths=None):
         """Compute the log probability under the model and compute posteriors.
 
@@ -257,13 +529,17 @@ class _BaseHMM(BaseEstimator):
         check_is_fitted(self, "startprob_")
         self._check()
 
-        if not self.__is_clusterless:
-            X = check_array(X)
+        X, lengths = self._check_sequences(X, lengths)
+        if self._use_batches():
+            results = self._infer_batches(
+                X, lengths, ("logprob", "posteriors"))
+            return results["logprob"], results["posteriors"]
+
         n_samples = X.shape[0]
         logprob = 0
         posteriors = np.zeros((n_samples, self.n_components))
         for i, j in iter_from_X_lengths(X, lengths):
-            framelogprob = self._compute_log_likelihood(X[i:j])
+            framelogprob = self._compute_log_likelihood_cached(X[i:j])
             logprobij, fwdlattice = self._do_forward_pass(framelogprob)
             logprob += logprobij
 
@@ -297,18 +573,20 @@ class _BaseHMM(BaseEstimator):
         check_is_fitted(self, "startprob_")
         self._check()
 
-        if not self.__is_clusterless:
-            X = check_array(X)
-        # XXX we can unroll forward pass for speed and memory efficiency.
+        X, lengths = self._check_sequences(X, lengths)
+        return self._score(X, lengths)
+
+    def _score(self, X, lengths=None):
+        if self._use_batches():
+            return self._infer_batches(X, lengths, ("logprob",))["logprob"]
+
         logprob = 0
         for i, j in iter_from_X_lengths(X, lengths):
-            framelogprob = self._compute_log_likelihood(X[i:j])
-            logprobij, _fwdlattice = self._do_forward_pass(framelogprob)
-            logprob += logprobij
+            logprob += self._do_forward_scoring(X[i:j])
         return logprob
 
     def _decode_viterbi(self, X):
-        framelogprob = self._compute_log_likelihood(X)
+        framelogprob = self._compute_log_likelihood_cached(X)
         return self._do_viterbi_pass(framelogprob)
 
     def _decode_map(self, X):
@@ -360,8 +638,10 @@ class _BaseHMM(BaseEstimator):
             "map": self._decode_map
         }[algorithm]
 
-        if not self.__is_clusterless:
-            X = check_array(X)
+        X, lengths = self._check_sequences(X, lengths)
+        if self._use_batches():
+            return self._infer_batches(X, lengths, (algorithm,))[algorithm]
+
         n_samples = X.shape[0]
         logprob = 0
         state_sequence = np.empty(n_samples, dtype=int)
@@ -411,6 +691,204 @@ class _BaseHMM(BaseEstimator):
         _, posteriors = self.score_samples(X, lengths)
         return posteriors
 
+    def infer(self, X, lengths=None,
+              outputs=("logprob", "posteriors", "viterbi", "map")):
+        """Compute several inference results in a single pass.
+
+        The emission log probabilities and, if needed, the forward and
+        backward lattices are computed once per sequence and shared by
+        all requested outputs.
+
+        Parameters
+        ----------
+        X : array-like, shape (n_samples, n_features)
+            Feature matrix of individual samples.
+
+        lengths : array-like of integers, shape (n_sequences, ), optional
+            Lengths of the individual sequences in ``X``. The sum of
+            these should be ``n_samples``.
+
+        outputs : iterable of strings, optional
+            Quantities to compute, any of "logprob", "posteriors",
+            "viterbi" and "map". Defaults to all of them.
+
+        Returns
+        -------
+        results : dict
+            Maps each requested output to its value: "logprob" to the log
+            likelihood of ``X`` as returned by :meth:`score`, "posteriors"
+            to the state-membership probabilities as returned by
+            :meth:`predict_proba`, and "viterbi" and "map" to the
+            ``(logprob, state_sequence)`` tuples returned by
+            :meth:`decode` with the respective algorithm.
+
+        See Also
+        --------
+        score_samples : Compute the log probability under the model and
+            posteriors.
+        decode : Find most likely state sequence corresponding to ``X``.
+        """
+        outputs = frozenset(outputs)
+        unknown = outputs - INFERENCE_OUTPUTS
+        if unknown:
+            raise ValueError(
+                "Unknown outputs {!r}".format(sorted(unknown)))
+
+        check_is_fitted(self, "startprob_")
+        self._check()
+
+        X, lengths = self._check_sequences(X, lengths)
+        if self._use_batches():
+            return self._infer_batches(X, lengths, outputs)
+
+        n_samples = X.shape[0]
+        need_forward = bool(outputs & {"logprob", "posteriors", "map"})
+        need_posteriors = bool(outputs & {"posteriors", "map"})
+        logprob = 0
+        viterbi_logprob = 0
+        map_logprob = 0
+        posteriors = np.zeros((n_samples, self.n_components))
+        viterbi_sequence = np.empty(n_samples, dtype=int)
+        for i, j in iter_from_X_lengths(X, lengths):
+            framelogprob = self._compute_log_likelihood_cached(X[i:j])
+            if need_forward:
+                logprobij, fwdlattice = self._do_forward_pass(framelogprob)
+                logprob += logprobij
+            if need_posteriors:
+                bwdlattice = self._do_backward_pass(framelogprob)
+                posteriors[i:j] = self._compute_posteriors(
+                    fwdlattice, bwdlattice)
+                map_logprob += np.log(np.max(posteriors[i:j], axis=1)).sum()
+            if "viterbi" in outputs:
+                logprobij, viterbi_sequence[i:j] = self._do_viterbi_pass(
+                    framelogprob)
+                viterbi_logprob += logprobij
+
+        results = {}
+        if "logprob" in outputs:
+            results["logprob"] = logprob
+        if "posteriors" in outputs:
+            results["posteriors"] = posteriors
+        if "viterbi" in outputs:
+            results["viterbi"] = viterbi_logprob, viterbi_sequence
+        if "map" in outputs:
+            results["map"] = map_logprob, np.argmax(posteriors, axis=1)
+        return results
+
+    def _use_batches(self):
+        # Subclasses which accumulate their emission statistics in
+        # _accumulate_sufficient_statistics rather than in
+        # _accumulate_emission_statistics may depend on the lattices of
+        # each sequence.
+        return (bool(self.batch_size) and not self.__is_clusterless
+                and type(self)._accumulate_sufficient_statistics
+                is _BaseHMM._accumulate_sufficient_statistics)
+
+    def _iter_batches(self, X, lengths, framelogprob):
+        """Groups the sequences into padded buckets of similar length.
+
+        Parameters
+        ----------
+        X : array-like, shape (n_samples, n_features)
+            Feature matrix of individual samples.
+
+        lengths : array-like of integers or Sequences, optional
+            Lengths of the individual sequences in ``X``.
+
+        framelogprob : array, shape (n_samples, n_components)
+            Log-probabilities of each sample under each of the model states.
+
+        Yields
+        ------
+        rows : array, shape (n_bucket_samples, )
+            Rows of ``X`` of the samples in the bucket, ordered as the
+            non-padded frames of the bucket.
+
+        mask : array, shape (n_bucket_sequences, max_length)
+            ``True`` for the frames which are not padding.
+
+        framelogprob : array, shape (n_bucket_sequences, max_length, \
+                n_components)
+            Padded log-probabilities of the samples in the bucket.
+
+        lengths : array, shape (n_bucket_sequences, )
+            Lengths of the sequences in the bucket, in decreasing order.
+        """
+        if not isinstance(lengths, Sequences):
+            # Only the boundaries are needed; X may be a sparse matrix.
+            lengths = Sequences(framelogprob, lengths)
+        seq_lengths = lengths.lengths
+        order = lengths.length_order
+        for k in range(0, len(order), self.batch_size):
+            bucket = order[k:k + self.batch_size]
+            bucket_lengths = seq_lengths[bucket]
+            steps = np.arange(bucket_lengths[0])
+            mask = steps < bucket_lengths[:, np.newaxis]
+            index = np.where(
+                mask, lengths.offsets[bucket, np.newaxis] + steps, 0)
+            yield index[mask], mask, framelogprob[index], bucket_lengths
+
+    def _infer_batches(self, X, lengths, outputs):
+        """Computes the results of :meth:`infer` bucket by bucket."""
+        outputs = frozenset(outputs)
+        n_samples = X.shape[0]
+        need_forward = bool(outputs & {"logprob", "posteriors", "map"})
+        need_posteriors = bool(outputs & {"posteriors", "map"})
+        log_startprob = log_mask_zero(self.startprob_)
+        log_transmat = log_mask_zero(self.transmat_)
+        logprob = 0
+        viterbi_logprob = 0
+        posteriors = np.zeros((n_samples, self.n_components))
+        viterbi_sequence = np.empty(n_samples, dtype=int)
+        framelogprob = self._compute_log_likelihood_cached(X)
+        for rows, mask, framelogprob_b, lengths_b in self._iter_batches(
+                X, lengths, framelogprob):
+            if need_forward:
+                logprob_b, fwdlattice = _batch._forward(
+                    log_startprob, self.transmat_, framelogprob_b, lengths_b)
+                logprob += logprob_b.sum()
+            if need_posteriors:
+                bwdlattice = _batch._backward(
+                    self.transmat_, framelogprob_b, lengths_b)
+                posteriors[rows] = _batch._compute_posteriors(
+                    fwdlattice, bwdlattice)[mask]
+            if "viterbi" in outputs:
+                logprob_b, state_sequences = _batch._viterbi(
+                    log_startprob, log_transmat, framelogprob_b, lengths_b)
+                viterbi_logprob += logprob_b.sum()
+                viterbi_sequence[rows] = state_sequences[mask]
+
+        results = {}
+        if "logprob" in outputs:
+            results["logprob"] = logprob
+        if "posteriors" in outputs:
+            results["posteriors"] = posteriors
+        if "viterbi" in outputs:
+            results["viterbi"] = viterbi_logprob, viterbi_sequence
+        if "map" in outputs:
+            results["map"] = (np.log(np.max(posteriors, axis=1)).sum(),
+                              np.argmax(posteriors, axis=1))
+        return results
+
+    def freeze(self):
+        """Return an immutable predictor for the current parameters.
+
+        The parameters are validated once, and their logarithms and
+        emission-specific terms (e.g. Cholesky factors of the covariance
+        matrices) are precomputed, so that the inference methods of the
+        returned object skip all per-call validation. Later changes to
+        this model do not affect the predictor.
+
+        Returns
+        -------
+        frozen : FrozenHMM
+            Predictor with :meth:`~FrozenHMM.score`,
+            :meth:`~FrozenHMM.score_samples`, :meth:`~FrozenHMM.decode`,
+            :meth:`~FrozenHMM.predict` and :meth:`~FrozenHMM.predict_proba`
+            methods.
+        """
+        return FrozenHMM(self)
+
     def sample(self, n_samples=1, random_state=None):
         """Generate random samples from the model.
 
@@ -455,7 +933,8 @@ class _BaseHMM(BaseEstimator):
 
         return np.atleast_2d(X), np.array(state_sequence, dtype=int)
 
-    def fit(self, X, lengths=None):
+    def fit(self, X, lengths=None, X_valid=None, lengths_valid=None,
+            valid_interval=1, patience=1, algorithm="baum-welch"):
         """Estimate model parameters.
 
         An initialization step is performed before entering the
@@ -472,48 +951,444 @@ class _BaseHMM(BaseEstimator):
             Lengths of the individual sequences in ``X``. The sum of
             these should be ``n_samples``.
 
+        X_valid : array-like, shape (n_valid_samples, n_features), optional
+            Held-out samples used for early stopping. If given, ``X_valid``
+            is scored with a forward pass every ``valid_interval``
+            iterations and EM stops once its log probability failed to
+            improve ``patience`` times in a row. The parameters with the
+            best held-out log probability are then restored.
+
+        lengths_valid : array-like of integers, optional
+            Lengths of the individual sequences in ``X_valid``. The sum of
+            these should be ``n_valid_samples``.
+
+        valid_interval : int, optional
+            Number of EM iterations between two evaluations of the
+            held-out log probability. Defaults to 1.
+
+        patience : int, optional
+            Number of consecutive evaluations of the held-out log
+            probability without improvement after which EM stops.
+            Defaults to 1.
+
+        algorithm : string, optional
+            Training algorithm. Must be one of "baum-welch" or "viterbi".
+            The latter, also known as segmental k-means or hard EM,
+            re-estimates the parameters from the Viterbi path of each
+            sequence instead of its posteriors. It is several times
+            cheaper per iteration and maximizes the log probability of
+            the best state sequences rather than of ``X``, which makes it
+            a good warm-up for a few Baum-Welch iterations. Defaults to
+            "baum-welch".
+
         Returns
         -------
         self : object
             Returns self.
         """
-        if not self.__is_clusterless:
-            X = check_array(X)
+        if algorithm not in TRAINING_ALGORITHMS:
+            raise ValueError(
+                "Unknown training algorithm {!r}".format(algorithm))
+        if valid_interval < 1:
+            raise ValueError("valid_interval must be at least 1, got {!r}"
+                             .format(valid_interval))
+        if patience < 1:
+            raise ValueError("patience must be at least 1, got {!r}"
+                             .format(patience))
+
+        deadline = (time.time() + self.max_time
+                    if self.max_time is not None else None)
+        X, lengths = self._check_sequences(X, lengths)
+        if X_valid is not None:
+            X_valid, lengths_valid = self._check_sequences(
+                X_valid, lengths_valid)
+        kwargs = dict(X_valid=X_valid, lengths_valid=lengths_valid,
+                      valid_interval=valid_interval, patience=patience,
+                      deadline=deadline,
+                      algorithm=algorithm)
+        if self.n_init > 1:
+            return self._fit_restarts(X, lengths, **kwargs)
+
         self._init(X, lengths=lengths)
         self._check()
 
         self.monitor_._reset()
+        if self.profile:
+            self.fit_profile_ = []
+        self._fit_em(X, lengths, self.n_iter, **kwargs)
+        return self
+
+    def _fit_restarts(self, X, lengths, **kwargs):
+        """Fits ``n_init`` independently initialized copies of the model
+        in worker processes and keeps the one with the best log probability.
+        The copies are fitted in this process if they cannot be pickled.
+
+        Every restart is first run for a few EM iterations, after which
+        the worse half of the restarts is discarded. ``kwargs`` are passed
+        to :meth:`_fit_em`.
+        """
+        import multiprocessing as mp
+
+        random_state = check_random_state(self.random_state)
+        seeds = random_state.randint(np.iinfo(np.int32).max, size=self.n_init)
+        models = []
+        for seed in seeds:
+            model = copy.deepcopy(self)
+            model.n_init = 1
+            model.random_state = seed
+            models.append(model)
+
+        n_probe_iter = min(N_INIT_PROBE_ITER, self.n_iter)
+        if (self.__is_clusterless
+                or not _is_picklable((self.callback, self.profile))):
+            # Clusterless emissions are already evaluated in a pool of
+            # worker processes, which cannot be nested. Unpicklable
+            # callbacks, e.g. lambdas, cannot be sent to the workers.
+            pool = None
+            map_ = itertools.starmap
+        else:
+            pool = mp.Pool(processes=min(self.n_init, mp.cpu_count()))
+            map_ = pool.starmap
+        try:
+            # Early stopping only applies once the restarts are pruned.
+            probe_kwargs = dict(kwargs, X_valid=None, lengths_valid=None)
+            models = list(map_(_fit_restart, [
+                (model, X, lengths, n_probe_iter, True, probe_kwargs)
+                for model in models]))
+            if n_probe_iter < self.n_iter:
+                models.sort(key=_final_logprob, reverse=True)
+                models = list(map_(_fit_restart, [
+                    (model, X, lengths, self.n_iter - n_probe_iter, False,
+                     kwargs)
+                    for model in models[:(self.n_init + 1) // 2]]))
+        finally:
+            if pool is not None:
+                # Also stops the workers if a restart raised.
+                pool.terminate()
+                pool.join()
+
+        best = max(models, key=_final_logprob)
+        params = self.get_params(deep=False)
+        vars(self).update(vars(best))
+        # The update bypasses __setattr__.
+        self._drop_derived_attributes()
+        self.set_params(**params)
+        return self
+
+    def _fit_em(self, X, lengths, n_iter, X_valid=None, lengths_valid=None,
+                valid_interval=1, patience=1, deadline=None,
+                algorithm="baum-welch"):
+        """Runs at most ``n_iter`` iterations of EM on an initialized model.
+
+        If given, ``deadline`` is the :func:`time.time` by which EM must be
+        finished.
+        """
+        if (self.acceleration is not None
+                and self.acceleration not in ACCELERATION_METHODS):
+            raise ValueError(
+                "Unknown acceleration {!r}".format(self.acceleration))
+
+        squarem = self.acceleration == "squarem"
+        cycle = [self._get_fitted_params()]
+        fallback = None
+        self.valid_history_ = []
         best_logprob = -np.inf
-        for iter in range(self.n_iter):
-            stats = self._initialize_sufficient_statistics()
-            curr_logprob = 0
-            for i, j in iter_from_X_lengths(X, lengths):
-                framelogprob = self._compute_log_likelihood(X[i:j])
-                # pi_t(1), alpha_t(i), both in log domain
-                logprob, fwdlattice = self._do_forward_pass(framelogprob)
-                curr_logprob += logprob
-                # beta_t(i), in log domain
-                bwdlattice = self._do_backward_pass(framelogprob)
-                # gamma_t(i), NOT in log domain
-                posteriors = self._compute_posteriors(fwdlattice, bwdlattice)
-                self._accumulate_sufficient_statistics(
-                    stats, X[i:j], framelogprob, posteriors, fwdlattice,
-                    bwdlattice)
+        best_valid_logprob = -np.inf
+        best_params = None
+        n_bad_evaluations = 0
+        aborted = False
+        iter_time = 0.
+        for iter in range(n_iter):
+            if deadline is not None and time.time() + iter_time > deadline:
+                aborted = True
+                break
+
+            iter_start = time.perf_counter()
+            run = _FitProfiler() if self.profile else _unprofiled
+            stats, curr_logprob = self._do_estep(X, lengths, run, algorithm)
 
             # XXX must be before convergence check, because otherwise
             #     there won't be any updates for the case ``n_iter=1``.
             if curr_logprob > best_logprob:
                 best_logprob = curr_logprob
-                self._do_mstep(stats)
+                run("do_mstep", self._do_mstep, stats, output=vars(self))
 
                 self.monitor_.report(curr_logprob)
+            elif fallback is not None:
+                # The extrapolated parameters are worse than the ones
+                # from the last plain EM step, continue from the latter.
+                self._set_fitted_params(fallback)
+                cycle = [fallback]
+                fallback = None
+                # The iteration counts towards n_iter, but its log
+                # probability is not that of the kept parameters.
+                self.monitor_.iter += 1
+                iter_time = time.perf_counter() - iter_start
+                if self._run_callback(iter_time, curr_logprob):
+                    aborted = True
+                    break
+                continue
             else:
                 self.monitor_.report_decreasing_logprob(curr_logprob)
-            if self.monitor_.converged:
-                    self.final_logprob = curr_logprob
-                    break
 
-        return self
+            if self.profile:
+                record = dict(run.record, iter=self.monitor_.iter)
+                self.fit_profile_.append(record)
+                if callable(self.profile):
+                    self.profile(record)
+
+            stopped = False
+            if X_valid is not None and (iter + 1) % valid_interval == 0:
+                valid_logprob = self._score(X_valid, lengths_valid)
+                self.valid_history_.append(valid_logprob)
+                if valid_logprob > best_valid_logprob:
+                    best_valid_logprob = valid_logprob
+                    best_params = self._get_fitted_params()
+                    n_bad_evaluations = 0
+                else:
+                    n_bad_evaluations += 1
+                if n_bad_evaluations >= patience:
+                    # The held-out log probability stopped improving,
+                    # roll back to the best parameters seen so far.
+                    if best_params is not None:
+                        self._set_fitted_params(best_params)
+                    self.final_logprob = self._compute_logprob(
+                        X, lengths, algorithm)
+                    stopped = True
+
+            if not stopped and self.monitor_.converged:
+                self.final_logprob = curr_logprob
+                stopped = True
+
+            if not stopped and squarem:
+                # A SQUAREM cycle consists of two plain EM steps followed
+                # by an extrapolation, which is then stabilized by another
+                # EM step or rejected if it doesn't improve log probability.
+                if fallback is None and curr_logprob == best_logprob:
+                    cycle.append(self._get_fitted_params())
+                else:
+                    cycle = [self._get_fitted_params()]
+                    fallback = None
+                if len(cycle) == 3:
+                    if self._squarem_extrapolate(*cycle):
+                        fallback = cycle[-1]
+                    cycle = [cycle[-1]]
+
+            iter_time = time.perf_counter() - iter_start
+            if self._run_callback(iter_time, curr_logprob) and not stopped:
+                aborted = True
+            if stopped or aborted:
+                break
+        else:
+            # n_iter ran out without the monitor converging, e.g. right
+            # after a rejected extrapolation.
+            if fallback is not None:
+                self._set_fitted_params(fallback)
+            self.final_logprob = _final_logprob(self)
+
+        if aborted:
+            # Keep the best parameters seen so far, i.e. discard a pending
+            # extrapolation and honour the held-out log probability.
+            if fallback is not None:
+                self._set_fitted_params(fallback)
+            if best_params is not None:
+                self._set_fitted_params(best_params)
+                self.final_logprob = self._compute_logprob(
+                    X, lengths, algorithm)
+            else:
+                self.final_logprob = _final_logprob(self)
+
+    def _compute_logprob(self, X, lengths, algorithm):
+        """Computes the log probability of ``X`` as the E-step of the
+        training ``algorithm`` would, i.e. of its Viterbi paths for
+        "viterbi"."""
+        if algorithm == "viterbi":
+            return sum(self._decode_viterbi(X[i:j])[0]
+                       for i, j in iter_from_X_lengths(X, lengths))
+        return self._score(X, lengths)
+
+    def _run_callback(self, iter_time, logprob):
+        """Calls :attr:`callback` and returns whether EM should stop."""
+        return bool(self.callback is not None and self.callback(
+            iter_time, logprob, list(self.monitor_.full_history)))
+
+    def _do_estep(self, X, lengths, run=_unprofiled, algorithm="baum-welch"):
+        """Performs the E-step of EM algorithm.
+
+        Parameters
+        ----------
+        X : array-like, shape (n_samples, n_features)
+            Feature matrix of individual samples.
+
+        lengths : array-like of integers, shape (n_sequences, )
+            Lengths of the individual sequences in ``X``. The sum of
+            these should be ``n_samples``.
+
+        run : callable, optional
+            Called as ``run(phase, func, *args)`` to evaluate each phase
+            of the E-step, e.g. a :class:`_FitProfiler`.
+
+        algorithm : string, optional
+            Training algorithm, one of :data:`TRAINING_ALGORITHMS`. For
+            "viterbi", the statistics are accumulated from one-hot
+            posteriors of the Viterbi path, without lattices.
+
+        Returns
+        -------
+        stats : dict
+            Sufficient statistics accumulated from all sequences.
+
+        logprob : float
+            Log likelihood of ``X`` under the current parameters, or of
+            its Viterbi paths for "viterbi".
+        """
+        if self._use_batches():
+            return self._do_estep_batches(X, lengths, run, algorithm)
+
+        stats = self._initialize_sufficient_statistics()
+        curr_logprob = 0
+        for i, j in iter_from_X_lengths(X, lengths):
+            framelogprob, emission_terms = run(
+                "compute_log_likelihood", self._compute_emission_terms,
+                X[i:j])
+            if algorithm == "viterbi":
+                logprob, state_sequence = run(
+                    "viterbi_pass", self._do_viterbi_pass, framelogprob)
+                curr_logprob += logprob
+                posteriors = np.zeros_like(framelogprob)
+                posteriors[np.arange(len(state_sequence)), state_sequence] = 1
+                fwdlattice = bwdlattice = None
+            else:
+                # pi_t(1), alpha_t(i), both in log domain
+                logprob, fwdlattice = run(
+                    "forward_pass", self._do_forward_pass, framelogprob)
+                curr_logprob += logprob
+                # beta_t(i), in log domain
+                bwdlattice = run("backward_pass",
+                                 self._do_backward_pass, framelogprob)
+                # gamma_t(i), NOT in log domain
+                posteriors = run("compute_posteriors",
+                                 self._compute_posteriors,
+                                 fwdlattice, bwdlattice)
+            args = (stats, X[i:j], framelogprob, posteriors, fwdlattice,
+                    bwdlattice)
+            if emission_terms is not None:
+                # Only passed if given, so that subclasses overriding
+                # _accumulate_sufficient_statistics need not accept them.
+                args += (emission_terms,)
+            run("accumulate_sufficient_statistics",
+                self._accumulate_sufficient_statistics, *args, output=stats)
+        return stats, curr_logprob
+
+    def _do_estep_batches(self, X, lengths, run, algorithm):
+        """Performs the E-step of EM algorithm bucket by bucket.
+
+        The start and transition statistics, which depend on the sequence
+        boundaries, are computed from the padded buckets; the emission
+        statistics are accumulated from all sequences at once.
+        """
+        n_samples = X.shape[0]
+        log_startprob = log_mask_zero(self.startprob_)
+        log_transmat = log_mask_zero(self.transmat_)
+        curr_logprob = 0
+        posteriors = np.zeros((n_samples, self.n_components))
+        start = np.zeros(self.n_components)
+        trans = np.zeros((self.n_components, self.n_components))
+        framelogprob, emission_terms = run(
+            "compute_log_likelihood", self._compute_emission_terms, X)
+        n_sequences = 0
+        for rows, mask, framelogprob_b, lengths_b in self._iter_batches(
+                X, lengths, framelogprob):
+            n_sequences += len(lengths_b)
+            if algorithm == "viterbi":
+                logprob_b, state_sequences = run(
+                    "viterbi_pass", _batch._viterbi, log_startprob,
+                    log_transmat, framelogprob_b, lengths_b)
+                curr_logprob += logprob_b.sum()
+                posteriors[rows, state_sequences[mask]] = 1
+                np.add.at(start, state_sequences[:, 0], 1)
+                transitions = mask[:, 1:]
+                np.add.at(trans, (state_sequences[:, :-1][transitions],
+                                  state_sequences[:, 1:][transitions]), 1)
+                continue
+            logprob_b, fwdlattice = run(
+                "forward_pass", _batch._forward, log_startprob,
+                self.transmat_, framelogprob_b, lengths_b)
+            curr_logprob += logprob_b.sum()
+            bwdlattice = run("backward_pass", _batch._backward,
+                             self.transmat_, framelogprob_b, lengths_b)
+            posteriors_b = run("compute_posteriors",
+                               _batch._compute_posteriors,
+                               fwdlattice, bwdlattice)
+            posteriors[rows] = posteriors_b[mask]
+            start += posteriors_b[:, 0].sum(axis=0)
+            trans += _batch._compute_xi_sum(
+                self.transmat_, logprob_b, framelogprob_b, fwdlattice,
+                bwdlattice, mask)
+
+        stats = self._initialize_sufficient_statistics()
+        stats['nobs'] = n_sequences
+        if 's' in self.params:
+            stats['start'] = start
+        if 't' in self.params:
+            stats['trans'] = trans
+        args = (stats, X, framelogprob, posteriors)
+        if emission_terms is not None:
+            args += (emission_terms,)
+        run("accumulate_sufficient_statistics",
+            self._accumulate_emission_statistics, *args, output=stats)
+        return stats, curr_logprob
+
+    def _squarem_extrapolate(self, params0, params1, params2):
+        """Extrapolates three consecutive EM iterates (SQUAREM).
+
+        Uses the steplength scheme S3 from Varadhan and Roland, "Simple
+        and Globally Convergent Methods for Accelerating the Convergence
+        of Any EM Algorithm", 2008. The extrapolated parameters are
+        projected back onto their domain.
+
+        Returns
+        -------
+        extrapolated : bool
+            ``False`` if the iterates are already at a fixed point and
+            the parameters were left unchanged.
+        """
+        names = self._get_extrapolated_params(params0, params1, params2)
+        r = {name: params1[name] - params0[name] for name in names}
+        v = {name: params2[name] - params1[name] - r[name] for name in names}
+        r_norm = np.sqrt(sum(np.sum(r[name] ** 2) for name in names))
+        v_norm = np.sqrt(sum(np.sum(v[name] ** 2) for name in names))
+        if not v_norm > 0:
+            return False
+
+        alpha = min(-r_norm / v_norm, -1.)
+        self._set_fitted_params({
+            name: params0[name] - 2 * alpha * r[name] + alpha ** 2 * v[name]
+            for name in names})
+        self._project_params()
+        return True
+
+    def _get_extrapolated_params(self, params0, params1, params2):
+        """Returns the names of the parameters extrapolated by SQUAREM.
+
+        These are the floating point parameters of all three iterates.
+        Subclasses should exclude parameters whose entries do not refer
+        to the same quantities in the three iterates.
+        """
+        return [name for name in params0
+                if name in params1 and name in params2
+                and np.issubdtype(params0[name].dtype, np.floating)]
+
+    def _get_fitted_params(self):
+        """Returns a copy of the array-valued fitted parameters."""
+        return {name: copy.deepcopy(value)
+                for name, value in vars(self).items()
+                if name.endswith("_") and isinstance(value, np.ndarray)}
+
+    def _set_fitted_params(self, params):
+        """Restores parameters returned by :meth:`_get_fitted_params`."""
+        for name, value in params.items():
+            setattr(self, name, value)
 
     def _do_viterbi_pass(self, framelogprob):
         n_samples, n_components = framelogprob.shape
@@ -532,6 +1407,36 @@ class _BaseHMM(BaseEstimator):
         with np.errstate(under="ignore"):
             return logsumexp(fwdlattice[-1]), fwdlattice
 
+    def _do_forward_scoring(self, X):
+        """Computes the log probability of a single sequence.
+
+        Only the last row of the forward lattice is kept and the emission
+        log probabilities are computed in chunks of
+        :data:`SCORE_CHUNK_SIZE` samples, so that memory use does not
+        grow with the length of ``X``.
+        """
+        n_samples = X.shape[0]
+        if self.cache_size or self.__is_clusterless:
+            # Cache whole sequences, so that the entries can be shared
+            # with the other inference methods; clusterless emissions
+            # are computed by a pool of workers and are not worth
+            # splitting further.
+            chunk_size = n_samples
+        else:
+            chunk_size = SCORE_CHUNK_SIZE
+        log_transmat = log_mask_zero(self.transmat_)
+        fwdrow = None
+        for start in range(0, n_samples, chunk_size):
+            framelogprob = self._compute_log_likelihood_cached(
+                X[start:start + chunk_size])
+            if fwdrow is None:
+                fwdrow = log_mask_zero(self.startprob_) + framelogprob[0]
+                framelogprob = framelogprob[1:]
+            _hmmc._forward_update(len(framelogprob), self.n_components,
+                                  log_transmat, framelogprob, fwdrow)
+        with np.errstate(under="ignore"):
+            return logsumexp(fwdrow)
+
     def _do_backward_pass(self, framelogprob):
         n_samples, n_components = framelogprob.shape
         bwdlattice = np.zeros((n_samples, n_components))
@@ -595,9 +1500,100 @@ class _BaseHMM(BaseEstimator):
             raise ValueError("rows of transmat_ must sum to 1.0 (got {})"
                              .format(self.transmat_.sum(axis=1)))
 
+    def _project_params(self):
+        """Projects model parameters back onto their domain.
+
+        Used after extrapolating the parameters during accelerated EM,
+        which can e.g. produce negative probabilities. Subclasses should
+        project their emission parameters.
+        """
+        self.startprob_ = _utils._project_stochastic(self.startprob_)
+        self.transmat_ = _utils._project_stochastic(self.transmat_)
+
+    def _compute_log_likelihood_cached(self, X):
+        """Computes per-component log probability under the model,
+        memoized in a LRU cache of ``cache_size`` entries.
+
+        The returned array may be shared between calls and must not be
+        modified.
+        """
+        if not self.cache_size:
+            return self._compute_log_likelihood(X)
+
+        if X.dtype == object:
+            # Clusterless samples are identified by their elements, which
+            # the cache entry keeps alive.
+            key = X.tobytes(), X.shape
+        elif sparse.issparse(X):
+            X = X.tocsr()
+            digest = hashlib.sha1(X.data)
+            digest.update(X.indices)
+            digest.update(X.indptr)
+            key = digest.digest(), X.shape, X.dtype.str
+        else:
+            key = (hashlib.sha1(np.ascontiguousarray(X)).digest(),
+                   X.shape, X.dtype.str)
+        # Bypass __setattr__, which clears the cache.
+        cache = self.__dict__.setdefault("_loglik_cache", OrderedDict())
+        if key in cache:
+            cache.move_to_end(key)
+            framelogprob, _X = cache[key]
+            return framelogprob
+
+        framelogprob = self._compute_log_likelihood(X)
+        cache[key] = framelogprob, X if X.dtype == object else None
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return framelogprob
+
+    def _freeze_log_likelihood(self):
+        """Returns a function computing per-component log probability
+        under the current parameters, with all parameter-dependent terms
+        precomputed.
+
+        The model is not modified after this call, so the default
+        implementation simply returns :meth:`_compute_log_likelihood`.
+        """
+        return self._compute_log_likelihood
+
+    def _freeze_encoding(self):
+        """Returns a function mapping samples, possibly wrapped in a
+        :class:`~hmmlearn.utils.Sequences`, to those the model computes
+        with, or ``None`` if the samples are used as they are.
+        """
+        return None
+
+    def _compute_emission_terms(self, X):
+        """Computes per-component log probability under the model for
+        the E-step, along with intermediate terms of the emission
+        statistics.
+
+        Subclasses whose statistics reuse terms of the log probability,
+        e.g. the densities of mixture components, can return them here
+        rather than compute them twice. They are passed as
+        ``emission_terms`` to :meth:`_accumulate_sufficient_statistics`
+        and :meth:`_accumulate_emission_statistics` for the same ``X``,
+        and are never stored on the model. Subclasses which do not
+        override this method need not accept ``emission_terms``.
+
+        Returns
+        -------
+        logprob : array, shape (n_samples, n_components)
+            Log probability of each sample in ``X`` for each of the
+            model states, as returned by :meth:`_compute_log_likelihood`.
+
+        emission_terms : object
+            Intermediate terms, ``None`` by default.
+        """
+        return self._compute_log_likelihood(X), None
+
     def _compute_log_likelihood(self, X):
         """Computes per-component log probability under the model.
 
+        The samples are evaluated independently of each other: ``X`` can
+        be a chunk of a sequence, as in :meth:`score`, or several
+        sequences concatenated, as when fitting with ``batch_size``.
+
         Parameters
         ----------
         X : array-like, shape (n_samples, n_features)
@@ -636,7 +1632,8 @@ class _BaseHMM(BaseEstimator):
 
         The method is *pure*, meaning that it doesn't change the state of
         the instance.  For extensibility computed statistics are stored
-        in a dictionary.
+        in a :class:`SufficientStatistics` dictionary, to which subclasses
+        add their emission statistics.
 
         Returns
         -------
@@ -653,15 +1650,22 @@ class _BaseHMM(BaseEstimator):
             posterior probability of transitioning between the i-th to j-th
             states.
         """
-        stats = {'nobs': 0,
-                 'start': np.zeros(self.n_components),
-                 'trans': np.zeros((self.n_components, self.n_components))}
+        stats = SufficientStatistics(
+            nobs=0,
+            start=np.zeros(self.n_components),
+            trans=np.zeros((self.n_components, self.n_components)))
         return stats
 
     def _accumulate_sufficient_statistics(self, stats, X, framelogprob,
-                                          posteriors, fwdlattice, bwdlattice):
+                                          posteriors, fwdlattice, bwdlattice,
+                                          emission_terms=None):
         """Updates sufficient statistics from a given sample.
 
+        The start and transition statistics are updated here; the
+        emission statistics are delegated to
+        :meth:`_accumulate_emission_statistics`, which subclasses should
+        override instead of this method.
+
         Parameters
         ----------
         stats : dict
@@ -679,25 +1683,78 @@ class _BaseHMM(BaseEstimator):
             of the model states.
 
         fwdlattice, bwdlattice : array, shape (n_samples, n_components)
-            Log-forward and log-backward probabilities.
+            Log-forward and log-backward probabilities. ``None`` when
+            training with the Viterbi algorithm, in which case
+            ``posteriors`` are one-hot encodings of the Viterbi path.
+
+        emission_terms : object, optional
+            Intermediate terms returned by :meth:`_compute_emission_terms`
+            for ``X``, if any.
         """
         stats['nobs'] += 1
         if 's' in self.params:
             stats['start'] += posteriors[0]
         if 't' in self.params:
-            n_samples, n_components = framelogprob.shape
-            # when the sample is of length 1, it contains no transitions
-            # so there is no reason to update our trans. matrix estimate
-            if n_samples <= 1:
-                return
-
-            log_xi_sum = np.full((n_components, n_components), -np.inf)
-            _hmmc._compute_log_xi_sum(n_samples, n_components, fwdlattice,
-                                      log_mask_zero(self.transmat_),
-                                      bwdlattice, framelogprob,
-                                      log_xi_sum)
-            with np.errstate(under="ignore"):
-                stats['trans'] += np.exp(log_xi_sum)
+            self._accumulate_transition_statistics(
+                stats, framelogprob, fwdlattice, bwdlattice, posteriors)
+        args = (stats, X, framelogprob, posteriors)
+        if emission_terms is not None:
+            args += (emission_terms,)
+        self._accumulate_emission_statistics(*args)
+
+    def _accumulate_transition_statistics(self, stats, framelogprob,
+                                          fwdlattice, bwdlattice, posteriors):
+        """Updates the transition statistics from a given sequence."""
+        n_samples, n_components = framelogprob.shape
+        # when the sample is of length 1, it contains no transitions
+        # so there is no reason to update our trans. matrix estimate
+        if n_samples <= 1:
+            return
+
+        if fwdlattice is None:
+            # Hard assignments, count the transitions along the path.
+            stats['trans'] += np.dot(posteriors[:-1].T, posteriors[1:])
+            return
+
+        log_xi_sum = np.full((n_components, n_components), -np.inf)
+        _hmmc._compute_log_xi_sum(n_samples, n_components, fwdlattice,
+                                  log_mask_zero(self.transmat_),
+                                  bwdlattice, framelogprob, log_xi_sum)
+        with np.errstate(under="ignore"):
+            stats['trans'] += np.exp(log_xi_sum)
+
+    def _accumulate_emission_statistics(self, stats, X, framelogprob,
+                                        posteriors, emission_terms=None):
+        """Updates the emission statistics from a chunk of samples.
+
+        Emission statistics are sums over the samples, so the chunk can
+        be any set of samples: a sequence, a part of one or several
+        sequences concatenated, as when fitting with ``batch_size``.
+        Implementations should therefore not depend on the sequence
+        boundaries nor on the order of the samples.
+
+        Parameters
+        ----------
+        stats : dict
+            Sufficient statistics as returned by
+            :meth:`~base._BaseHMM._initialize_sufficient_statistics`.
+
+        X : array, shape (n_samples, n_features)
+            Chunk of samples.
+
+        framelogprob : array, shape (n_samples, n_components)
+            Log-probabilities of each sample under each of the model
+            states, as returned by :meth:`_compute_log_likelihood` for
+            ``X``.
+
+        posteriors : array, shape (n_samples, n_components)
+            Posterior probabilities of each sample being generated by each
+            of the model states.
+
+        emission_terms : object, optional
+            Intermediate terms returned by :meth:`_compute_emission_terms`
+            for ``X``, if any.
+        """
 
     def _do_mstep(self, stats):
         """Performs the M-step of EM algorithm.
@@ -716,6 +1773,161 @@ class _BaseHMM(BaseEstimator):
             normalize(self.startprob_)
         if 't' in self.params:
             transmat_ = self.transmat_prior - 1.0 + stats['trans']
-            self.transmat_ = np.where(self.transmat_ == 0.0,
-                                      self.transmat_, transmat_)
+            transmat_ = np.where(self.transmat_ == 0.0,
+                                 self.transmat_, transmat_)
+            # States which are never left, e.g. which are on no Viterbi
+            # path, keep their transition probabilities.
+            self.transmat_ = _utils._keep_unvisited(
+                transmat_, self.transmat_, transmat_.sum(axis=1))
             normalize(self.transmat_, axis=1)
+
+
+def _read_only(a):
+    a = np.array(a, dtype=float)
+    a.flags.writeable = False
+    return a
+
+
+class FrozenHMM(object):
+    r"""Immutable HMM predictor returned by :meth:`_BaseHMM.freeze`.
+
+    Parameters
+    ----------
+    model : _BaseHMM
+        Fitted model. It is validated once and copied, so that later
+        changes to it do not affect the predictor.
+
+    Attributes
+    ----------
+    n_components : int
+        Number of states in the model.
+
+    startprob\_ : array, shape (n_components, )
+        Initial state occupation distribution.
+
+    transmat\_ : array, shape (n_components, n_components)
+        Matrix of transition probabilities between states.
+    """
+    __slots__ = ("n_components", "algorithm", "startprob_", "transmat_",
+                 "_log_startprob", "_log_transmat", "_log_likelihood",
+                 "_encode", "_is_clusterless")
+
+    def __init__(self, model):
+        check_is_fitted(model, "startprob_")
+        model = copy.deepcopy(model)
+        model._check()
+        init = super(FrozenHMM, self).__setattr__
+        init("n_components", model.n_components)
+        init("algorithm", model.algorithm)
+        init("startprob_", _read_only(model.startprob_))
+        init("transmat_", _read_only(model.transmat_))
+        init("_log_startprob", _read_only(log_mask_zero(model.startprob_)))
+        init("_log_transmat", _read_only(log_mask_zero(model.transmat_)))
+        init("_log_likelihood", model._freeze_log_likelihood())
+        init("_encode", model._freeze_encoding())
+        init("_is_clusterless", model._BaseHMM__is_clusterless)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            "{} is immutable".format(self.__class__.__name__))
+
+    __delattr__ = __setattr__
+
+    def _check_sequences(self, X, lengths):
+        if self._encode is not None:
+            X = self._encode(X)
+        if isinstance(X, Sequences):
+            if lengths is not None:
+                raise ValueError(
+                    "lengths must be None when X is a Sequences")
+            X, lengths = X.data, X
+        if not (self._is_clusterless or sparse.issparse(X)):
+            X = np.asarray(X)
+        return X, lengths
+
+    def _framelogprobs(self, X, lengths):
+        for i, j in iter_from_X_lengths(X, lengths):
+            yield i, j, self._log_likelihood(X[i:j])
+
+    def _posteriors(self, framelogprob):
+        n_samples, n_components = framelogprob.shape
+        fwdlattice = np.empty((n_samples, n_components))
+        _hmmc._forward(n_samples, n_components, self._log_startprob,
+                       self._log_transmat, framelogprob, fwdlattice)
+        bwdlattice = np.empty((n_samples, n_components))
+        _hmmc._backward(n_samples, n_components, self._log_startprob,
+                        self._log_transmat, framelogprob, bwdlattice)
+        log_gamma = fwdlattice + bwdlattice
+        log_normalize(log_gamma, axis=1)
+        with np.errstate(under="ignore"):
+            return logsumexp(fwdlattice[-1]), np.exp(log_gamma)
+
+    def score(self, X, lengths=None):
+        """Compute the log probability under the model.
+
+        See :meth:`_BaseHMM.score`.
+        """
+        X, lengths = self._check_sequences(X, lengths)
+        logprob = 0
+        for i, j, framelogprob in self._framelogprobs(X, lengths):
+            fwdrow = self._log_startprob + framelogprob[0]
+            _hmmc._forward_update(j - i - 1, self.n_components,
+                                  self._log_transmat, framelogprob[1:],
+                                  fwdrow)
+            with np.errstate(under="ignore"):
+                logprob += logsumexp(fwdrow)
+        return logprob
+
+    def score_samples(self, X, lengths=None):
+        """Compute the log probability under the model and compute
+        posteriors.
+
+        See :meth:`_BaseHMM.score_samples`.
+        """
+        X, lengths = self._check_sequences(X, lengths)
+        logprob = 0
+        posteriors = np.empty((X.shape[0], self.n_components))
+        for i, j, framelogprob in self._framelogprobs(X, lengths):
+            logprobij, posteriors[i:j] = self._posteriors(framelogprob)
+            logprob += logprobij
+        return logprob, posteriors
+
+    def decode(self, X, lengths=None, algorithm=None):
+        """Find most likely state sequence corresponding to ``X``.
+
+        See :meth:`_BaseHMM.decode`.
+        """
+        algorithm = algorithm or self.algorithm
+        if algorithm not in DECODER_ALGORITHMS:
+            raise ValueError("Unknown decoder {!r}".format(algorithm))
+
+        X, lengths = self._check_sequences(X, lengths)
+        logprob = 0
+        state_sequence = np.empty(X.shape[0], dtype=int)
+        for i, j, framelogprob in self._framelogprobs(X, lengths):
+            if algorithm == "viterbi":
+                state_sequence[i:j], logprobij = _hmmc._viterbi(
+                    j - i, self.n_components, self._log_startprob,
+                    self._log_transmat, framelogprob)
+            else:
+                _, posteriors = self._posteriors(framelogprob)
+                state_sequence[i:j] = np.argmax(posteriors, axis=1)
+                logprobij = np.log(np.max(posteriors, axis=1)).sum()
+            logprob += logprobij
+        return logprob, state_sequence
+
+    def predict(self, X, lengths=None):
+        """Find most likely state sequence corresponding to ``X``.
+
+        See :meth:`_BaseHMM.predict`.
+        """
+        _, state_sequence = self.decode(X, lengths)
+        return state_sequence
+
+    def predict_proba(self, X, lengths=None):
+        """Compute the posterior probability for each state in the model.
+
+        See :meth:`_BaseHMM.predict_proba`.
+        """
+        _, posteriors = self.score_samples(X, lengths)
+        return posteriors
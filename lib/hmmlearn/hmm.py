@@ -15,22 +15,28 @@ The :mod:`hmmlearn.hmm` module implements hidden Markov models.
 
 import numpy as np
 import sys
+from scipy import sparse
 from scipy.special import logsumexp, digamma, polygamma
-from sklearn import cluster
 from sklearn.utils import check_random_state
-from scipy.stats import multivariate_normal
 
 from . import _utils
 from .stats import (log_multivariate_normal_density,
                     log_multivariate_poisson_density,
+                    _precompute_log_multivariate_normal_density,
+                    _precompute_log_multivariate_poisson_density,
+                    _sum_log_factorial,
+                    _cholesky_precompute,
+                    _log_multivariate_normal_density_cholesky,
                     log_marked_poisson_density,
                     mp_log_marked_poisson_density)
 from .base import _BaseHMM
-from .utils import iter_from_X_lengths, normalize, fill_covars
+from .utils import (Sequences, Vocabulary, normalize, fill_covars,
+                    log_mask_zero)
 
 __all__ = ["GMMHMM",
            "GaussianHMM",
            "MultinomialHMM",
+           "MultiStreamMultinomialHMM",
            "PoissonHMM",
            "MarkedPoissonHMM",
            "MultiprobeMarkedPoissonHMM"]
@@ -39,6 +45,15 @@ COVARIANCE_TYPES = frozenset(("spherical", "diag", "full", "tied"))
 MIN_LIKELIHOOD = 1e-300
 MIN_LOGLIKELIHOOD = -700
 
+#: Maximum number of entries of the weighted samples held in memory at once
+#: while accumulating the outer products of full and tied
+#: :class:`GaussianHMM`.
+GAUSSIAN_STATS_CHUNK_SIZE = 2 ** 16
+
+#: Maximum number of products of deviations per mixture component held
+#: in memory at once while accumulating the statistics of :class:`GMMHMM`.
+GMM_STATS_CHUNK_SIZE = 2 ** 16
+
 class GaussianHMM(_BaseHMM):
     """Hidden Markov Model with Gaussian emissions.
 
@@ -115,6 +130,43 @@ class GaussianHMM(_BaseHMM):
         startprob, 't' for transmat, 'm' for means and 'c' for covars.
         Defaults to all parameters.
 
+    n_init : int, optional
+        Number of differently seeded initializations to perform. The
+        restarts are fitted in parallel worker processes and the one with
+        the best log probability is kept. Defaults to 1.
+
+    acceleration : string, optional
+        EM acceleration method. If "squarem", every two EM steps are
+        followed by a SQUAREM extrapolation, which is discarded if it
+        does not improve log probability. Defaults to ``None``, i.e.
+        plain EM.
+
+    profile : bool or callable, optional
+        If true, per-phase timings of every EM iteration are recorded in
+        :attr:`fit_profile_`. If callable, it is additionally called with
+        each iteration's record. Defaults to ``False``.
+
+    max_time : float, optional
+        Time budget of :meth:`fit` in seconds. Defaults to ``None``, i.e.
+        no time limit.
+
+    callback : callable, optional
+        Called after every EM iteration as
+        ``callback(iter_time, logprob, history)``. If it returns a true
+        value, EM is stopped and the best parameters found so far are
+        kept.
+
+    cache_size : int, optional
+        Number of emission log-likelihood matrices memoized across
+        :meth:`score`, :meth:`decode` and related methods. The cache is
+        cleared whenever a parameter is assigned. Defaults to 0, i.e. no
+        caching.
+
+    batch_size : int, optional
+        If set, sequences sorted by length are processed in padded
+        buckets of up to ``batch_size`` sequences with vectorized
+        forward, backward and Viterbi passes. Defaults to ``None``.
+
     Attributes
     ----------
     n_features : int
@@ -149,6 +201,8 @@ class GaussianHMM(_BaseHMM):
     ...                             #doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
     GaussianHMM(algorithm='viterbi',...
     """
+    _derived_attributes = _BaseHMM._derived_attributes + ("_cholesky_terms",)
+
     def __init__(self, n_components=1, covariance_type='diag',
                  min_covar=1e-3,
                  startprob_prior=1.0, transmat_prior=1.0,
@@ -156,13 +210,18 @@ class GaussianHMM(_BaseHMM):
                  covars_prior=1e-2, covars_weight=1,
                  algorithm="viterbi", random_state=None,
                  n_iter=10, tol=1e-2, verbose=False,
-                 params="stmc", init_params="stmc"):
+                 params="stmc", init_params="stmc", n_init=1,
+                 acceleration=None, profile=False, max_time=None,
+                 callback=None, cache_size=0, batch_size=None):
         _BaseHMM.__init__(self, n_components,
                           startprob_prior=startprob_prior,
                           transmat_prior=transmat_prior, algorithm=algorithm,
                           random_state=random_state, n_iter=n_iter,
                           tol=tol, params=params, verbose=verbose,
-                          init_params=init_params)
+                          init_params=init_params, n_init=n_init,
+                          acceleration=acceleration, profile=profile,
+                          max_time=max_time, callback=callback,
+                          cache_size=cache_size, batch_size=batch_size)
 
         self.covariance_type = covariance_type
         self.min_covar = min_covar
@@ -194,6 +253,11 @@ class GaussianHMM(_BaseHMM):
         _utils._validate_covars(self._covars_, self.covariance_type,
                                 self.n_components)
 
+    def _project_params(self):
+        super(GaussianHMM, self)._project_params()
+        self._covars_ = _utils._project_covars(
+            self._covars_, self.covariance_type, self.min_covar)
+
     def _init(self, X, lengths=None):
         super(GaussianHMM, self)._init(X, lengths=lengths)
 
@@ -204,6 +268,7 @@ class GaussianHMM(_BaseHMM):
 
         self.n_features = n_features
         if 'm' in self.init_params or not hasattr(self, "means_"):
+            from sklearn import cluster
             kmeans = cluster.KMeans(n_clusters=self.n_components,
                                     random_state=self.random_state)
             kmeans.fit(X)
@@ -217,9 +282,33 @@ class GaussianHMM(_BaseHMM):
                     cv, self.covariance_type, self.n_components).copy()
 
     def _compute_log_likelihood(self, X):
+        if self.covariance_type in ('full', 'tied'):
+            return _log_multivariate_normal_density_cholesky(
+                X, *self._get_cholesky_terms())
         return log_multivariate_normal_density(
             X, self.means_, self._covars_, self.covariance_type)
 
+    def _get_cholesky_terms(self):
+        # The Cholesky factors of the precisions are computed once per
+        # change of the parameters, e.g. once per M-step. Comparing the
+        # parameters also catches in-place modifications, and is cheap
+        # compared to the factorization.
+        cached = self.__dict__.get("_cholesky_terms")
+        if (cached is not None
+                and np.array_equal(cached[0], self.means_)
+                and np.array_equal(cached[1], self._covars_)):
+            return cached[2]
+        terms = _cholesky_precompute(
+            self.means_, self._covars_, self.covariance_type)
+        # Bypass __setattr__, which clears derived attributes.
+        self.__dict__["_cholesky_terms"] = (
+            np.array(self.means_), np.array(self._covars_), terms)
+        return terms
+
+    def _freeze_log_likelihood(self):
+        return _precompute_log_multivariate_normal_density(
+            self.means_, self._covars_, self.covariance_type)
+
     def _generate_sample_from_state(self, state, random_state=None):
         random_state = check_random_state(random_state)
         return random_state.multivariate_normal(
@@ -236,11 +325,8 @@ class GaussianHMM(_BaseHMM):
                                            self.n_features))
         return stats
 
-    def _accumulate_sufficient_statistics(self, stats, obs, framelogprob,
-                                          posteriors, fwdlattice, bwdlattice):
-        super(GaussianHMM, self)._accumulate_sufficient_statistics(
-            stats, obs, framelogprob, posteriors, fwdlattice, bwdlattice)
-
+    def _accumulate_emission_statistics(self, stats, obs, framelogprob,
+                                        posteriors):
         if 'm' in self.params or 'c' in self.params:
             stats['post'] += posteriors.sum(axis=0)
             stats['obs'] += np.dot(posteriors.T, obs)
@@ -249,10 +335,18 @@ class GaussianHMM(_BaseHMM):
             if self.covariance_type in ('spherical', 'diag'):
                 stats['obs**2'] += np.dot(posteriors.T, obs ** 2)
             elif self.covariance_type in ('tied', 'full'):
-                # posteriors: (nt, nc); obs: (nt, nf); obs: (nt, nf)
-                # -> (nc, nf, nf)
-                stats['obs*obs.T'] += np.einsum(
-                    'ij,ik,il->jkl', posteriors, obs, obs)
+                # sum_t posteriors[t, c] * outer(obs[t], obs[t]) is the
+                # product of sqrt(posteriors[:, c]) * obs with itself,
+                # which BLAS computes as a symmetric rank-k update.
+                n_samples, n_features = obs.shape
+                chunk_size = max(1, GAUSSIAN_STATS_CHUNK_SIZE // n_features)
+                sqrt_posteriors = np.sqrt(posteriors)
+                for start in range(0, n_samples, chunk_size):
+                    chunk = obs[start:start + chunk_size]
+                    for c in range(self.n_components):
+                        weighted = (sqrt_posteriors[start:start + chunk_size,
+                                                    c, np.newaxis] * chunk)
+                        stats['obs*obs.T'][c] += weighted.T @ weighted
 
     def _do_mstep(self, stats):
         super(GaussianHMM, self)._do_mstep(stats)
@@ -266,10 +360,16 @@ class GaussianHMM(_BaseHMM):
         # p. 443 - 445
         denom = stats['post'][:, np.newaxis]
         if 'm' in self.params:
-            self.means_ = ((means_weight * means_prior + stats['obs'])
-                           / (means_weight + denom))
+            # States with no samples, e.g. on no Viterbi path, keep their
+            # parameters.
+            with np.errstate(invalid="ignore"):
+                means = ((means_weight * means_prior + stats['obs'])
+                         / (means_weight + denom))
+            self.means_ = _utils._keep_unvisited(
+                means, self.means_, stats['post'])
 
         if 'c' in self.params:
+            old_covars = self._covars_
             covars_prior = self.covars_prior
             covars_weight = self.covars_weight
             meandiff = self.means_ - means_prior
@@ -287,24 +387,27 @@ class GaussianHMM(_BaseHMM):
                         self._covars_.mean(1)[:, np.newaxis],
                         (1, self._covars_.shape[1]))
             elif self.covariance_type in ('tied', 'full'):
-                cv_num = np.empty((self.n_components, self.n_features,
-                                  self.n_features))
-                for c in range(self.n_components):
-                    obsmean = np.outer(stats['obs'][c], self.means_[c])
-
-                    cv_num[c] = (means_weight * np.outer(meandiff[c],
-                                                         meandiff[c])
-                                 + stats['obs*obs.T'][c]
-                                 - obsmean - obsmean.T
-                                 + np.outer(self.means_[c], self.means_[c])
-                                 * stats['post'][c])
+                # Batched outer products, of shape
+                # (n_components, n_features, n_features).
+                obsmean = stats['obs'][:, :, None] * self.means_[:, None, :]
+                cv_num = (means_weight
+                          * meandiff[:, :, None] * meandiff[:, None, :]
+                          + stats['obs*obs.T']
+                          - obsmean - obsmean.transpose(0, 2, 1)
+                          + self.means_[:, :, None] * self.means_[:, None, :]
+                          * stats['post'][:, None, None])
                 cvweight = max(covars_weight - self.n_features, 0)
                 if self.covariance_type == 'tied':
                     self._covars_ = ((covars_prior + cv_num.sum(axis=0)) /
                                      (cvweight + stats['post'].sum()))
                 elif self.covariance_type == 'full':
-                    self._covars_ = ((covars_prior + cv_num) /
-                                     (cvweight + stats['post'][:, None, None]))
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        self._covars_ = (
+                            (covars_prior + cv_num)
+                            / (cvweight + stats['post'][:, None, None]))
+            if self.covariance_type != 'tied':
+                self._covars_ = _utils._keep_unvisited(
+                    self._covars_, old_covars, stats['post'])
 
 
 class MultinomialHMM(_BaseHMM):
@@ -355,6 +458,57 @@ class MultinomialHMM(_BaseHMM):
         startprob, 't' for transmat, 'e' for emissionprob.
         Defaults to all parameters.
 
+    n_init : int, optional
+        Number of differently seeded initializations to perform. The
+        restarts are fitted in parallel worker processes and the one with
+        the best log probability is kept. Defaults to 1.
+
+    acceleration : string, optional
+        EM acceleration method. If "squarem", every two EM steps are
+        followed by a SQUAREM extrapolation, which is discarded if it
+        does not improve log probability. Defaults to ``None``, i.e.
+        plain EM.
+
+    profile : bool or callable, optional
+        If true, per-phase timings of every EM iteration are recorded in
+        :attr:`fit_profile_`. If callable, it is additionally called with
+        each iteration's record. Defaults to ``False``.
+
+    max_time : float, optional
+        Time budget of :meth:`fit` in seconds. Defaults to ``None``, i.e.
+        no time limit.
+
+    callback : callable, optional
+        Called after every EM iteration as
+        ``callback(iter_time, logprob, history)``. If it returns a true
+        value, EM is stopped and the best parameters found so far are
+        kept.
+
+    cache_size : int, optional
+        Number of emission log-likelihood matrices memoized across
+        :meth:`score`, :meth:`decode` and related methods. The cache is
+        cleared whenever a parameter is assigned. Defaults to 0, i.e. no
+        caching.
+
+    batch_size : int, optional
+        If set, sequences sorted by length are processed in padded
+        buckets of up to ``batch_size`` sequences with vectorized
+        forward, backward and Viterbi passes. Defaults to ``None``.
+
+    n_top_symbols : int, optional
+        If set, only the ``n_top_symbols`` most probable symbols of each
+        state are stored, and all other symbols share the remaining
+        probability mass equally. This keeps large vocabularies tractable.
+        Defaults to ``None``, i.e. a dense emission matrix.
+
+    vocabulary : Vocabulary or array-like, optional
+        Symbols emitted by the model. If given, samples are symbols of the
+        vocabulary, e.g. strings, rather than integers from
+        ``range(n_features)``, and ``n_features`` is the size of the
+        vocabulary. Samples encoded with
+        :meth:`~hmmlearn.utils.Vocabulary.encode_sequences` are used as
+        they are. Defaults to ``None``.
+
     Attributes
     ----------
     n_features : int
@@ -369,8 +523,25 @@ class MultinomialHMM(_BaseHMM):
     startprob\_ : array, shape (n_components, )
         Initial state occupation distribution.
 
-    emissionprob\_ : array, shape (n_components, n_features)
-        Probability of emitting a given symbol when in each state.
+    emissionprob\_ : array
+        Probability of emitting a given symbol when in each state, or,
+        if ``n_top_symbols`` is set, probability of emitting each of
+        :attr:`emission_symbols_`.
+
+        The shape depends on ``n_top_symbols``::
+
+            (n_components, n_features)     if None,
+            (n_components, n_top)          otherwise,
+
+        where ``n_top = min(n_top_symbols, n_features)``.
+
+    emission_symbols\_ : array, shape (n_components, n_top)
+        Most probable symbols of each state, by decreasing probability.
+        Only set if ``n_top_symbols`` is set.
+
+    emission_floor\_ : array, shape (n_components, )
+        Probability of emitting each symbol missing from
+        :attr:`emission_symbols_`. Only set if ``n_top_symbols`` is set.
 
     Examples
     --------
@@ -379,22 +550,70 @@ class MultinomialHMM(_BaseHMM):
                                  #doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
     MultinomialHMM(algorithm='viterbi',...)
     """
+    _derived_attributes = (_BaseHMM._derived_attributes
+                           + ("_log_emissionprob",))
+
     # TODO: accept the prior on emissionprob_ for consistency.
     def __init__(self, n_components=1,
                  startprob_prior=1.0, transmat_prior=1.0,
                  algorithm="viterbi", random_state=None,
                  n_iter=10, tol=1e-2, verbose=False,
-                 params="ste", init_params="ste"):
+                 params="ste", init_params="ste", n_init=1, acceleration=None,
+                 profile=False, max_time=None, callback=None, cache_size=0,
+                 batch_size=None, n_top_symbols=None, vocabulary=None):
         _BaseHMM.__init__(self, n_components,
                           startprob_prior=startprob_prior,
                           transmat_prior=transmat_prior,
                           algorithm=algorithm,
                           random_state=random_state,
                           n_iter=n_iter, tol=tol, verbose=verbose,
-                          params=params, init_params=init_params)
+                          params=params, init_params=init_params,
+                          n_init=n_init, acceleration=acceleration,
+                          profile=profile, max_time=max_time,
+                          callback=callback, cache_size=cache_size,
+                          batch_size=batch_size)
+        self.n_top_symbols = n_top_symbols
+        self.vocabulary = vocabulary
+
+    def _get_vocabulary(self):
+        if self.vocabulary is None or isinstance(self.vocabulary, Vocabulary):
+            return self.vocabulary
+        return Vocabulary(self.vocabulary)
+
+    def _check_sequences(self, X, lengths):
+        X = self._encode_sequences(X, self._get_vocabulary())
+        return super(MultinomialHMM, self)._check_sequences(X, lengths)
+
+    def _encode_sequences(self, X, vocabulary):
+        encoded = getattr(X, "vocabulary", None)
+        if encoded is not None:
+            if vocabulary is None or not (
+                    encoded is vocabulary
+                    or np.array_equal(encoded.symbols, vocabulary.symbols)):
+                raise ValueError("samples are encoded with a different "
+                                 "vocabulary than the model's")
+        elif vocabulary is not None:
+            if isinstance(X, Sequences):
+                X = Sequences(vocabulary.encode(X.data), X.lengths)
+            else:
+                X = vocabulary.encode(X)
+        return X
+
+    def _freeze_encoding(self):
+        vocabulary = self._get_vocabulary()
+
+        def encode(X):
+            return self._encode_sequences(X, vocabulary)
+
+        return encode
 
     def _init(self, X, lengths=None):
-        if not self._check_input_symbols(X):
+        vocabulary = self._get_vocabulary()
+        if vocabulary is not None:
+            # The samples were encoded by _check_sequences, which also
+            # validated them.
+            self.n_features = len(vocabulary)
+        elif not self._check_input_symbols(X):
             raise ValueError("expected a sample from "
                              "a Multinomial distribution.")
 
@@ -403,51 +622,246 @@ class MultinomialHMM(_BaseHMM):
 
         if 'e' in self.init_params:
             if not hasattr(self, "n_features"):
-                symbols = set()
-                for i, j in iter_from_X_lengths(X, lengths):
-                    symbols |= set(X[i:j].flatten())
-                self.n_features = len(symbols)
-            self.emissionprob_ = self.random_state \
-                .rand(self.n_components, self.n_features)
-            normalize(self.emissionprob_, axis=1)
+                # All symbols from zero to the maximum occur in X.
+                self.n_features = int(X.max()) + 1
+            if self.n_top_symbols is None:
+                self.emissionprob_ = self.random_state \
+                    .rand(self.n_components, self.n_features)
+                normalize(self.emissionprob_, axis=1)
+            else:
+                # Start from the most frequent symbols, with random
+                # probabilities.
+                counts = np.bincount(X[:, 0], minlength=self.n_features)
+                n_top = min(self.n_top_symbols, self.n_features)
+                n_rest = self.n_features - n_top
+                top_symbols = np.argsort(-counts, kind="stable")[:n_top]
+                probs = self.random_state.rand(self.n_components, n_top + 1)
+                probs[:, -1] *= n_rest > 0
+                normalize(probs, axis=1)
+                self.emission_symbols_ = np.tile(
+                    top_symbols, (self.n_components, 1))
+                self.emissionprob_ = probs[:, :-1]
+                self.emission_floor_ = probs[:, -1] / max(n_rest, 1)
 
     def _check(self):
         super(MultinomialHMM, self)._check()
+        # The emission parameters may have been modified in place.
+        self.__dict__.pop("_log_emissionprob", None)
+
+        vocabulary = self._get_vocabulary()
+        if vocabulary is not None:
+            self.n_features = len(vocabulary)
 
         self.emissionprob_ = np.atleast_2d(self.emissionprob_)
-        n_features = getattr(self, "n_features", self.emissionprob_.shape[1])
-        if self.emissionprob_.shape != (self.n_components, n_features):
+        if self.n_top_symbols is None:
+            n_features = getattr(self, "n_features",
+                                 self.emissionprob_.shape[1])
+            if self.emissionprob_.shape != (self.n_components, n_features):
+                raise ValueError(
+                    "emissionprob_ must have shape "
+                    "(n_components, n_features)")
+            else:
+                self.n_features = n_features
+            return
+
+        if not hasattr(self, "n_features"):
+            raise ValueError("n_features must be set if n_top_symbols is")
+        n_top = min(self.n_top_symbols, self.n_features)
+        if (self.emissionprob_.shape != (self.n_components, n_top)
+                or np.shape(self.emission_symbols_)
+                != (self.n_components, n_top)):
+            raise ValueError(
+                "emissionprob_ and emission_symbols_ must have shape "
+                "(n_components, min(n_top_symbols, n_features))")
+        if np.shape(self.emission_floor_) != (self.n_components,):
             raise ValueError(
-                "emissionprob_ must have shape (n_components, n_features)")
+                "emission_floor_ must have shape (n_components, )")
+
+    def _project_params(self):
+        super(MultinomialHMM, self)._project_params()
+        if self.n_top_symbols is None:
+            self.emissionprob_ = _utils._project_stochastic(
+                self.emissionprob_)
+        else:
+            n_rest = self.n_features - self.emissionprob_.shape[1]
+            probs = _utils._project_stochastic(np.column_stack(
+                [self.emissionprob_, self.emission_floor_ * n_rest]))
+            self.emissionprob_ = probs[:, :-1]
+            self.emission_floor_ = probs[:, -1] / max(n_rest, 1)
+
+    def _get_extrapolated_params(self, params0, params1, params2):
+        names = super(MultinomialHMM,
+                      self)._get_extrapolated_params(params0, params1, params2)
+        if self.n_top_symbols is not None and not (
+                np.array_equal(params0["emission_symbols_"],
+                               params1["emission_symbols_"])
+                and np.array_equal(params1["emission_symbols_"],
+                                   params2["emission_symbols_"])):
+            # The kept probabilities are of different symbols.
+            names = [name for name in names
+                     if name not in ("emissionprob_", "emission_floor_")]
+        return names
+
+    def _get_log_emissionprob(self):
+        # The log-probabilities are computed once per change of the
+        # parameters rather than once per sequence. For pruned emissions,
+        # they are a sparse (n_features, n_components) matrix holding the
+        # kept symbols, and the log floor of each state.
+        cached = self.__dict__.get("_log_emissionprob")
+        if cached is not None:
+            return cached
+        if self.n_top_symbols is None:
+            cached = np.ascontiguousarray(log_mask_zero(self.emissionprob_).T)
         else:
-            self.n_features = n_features
+            n_components, n_top = self.emissionprob_.shape
+            # Stored zeros, i.e. symbols of probability one, are kept by
+            # the conversion and by row indexing.
+            log_top = sparse.csr_matrix(
+                (log_mask_zero(self.emissionprob_).ravel(),
+                 (self.emission_symbols_.ravel(),
+                  np.repeat(np.arange(n_components), n_top))),
+                shape=(self.n_features, n_components))
+            cached = log_top, log_mask_zero(self.emission_floor_)
+        # Bypass __setattr__, which clears derived attributes.
+        self.__dict__["_log_emissionprob"] = cached
+        return cached
+
+    @staticmethod
+    def _lookup_log_emissionprob(log_emissionprob, symbols):
+        if isinstance(log_emissionprob, np.ndarray):
+            return log_emissionprob[symbols]
+        log_top, log_floor = log_emissionprob
+        framelogprob = np.tile(log_floor, (len(symbols), 1))
+        top = log_top[symbols].tocoo()
+        framelogprob[top.row, top.col] = top.data
+        return framelogprob
 
     def _compute_log_likelihood(self, X):
-        return np.log(self.emissionprob_)[:, np.concatenate(X)].T
+        return self._lookup_log_emissionprob(
+            self._get_log_emissionprob(), X[:, 0])
+
+    def _freeze_log_likelihood(self):
+        log_emissionprob = self._get_log_emissionprob()
+
+        def compute_log_likelihood(X):
+            return self._lookup_log_emissionprob(log_emissionprob, X[:, 0])
+
+        return compute_log_likelihood
+
+    def sample(self, n_samples=1, random_state=None):
+        """Generate random samples from the model.
+
+        Parameters
+        ----------
+        n_samples : int
+            Number of samples to generate.
+
+        random_state : RandomState or an int seed
+            A random number generator instance. If ``None``, the object's
+            ``random_state`` is used.
+
+        Returns
+        -------
+        X : array, shape (n_samples, 1)
+            Emitted symbols, from the vocabulary if one is set.
+
+        state_sequence : array, shape (n_samples, )
+            State sequence produced by the model.
+        """
+        X, state_sequence = super(MultinomialHMM, self).sample(
+            n_samples, random_state=random_state)
+        vocabulary = self._get_vocabulary()
+        if vocabulary is not None:
+            X = vocabulary.decode(X)
+        return X, state_sequence
 
     def _generate_sample_from_state(self, state, random_state=None):
         cdf = np.cumsum(self.emissionprob_[state, :])
         random_state = check_random_state(random_state)
-        return [(cdf > random_state.rand()).argmax()]
+        if self.n_top_symbols is None:
+            return [(cdf > random_state.rand()).argmax()]
+
+        n_rest = self.n_features - len(cdf)
+        u = random_state.rand()
+        if u < cdf[-1] or not n_rest:
+            return [self.emission_symbols_[state, (cdf > u).argmax()]]
+        # Draw uniformly among the symbols which were not kept.
+        symbol = random_state.randint(n_rest)
+        for top_symbol in np.sort(self.emission_symbols_[state]):
+            if top_symbol <= symbol:
+                symbol += 1
+        return [symbol]
 
     def _initialize_sufficient_statistics(self):
         stats = super(MultinomialHMM, self)._initialize_sufficient_statistics()
-        stats['obs'] = np.zeros((self.n_components, self.n_features))
+        if self.n_top_symbols is None:
+            stats['obs'] = np.zeros((self.n_components, self.n_features))
+        else:
+            stats['obs'] = sparse.csr_matrix(
+                (self.n_components, self.n_features))
         return stats
 
-    def _accumulate_sufficient_statistics(self, stats, X, framelogprob,
-                                          posteriors, fwdlattice, bwdlattice):
-        super(MultinomialHMM, self)._accumulate_sufficient_statistics(
-            stats, X, framelogprob, posteriors, fwdlattice, bwdlattice)
-        if 'e' in self.params:
-            for t, symbol in enumerate(np.concatenate(X)):
-                stats['obs'][:, symbol] += posteriors[t]
+    def _accumulate_emission_statistics(self, stats, X, framelogprob,
+                                        posteriors):
+        if 'e' not in self.params:
+            return
+        symbols = X[:, 0]
+        if self.n_top_symbols is None:
+            for i in range(self.n_components):
+                stats['obs'][i] += np.bincount(
+                    symbols, weights=posteriors[:, i],
+                    minlength=self.n_features)
+        else:
+            # Only the observed symbols are stored; duplicates are summed.
+            n_samples, n_components = posteriors.shape
+            stats['obs'] = stats['obs'] + sparse.csr_matrix(
+                (posteriors.T.ravel(),
+                 (np.repeat(np.arange(n_components), n_samples),
+                  np.tile(symbols, n_components))),
+                shape=stats['obs'].shape)
 
     def _do_mstep(self, stats):
         super(MultinomialHMM, self)._do_mstep(stats)
-        if 'e' in self.params:
-            self.emissionprob_ = (stats['obs']
-                                  / stats['obs'].sum(axis=1)[:, np.newaxis])
+        if 'e' not in self.params:
+            return
+        if self.n_top_symbols is None:
+            obs_sum = stats['obs'].sum(axis=1)
+            with np.errstate(invalid="ignore"):
+                emissionprob = stats['obs'] / obs_sum[:, np.newaxis]
+            self.emissionprob_ = _utils._keep_unvisited(
+                emissionprob, self.emissionprob_, obs_sum)
+            return
+
+        # Keep the most probable symbols of each state; the other symbols
+        # share the remaining probability mass.
+        obs = stats['obs'].tocsr()
+        n_top = min(self.n_top_symbols, self.n_features)
+        n_rest = self.n_features - n_top
+        emission_symbols = np.empty((self.n_components, n_top), dtype=int)
+        emissionprob = np.zeros((self.n_components, n_top))
+        emission_floor = np.zeros(self.n_components)
+        for i in range(self.n_components):
+            start, end = obs.indptr[i], obs.indptr[i + 1]
+            symbols, counts = obs.indices[start:end], obs.data[start:end]
+            total = counts.sum()
+            if not total > 0:
+                # No samples, e.g. on no Viterbi path, keep the old ones.
+                emission_symbols[i] = self.emission_symbols_[i]
+                emissionprob[i] = self.emissionprob_[i]
+                emission_floor[i] = self.emission_floor_[i]
+                continue
+            top = np.argsort(-counts, kind="stable")[:n_top]
+            # Pad with unobserved symbols, of probability zero.
+            padding = np.setdiff1d(np.arange(n_top), symbols)
+            emission_symbols[i] = np.concatenate(
+                [symbols[top], padding[:n_top - len(top)]])
+            emissionprob[i, :len(top)] = counts[top] / total
+            if n_rest:
+                emission_floor[i] = max(
+                    (total - counts[top].sum()) / total / n_rest, 0)
+        self.emission_symbols_ = emission_symbols
+        self.emissionprob_ = emissionprob
+        self.emission_floor_ = emission_floor
 
     def _check_input_symbols(self, X):
         """Check if ``X`` is a sample from a Multinomial distribution.
@@ -459,13 +873,280 @@ class MultinomialHMM(_BaseHMM):
         For example ``[0, 0, 2, 1, 3, 1, 1]`` is a valid sample from a
         Multinomial distribution, while ``[0, 0, 3, 5, 10]`` is not.
         """
-        symbols = np.concatenate(X)
+        symbols = np.ravel(X)
         if (len(symbols) == 1                                # not enough data
             or not np.issubdtype(symbols.dtype, np.integer)  # not an integer
             or (symbols < 0).any()):                         # not positive
             return False
-        u = np.unique(symbols)
-        return u[0] == 0 and u[-1] == len(u) - 1
+        # Every integer up to the maximum must occur, which requires at
+        # least as many samples and is checked in linear time.
+        return (symbols.max() < len(symbols)
+                and np.bincount(symbols.astype(np.intp)).all())
+
+
+class MultiStreamMultinomialHMM(_BaseHMM):
+    r"""Hidden Markov Model with several independent multinomial (discrete)
+    emissions per sample.
+
+    Each column of a sample is a symbol of its own stream, and the streams
+    are independent given the state, so that the number of parameters is
+    linear in the total number of symbols rather than in the size of
+    their Cartesian product.
+
+    Parameters
+    ----------
+
+    n_components : int
+        Number of states.
+
+    startprob_prior : array, shape (n_components, ), optional
+        Parameters of the Dirichlet prior distribution for
+        :attr:`startprob_`.
+
+    transmat_prior : array, shape (n_components, n_components), optional
+        Parameters of the Dirichlet prior distribution for each row
+        of the transition probabilities :attr:`transmat_`.
+
+    algorithm : string, optional
+        Decoder algorithm. Must be one of "viterbi" or "map".
+        Defaults to "viterbi".
+
+    random_state: RandomState or an int seed, optional
+        A random number generator instance.
+
+    n_iter : int, optional
+        Maximum number of iterations to perform.
+
+    tol : float, optional
+        Convergence threshold. EM will stop if the gain in log-likelihood
+        is below this value.
+
+    verbose : bool, optional
+        When ``True`` per-iteration convergence reports are printed
+        to :data:`sys.stderr`. You can diagnose convergence via the
+        :attr:`monitor_` attribute.
+
+    params : string, optional
+        Controls which parameters are updated in the training
+        process.  Can contain any combination of 's' for startprob,
+        't' for transmat, 'e' for emissionprob.
+        Defaults to all parameters.
+
+    init_params : string, optional
+        Controls which parameters are initialized prior to
+        training.  Can contain any combination of 's' for
+        startprob, 't' for transmat, 'e' for emissionprob.
+        Defaults to all parameters.
+
+    n_init : int, optional
+        Number of differently seeded initializations to perform. The
+        restarts are fitted in parallel worker processes and the one with
+        the best log probability is kept. Defaults to 1.
+
+    acceleration : string, optional
+        EM acceleration method. If "squarem", every two EM steps are
+        followed by a SQUAREM extrapolation, which is discarded if it
+        does not improve log probability. Defaults to ``None``, i.e.
+        plain EM.
+
+    profile : bool or callable, optional
+        If true, per-phase timings of every EM iteration are recorded in
+        :attr:`fit_profile_`. If callable, it is additionally called with
+        each iteration's record. Defaults to ``False``.
+
+    max_time : float, optional
+        Time budget of :meth:`fit` in seconds. Defaults to ``None``, i.e.
+        no time limit.
+
+    callback : callable, optional
+        Called after every EM iteration as
+        ``callback(iter_time, logprob, history)``. If it returns a true
+        value, EM is stopped and the best parameters found so far are
+        kept.
+
+    cache_size : int, optional
+        Number of emission log-likelihood matrices memoized across
+        :meth:`score`, :meth:`decode` and related methods. The cache is
+        cleared whenever a parameter is assigned. Defaults to 0, i.e. no
+        caching.
+
+    batch_size : int, optional
+        If set, sequences sorted by length are processed in padded
+        buckets of up to ``batch_size`` sequences with vectorized
+        forward, backward and Viterbi passes. Defaults to ``None``.
+
+    Attributes
+    ----------
+    n_features : array, shape (n_streams, )
+        Number of possible symbols of each stream.
+
+    monitor\_ : ConvergenceMonitor
+        Monitor object used to check the convergence of EM.
+
+    transmat\_ : array, shape (n_components, n_components)
+        Matrix of transition probabilities between states.
+
+    startprob\_ : array, shape (n_components, )
+        Initial state occupation distribution.
+
+    emissionprob\_ : array, shape (n_components, sum(n_features))
+        Probability of emitting a given symbol when in each state, for
+        all streams side by side: the probabilities of stream ``j`` are
+        the columns ``offsets[j]:offsets[j + 1]``, where ``offsets`` is
+        the cumulative sum of ``[0] + list(n_features)``.
+
+    Examples
+    --------
+    >>> from hmmlearn.hmm import MultiStreamMultinomialHMM
+    >>> MultiStreamMultinomialHMM(n_components=2)
+                                 #doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
+    MultiStreamMultinomialHMM(algorithm='viterbi',...)
+    """
+    _derived_attributes = (_BaseHMM._derived_attributes
+                           + ("_log_emissionprob",))
+
+    def __init__(self, n_components=1,
+                 startprob_prior=1.0, transmat_prior=1.0,
+                 algorithm="viterbi", random_state=None,
+                 n_iter=10, tol=1e-2, verbose=False,
+                 params="ste", init_params="ste", n_init=1, acceleration=None,
+                 profile=False, max_time=None, callback=None, cache_size=0,
+                 batch_size=None):
+        _BaseHMM.__init__(self, n_components,
+                          startprob_prior=startprob_prior,
+                          transmat_prior=transmat_prior,
+                          algorithm=algorithm,
+                          random_state=random_state,
+                          n_iter=n_iter, tol=tol, verbose=verbose,
+                          params=params, init_params=init_params,
+                          n_init=n_init, acceleration=acceleration,
+                          profile=profile, max_time=max_time,
+                          callback=callback, cache_size=cache_size,
+                          batch_size=batch_size)
+
+    def _get_offsets(self):
+        # Start of each stream in the columns of emissionprob_, followed
+        # by the total number of symbols.
+        return np.concatenate([[0], np.cumsum(self.n_features)])
+
+    def _check_sequences(self, X, lengths):
+        X, lengths = super(MultiStreamMultinomialHMM, self)._check_sequences(
+            X, lengths)
+        if not np.issubdtype(X.dtype, np.integer) or (X < 0).any():
+            raise ValueError("expected non-negative integer symbols")
+        if hasattr(self, "n_features"):
+            n_features = np.asarray(self.n_features)
+            if X.shape[1] != len(n_features):
+                raise ValueError("expected {:d} streams, got {:d}"
+                                 .format(len(n_features), X.shape[1]))
+            if (X >= n_features).any():
+                raise ValueError("symbols exceed n_features")
+        return X, lengths
+
+    def _init(self, X, lengths=None):
+        super(MultiStreamMultinomialHMM, self)._init(X, lengths=lengths)
+        self.random_state = check_random_state(self.random_state)
+
+        if 'e' in self.init_params:
+            if not hasattr(self, "n_features"):
+                self.n_features = X.max(axis=0) + 1
+            offsets = self._get_offsets()
+            emissionprob = self.random_state.rand(
+                self.n_components, offsets[-1])
+            for start, end in zip(offsets[:-1], offsets[1:]):
+                normalize(emissionprob[:, start:end], axis=1)
+            self.emissionprob_ = emissionprob
+
+    def _check(self):
+        super(MultiStreamMultinomialHMM, self)._check()
+        # The emission parameters may have been modified in place.
+        self.__dict__.pop("_log_emissionprob", None)
+
+        self.n_features = np.asarray(self.n_features, dtype=int)
+        if self.n_features.ndim != 1 or (self.n_features < 1).any():
+            raise ValueError("n_features must be a 1D array of positive "
+                             "integers")
+        self.emissionprob_ = np.atleast_2d(self.emissionprob_)
+        if self.emissionprob_.shape != (self.n_components,
+                                        self.n_features.sum()):
+            raise ValueError(
+                "emissionprob_ must have shape "
+                "(n_components, sum(n_features))")
+
+    def _project_params(self):
+        super(MultiStreamMultinomialHMM, self)._project_params()
+        offsets = self._get_offsets()
+        self.emissionprob_ = np.hstack([
+            _utils._project_stochastic(self.emissionprob_[:, start:end])
+            for start, end in zip(offsets[:-1], offsets[1:])])
+
+    def _get_log_emissionprob(self):
+        # A (sum(n_features), n_components) table, computed once per
+        # change of the parameters rather than once per sequence.
+        cached = self.__dict__.get("_log_emissionprob")
+        if cached is None:
+            cached = np.ascontiguousarray(log_mask_zero(self.emissionprob_).T)
+            # Bypass __setattr__, which clears derived attributes.
+            self.__dict__["_log_emissionprob"] = cached
+        return cached
+
+    @staticmethod
+    def _lookup_log_emissionprob(log_emissionprob, ids):
+        # Sum of the per-stream log-probabilities; ``ids`` are the symbols
+        # shifted by the offsets of their streams.
+        framelogprob = log_emissionprob[ids[:, 0]]
+        for j in range(1, ids.shape[1]):
+            framelogprob += log_emissionprob[ids[:, j]]
+        return framelogprob
+
+    def _compute_log_likelihood(self, X):
+        return self._lookup_log_emissionprob(
+            self._get_log_emissionprob(), X + self._get_offsets()[:-1])
+
+    def _freeze_log_likelihood(self):
+        log_emissionprob = self._get_log_emissionprob()
+        offsets = self._get_offsets()[:-1]
+
+        def compute_log_likelihood(X):
+            return self._lookup_log_emissionprob(
+                log_emissionprob, X + offsets)
+
+        return compute_log_likelihood
+
+    def _generate_sample_from_state(self, state, random_state=None):
+        random_state = check_random_state(random_state)
+        offsets = self._get_offsets()
+        return [
+            (np.cumsum(self.emissionprob_[state, start:end])
+             > random_state.rand()).argmax()
+            for start, end in zip(offsets[:-1], offsets[1:])]
+
+    def _initialize_sufficient_statistics(self):
+        stats = super(MultiStreamMultinomialHMM,
+                      self)._initialize_sufficient_statistics()
+        stats['obs'] = np.zeros((self.n_components, self.n_features.sum()))
+        return stats
+
+    def _accumulate_emission_statistics(self, stats, X, framelogprob,
+                                        posteriors):
+        if 'e' in self.params:
+            n_streams = X.shape[1]
+            ids = (X + self._get_offsets()[:-1]).ravel()
+            for i in range(self.n_components):
+                stats['obs'][i] += np.bincount(
+                    ids, weights=np.repeat(posteriors[:, i], n_streams),
+                    minlength=stats['obs'].shape[1])
+
+    def _do_mstep(self, stats):
+        super(MultiStreamMultinomialHMM, self)._do_mstep(stats)
+        if 'e' in self.params:
+            stream_sums = np.add.reduceat(
+                stats['obs'], self._get_offsets()[:-1], axis=1)
+            with np.errstate(invalid="ignore"):
+                emissionprob = stats['obs'] / np.repeat(
+                    stream_sums, self.n_features, axis=1)
+            self.emissionprob_ = _utils._keep_unvisited(
+                emissionprob, self.emissionprob_, stream_sums[:, 0])
 
 
 class GMMHMM(_BaseHMM):
@@ -551,6 +1232,43 @@ class GMMHMM(_BaseHMM):
         means, and 'c' for covars, and 'w' for GMM mixing weights.
         Defaults to all parameters.
 
+    n_init : int, optional
+        Number of differently seeded initializations to perform. The
+        restarts are fitted in parallel worker processes and the one with
+        the best log probability is kept. Defaults to 1.
+
+    acceleration : string, optional
+        EM acceleration method. If "squarem", every two EM steps are
+        followed by a SQUAREM extrapolation, which is discarded if it
+        does not improve log probability. Defaults to ``None``, i.e.
+        plain EM.
+
+    profile : bool or callable, optional
+        If true, per-phase timings of every EM iteration are recorded in
+        :attr:`fit_profile_`. If callable, it is additionally called with
+        each iteration's record. Defaults to ``False``.
+
+    max_time : float, optional
+        Time budget of :meth:`fit` in seconds. Defaults to ``None``, i.e.
+        no time limit.
+
+    callback : callable, optional
+        Called after every EM iteration as
+        ``callback(iter_time, logprob, history)``. If it returns a true
+        value, EM is stopped and the best parameters found so far are
+        kept.
+
+    cache_size : int, optional
+        Number of emission log-likelihood matrices memoized across
+        :meth:`score`, :meth:`decode` and related methods. The cache is
+        cleared whenever a parameter is assigned. Defaults to 0, i.e. no
+        caching.
+
+    batch_size : int, optional
+        If set, sequences sorted by length are processed in padded
+        buckets of up to ``batch_size`` sequences with vectorized
+        forward, backward and Viterbi passes. Defaults to ``None``.
+
     Attributes
     ----------
     monitor\_ : ConvergenceMonitor
@@ -586,13 +1304,19 @@ class GMMHMM(_BaseHMM):
                  algorithm="viterbi", covariance_type="diag",
                  random_state=None, n_iter=10, tol=1e-2,
                  verbose=False, params="stmcw",
-                 init_params="stmcw"):
+                 init_params="stmcw", n_init=1, acceleration=None,
+                 profile=False, max_time=None, callback=None, cache_size=0,
+                 batch_size=None):
         _BaseHMM.__init__(self, n_components,
                           startprob_prior=startprob_prior,
                           transmat_prior=transmat_prior,
                           algorithm=algorithm, random_state=random_state,
                           n_iter=n_iter, tol=tol, verbose=verbose,
-                          params=params, init_params=init_params)
+                          params=params, init_params=init_params,
+                          n_init=n_init, acceleration=acceleration,
+                          profile=profile, max_time=max_time,
+                          callback=callback, cache_size=cache_size,
+                          batch_size=batch_size)
         self.covariance_type = covariance_type
         self.min_covar = min_covar
         self.n_mix = n_mix
@@ -611,6 +1335,8 @@ class GMMHMM(_BaseHMM):
         self._init_covar_priors()
         self._fix_priors_shape()
 
+        from sklearn import cluster
+
         main_kmeans = cluster.KMeans(n_clusters=self.n_components,
                                      random_state=self.random_state)
         labels = main_kmeans.fit_predict(X)
@@ -726,7 +1452,7 @@ class GMMHMM(_BaseHMM):
             raise ValueError("covariance_type must be one of {}"
                              .format(COVARIANCE_TYPES))
 
-        self.weights_ = np.array(self.weights_)
+        self.weights_ = np.asarray(self.weights_)
         # Checking mixture weights' shape
         if self.weights_.shape != (self.n_components, self.n_mix):
             raise ValueError("mixture weights must have shape "
@@ -739,7 +1465,7 @@ class GMMHMM(_BaseHMM):
             raise ValueError("mixture weights must sum up to 1")
 
         # Checking means' shape
-        self.means_ = np.array(self.means_)
+        self.means_ = np.asarray(self.means_)
         if self.means_.shape != (self.n_components, self.n_mix,
                                  self.n_features):
             raise ValueError("mixture means must have shape "
@@ -747,7 +1473,7 @@ class GMMHMM(_BaseHMM):
                              "actual shape: {}".format(self.means_.shape))
 
         # Checking covariances' shape
-        self.covars_ = np.array(self.covars_)
+        self.covars_ = np.asarray(self.covars_)
         covars_shape = self.covars_.shape
         needed_shapes = {
             "spherical": (self.n_components, self.n_mix),
@@ -787,6 +1513,12 @@ class GMMHMM(_BaseHMM):
                             "component {} must be symmetric, positive-definite"
                             .format(j, i))
 
+    def _project_params(self):
+        super(GMMHMM, self)._project_params()
+        self.weights_ = _utils._project_stochastic(self.weights_)
+        self.covars_ = _utils._project_covars(
+            self.covars_, self.covariance_type, self.min_covar)
+
     def _generate_sample_from_state(self, state, random_state=None):
         if random_state is None:
             random_state = self.random_state
@@ -806,72 +1538,114 @@ class GMMHMM(_BaseHMM):
             self.means_[state, i_gauss], covs[state]
         )
 
-    def _compute_log_weighted_gaussian_densities(self, X, i_comp):
-        cur_means = self.means_[i_comp]
-        cur_covs = self.covars_[i_comp]
-        if self.covariance_type == 'spherical':
-            cur_covs = cur_covs[:, np.newaxis]
-        log_cur_weights = np.log(self.weights_[i_comp])
+    def _compute_log_weighted_gaussian_densities(self, X):
+        """Computes the weighted log densities of all mixture components.
 
-        return log_multivariate_normal_density(
-            X, cur_means, cur_covs, self.covariance_type
-        ) + log_cur_weights
+        All ``n_components * n_mix`` Gaussians are evaluated at once; tied
+        covariances are factorized once per state.
 
-    def _compute_log_likelihood(self, X):
+        Returns
+        -------
+        log_denses : array, shape (n_samples, n_components, n_mix)
+            Log densities of the samples under each mixture component,
+            plus the log mixture weights.
+        """
         n_samples, _ = X.shape
-        res = np.zeros((n_samples, self.n_components))
-
-        for i in range(self.n_components):
-            log_denses = self._compute_log_weighted_gaussian_densities(X, i)
-            with np.errstate(under="ignore"):
-                res[:, i] = logsumexp(log_denses, axis=1)
+        n_gauss = self.n_components * self.n_mix
+        means = self.means_.reshape(n_gauss, self.n_features)
+        if self.covariance_type == 'tied':
+            _, prec_chol, log_norm = _cholesky_precompute(
+                self.means_[:, 0], self.covars_, 'full')
+            log_denses = _log_multivariate_normal_density_cholesky(
+                X, means, np.repeat(prec_chol, self.n_mix, axis=0),
+                np.repeat(log_norm, self.n_mix))
+        else:
+            covars = self.covars_.reshape(
+                (n_gauss,) + self.covars_.shape[2:])
+            log_denses = log_multivariate_normal_density(
+                X, means, covars, self.covariance_type)
+        return (log_denses.reshape(n_samples, self.n_components, self.n_mix)
+                + log_mask_zero(self.weights_))
+
+    def _compute_emission_terms(self, X):
+        # The weighted densities are reused for the statistics.
+        log_denses = self._compute_log_weighted_gaussian_densities(X)
+        with np.errstate(under="ignore"):
+            framelogprob = logsumexp(log_denses, axis=2)
+        return framelogprob, log_denses
 
-        return res
+    def _compute_log_likelihood(self, X):
+        framelogprob, _log_denses = self._compute_emission_terms(X)
+        return framelogprob
 
     def _initialize_sufficient_statistics(self):
         stats = super(GMMHMM, self)._initialize_sufficient_statistics()
-        stats['n_samples'] = 0
-        stats['post_comp_mix'] = None
         stats['post_mix_sum'] = np.zeros((self.n_components, self.n_mix))
         stats['post_sum'] = np.zeros(self.n_components)
-        stats['samples'] = None
-        stats['centered'] = None
+        # Weighted sums of the samples and of the outer products of their
+        # deviations from the current means (summed over the mixtures for
+        # 'tied', squares for 'diag', squared norms for 'spherical'), so
+        # that memory does not grow with the number of samples.
+        stats['m_n'] = np.zeros((self.n_components, self.n_mix,
+                                 self.n_features))
+        stats['c_n'] = np.zeros({
+            "full": (self.n_components, self.n_mix,
+                     self.n_features, self.n_features),
+            "tied": (self.n_components, self.n_features, self.n_features),
+            "diag": (self.n_components, self.n_mix, self.n_features),
+            "spherical": (self.n_components, self.n_mix),
+        }[self.covariance_type])
         return stats
 
-    def _accumulate_sufficient_statistics(self, stats, X, framelogprob,
-                                          post_comp, fwdlattice, bwdlattice):
-
-        # TODO: support multiple frames
-
-        super(GMMHMM, self)._accumulate_sufficient_statistics(
-            stats, X, framelogprob, post_comp, fwdlattice, bwdlattice
-        )
-
+    def _accumulate_emission_statistics(self, stats, X, framelogprob,
+                                        post_comp, emission_terms=None):
         n_samples, _ = X.shape
 
-        stats['n_samples'] = n_samples
-        stats['samples'] = X
-
-        prob_mix = np.zeros((n_samples, self.n_components, self.n_mix))
-        for p in range(self.n_components):
-            log_denses = self._compute_log_weighted_gaussian_densities(X, p)
-            with np.errstate(under="ignore"):
-                prob_mix[:, p, :] = np.exp(log_denses) + np.finfo(np.float).eps
+        log_denses = emission_terms
+        if log_denses is None:
+            log_denses = self._compute_log_weighted_gaussian_densities(X)
+        with np.errstate(under="ignore"):
+            prob_mix = np.exp(log_denses) + np.finfo(float).eps
 
         prob_mix_sum = np.sum(prob_mix, axis=2)
         post_mix = prob_mix / prob_mix_sum[:, :, np.newaxis]
         post_comp_mix = post_comp[:, :, np.newaxis] * post_mix
-        stats['post_comp_mix'] = post_comp_mix
 
-        stats['post_mix_sum'] = np.sum(post_comp_mix, axis=0)
-        stats['post_sum'] = np.sum(post_comp, axis=0)
+        stats['post_mix_sum'] += np.sum(post_comp_mix, axis=0)
+        stats['post_sum'] += np.sum(post_comp, axis=0)
+        stats['m_n'] += np.einsum('ijk,il->jkl', post_comp_mix, X)
 
-        stats['centered'] = X[:, np.newaxis, np.newaxis, :] - self.means_
+        # The deviations are multiplied before weighting, so that features
+        # with zero variance get exactly zero covariances.
+        if self.covariance_type in ('full', 'tied'):
+            n_products = self.n_features ** 2
+        else:
+            n_products = self.n_features
+        chunk_size = max(1, GMM_STATS_CHUNK_SIZE // n_products)
+        for start in range(0, n_samples, chunk_size):
+            end = start + chunk_size
+            post = post_comp_mix[start:end]
+            centered = X[start:end, np.newaxis, np.newaxis, :] - self.means_
+            if self.covariance_type == 'full':
+                centered_dots = (centered[..., :, np.newaxis]
+                                 * centered[..., np.newaxis, :])
+                stats['c_n'] += np.einsum('ijk,ijklm->jklm',
+                                          post, centered_dots)
+            elif self.covariance_type == 'tied':
+                centered_dots = (centered[..., :, np.newaxis]
+                                 * centered[..., np.newaxis, :])
+                stats['c_n'] += np.einsum('ijk,ijklm->jlm',
+                                          post, centered_dots)
+            elif self.covariance_type == 'diag':
+                stats['c_n'] += np.einsum('ijk,ijkl->jkl',
+                                          post, centered ** 2)
+            elif self.covariance_type == 'spherical':
+                stats['c_n'] += np.einsum('ijk,ijk->jk', post,
+                                          np.sum(centered ** 2, axis=-1))
 
     def _do_mstep(self, stats):
         super(GMMHMM, self)._do_mstep(stats)
 
-        n_samples = stats['n_samples']
         n_features = self.n_features
 
         # Maximizing weights
@@ -880,29 +1654,20 @@ class GMMHMM(_BaseHMM):
         new_weights_denom = (
             stats['post_sum'] + np.sum(alphas_minus_one, axis=1)
         )[:, np.newaxis]
-        new_weights = new_weights_numer / new_weights_denom
+        with np.errstate(invalid="ignore"):
+            new_weights = new_weights_numer / new_weights_denom
 
         # Maximizing means
         lambdas, mus = self.means_weight, self.means_prior
-        new_means_numer = np.einsum(
-            'ijk,il->jkl',
-            stats['post_comp_mix'], stats['samples']
-        ) + lambdas[:, :, np.newaxis] * mus
+        new_means_numer = stats['m_n'] + lambdas[:, :, np.newaxis] * mus
         new_means_denom = (stats['post_mix_sum'] + lambdas)[:, :, np.newaxis]
-        new_means = new_means_numer / new_means_denom
+        with np.errstate(invalid="ignore"):
+            new_means = new_means_numer / new_means_denom
 
         # Maximizing covariances
         centered_means = self.means_ - mus
 
         if self.covariance_type == 'full':
-            centered = stats['centered'].reshape((
-                n_samples, self.n_components, self.n_mix, self.n_features, 1
-            ))
-            centered_t = stats['centered'].reshape((
-                n_samples, self.n_components, self.n_mix, 1, self.n_features
-            ))
-            centered_dots = centered * centered_t
-
             psis_t = np.transpose(self.covars_prior, axes=(0, 1, 3, 2))
             nus = self.covars_weight
 
@@ -914,44 +1679,35 @@ class GMMHMM(_BaseHMM):
             ))
             centered_means_dots = centr_means_resh * centr_means_resh_t
 
-            new_cov_numer = np.einsum(
-                'ijk,ijklm->jklm',
-                stats['post_comp_mix'], centered_dots
-            ) + psis_t + (lambdas[:, :, np.newaxis, np.newaxis] *
-                          centered_means_dots)
+            new_cov_numer = stats['c_n'] + psis_t + (
+                lambdas[:, :, np.newaxis, np.newaxis] * centered_means_dots)
             new_cov_denom = (
                 stats['post_mix_sum'] + 1 + nus + self.n_features + 1
             )[:, :, np.newaxis, np.newaxis]
 
             new_cov = new_cov_numer / new_cov_denom
         elif self.covariance_type == 'diag':
-            centered2 = stats['centered'] ** 2
             centered_means2 = centered_means ** 2
 
             alphas = self.covars_prior
             betas = self.covars_weight
 
-            new_cov_numer = np.einsum(
-                'ijk,ijkl->jkl',
-                stats['post_comp_mix'], centered2
-            ) + lambdas[:, :, np.newaxis] * centered_means2 + 2 * betas
+            new_cov_numer = (stats['c_n']
+                             + lambdas[:, :, np.newaxis] * centered_means2
+                             + 2 * betas)
             new_cov_denom = (
                 stats['post_mix_sum'][:, :, np.newaxis] + 1 + 2 * (alphas + 1)
             )
 
             new_cov = new_cov_numer / new_cov_denom
         elif self.covariance_type == 'spherical':
-            centered_norm2 = np.sum(stats['centered'] ** 2, axis=-1)
-
             alphas = self.covars_prior
             betas = self.covars_weight
 
             centered_means_norm2 = np.sum(centered_means ** 2, axis=-1)
 
-            new_cov_numer = np.einsum(
-                'ijk,ijk->jk',
-                stats['post_comp_mix'], centered_norm2
-            ) + lambdas * centered_means_norm2 + 2 * betas
+            new_cov_numer = (stats['c_n'] + lambdas * centered_means_norm2
+                             + 2 * betas)
             new_cov_denom = (
                 n_features * stats['post_mix_sum'] + n_features +
                 2 * (alphas + 1)
@@ -959,14 +1715,6 @@ class GMMHMM(_BaseHMM):
 
             new_cov = new_cov_numer / new_cov_denom
         elif self.covariance_type == 'tied':
-            centered = stats['centered'].reshape((
-                n_samples, self.n_components, self.n_mix, self.n_features, 1
-            ))
-            centered_t = stats['centered'].reshape((
-                n_samples, self.n_components, self.n_mix, 1, self.n_features
-            ))
-            centered_dots = centered * centered_t
-
             psis_t = np.transpose(self.covars_prior, axes=(0, 2, 1))
             nus = self.covars_weight
 
@@ -983,25 +1731,31 @@ class GMMHMM(_BaseHMM):
                 lambdas, centered_means_dots
             )
 
-            new_cov_numer = np.einsum(
-                'ijk,ijklm->jlm',
-                stats['post_comp_mix'], centered_dots
-            ) + lambdas_cmdots_prod_sum + psis_t
+            new_cov_numer = (stats['c_n'] + lambdas_cmdots_prod_sum
+                             + psis_t)
             new_cov_denom = (
                 stats['post_sum'] + self.n_mix + nus + self.n_features + 1
             )[:, np.newaxis, np.newaxis]
 
             new_cov = new_cov_numer / new_cov_denom
 
-        # Assigning new values to class members
-        self.weights_ = new_weights
-        self.means_ = new_means
-        self.covars_ = new_cov
+        # Assigning new values to class members. States with no samples,
+        # e.g. on no Viterbi path, keep their parameters.
+        self.weights_ = _utils._keep_unvisited(
+            new_weights, self.weights_, stats['post_sum'])
+        self.means_ = _utils._keep_unvisited(
+            new_means, self.means_, stats['post_sum'])
+        self.covars_ = _utils._keep_unvisited(
+            new_cov, self.covars_, stats['post_sum'])
 
 
 class PoissonHMM(_BaseHMM):
     """Hidden Markov Model with independent Poisson emissions.
 
+    The samples may be given as a :mod:`scipy.sparse` matrix, e.g. for
+    sparse spike counts, which is processed in CSR format without being
+    densified.
+
     Parameters
     ----------
     n_components : int
@@ -1033,6 +1787,36 @@ class PoissonHMM(_BaseHMM):
         training.  Can contain any combination of 's' for
         startprob, 't' for transmat, and 'm' for means.
         Defaults to all parameters.
+    n_init : int, optional
+        Number of differently seeded initializations to perform. The
+        restarts are fitted in parallel worker processes and the one with
+        the best log probability is kept. Defaults to 1.
+    acceleration : string, optional
+        EM acceleration method. If "squarem", every two EM steps are
+        followed by a SQUAREM extrapolation, which is discarded if it
+        does not improve log probability. Defaults to ``None``, i.e.
+        plain EM.
+    profile : bool or callable, optional
+        If true, per-phase timings of every EM iteration are recorded in
+        :attr:`fit_profile_`. If callable, it is additionally called with
+        each iteration's record. Defaults to ``False``.
+    max_time : float, optional
+        Time budget of :meth:`fit` in seconds. Defaults to ``None``, i.e.
+        no time limit.
+    callback : callable, optional
+        Called after every EM iteration as
+        ``callback(iter_time, logprob, history)``. If it returns a true
+        value, EM is stopped and the best parameters found so far are
+        kept.
+    cache_size : int, optional
+        Number of emission log-likelihood matrices memoized across
+        :meth:`score`, :meth:`decode` and related methods. The cache is
+        cleared whenever a parameter is assigned. Defaults to 0, i.e. no
+        caching.
+    batch_size : int, optional
+        If set, sequences sorted by length are processed in padded
+        buckets of up to ``batch_size`` sequences with vectorized
+        forward, backward and Viterbi passes. Defaults to ``None``.
 
     Attributes
     ----------
@@ -1055,19 +1839,25 @@ class PoissonHMM(_BaseHMM):
     ...                             #doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
     PoissonHMM(algorithm='viterbi',...)
     """
+    _accept_sparse = "csr"
 
     def __init__(self, n_components=1,
                  startprob_prior=1.0, transmat_prior=1.0,
                  means_prior=0, means_weight=0,
                  algorithm="viterbi", random_state=None,
                  n_iter=10, tol=1e-2, verbose=False,
-                 params="stm", init_params="stm"):
+                 params="stm", init_params="stm", n_init=1, acceleration=None,
+                 profile=False, max_time=None, callback=None, cache_size=0,
+                 batch_size=None):
         _BaseHMM.__init__(self, n_components,
                           startprob_prior=startprob_prior,
                           transmat_prior=transmat_prior, algorithm=algorithm,
                           random_state=random_state, n_iter=n_iter,
                           tol=tol, params=params, verbose=verbose,
-                          init_params=init_params)
+                          init_params=init_params, n_init=n_init,
+                          acceleration=acceleration, profile=profile,
+                          max_time=max_time, callback=callback,
+                          cache_size=cache_size, batch_size=batch_size)
 
         self.means_prior = means_prior
         self.means_weight = means_weight
@@ -1078,9 +1868,43 @@ class PoissonHMM(_BaseHMM):
         self.means_ = np.asarray(self.means_)
         self.n_features = self.means_.shape[1]
 
+    def _fit_em(self, X, lengths, n_iter, **kwargs):
+        # The log-factorial term of the density only depends on the
+        # samples, so that it is computed once for the training and
+        # validation samples instead of once per EM iteration. Keeping
+        # the samples referenced ensures that no other array can reuse
+        # their memory while the sequences are looked up by address.
+        self.__dict__["_log_factorials"] = [
+            (source, _sum_log_factorial(source))
+            for source in [X, kwargs.get("X_valid")]
+            if source is not None and not sparse.issparse(source)]
+        try:
+            return super(PoissonHMM, self)._fit_em(X, lengths, n_iter,
+                                                   **kwargs)
+        finally:
+            del self.__dict__["_log_factorials"]
+
     def _compute_log_likelihood(self, obs):
+        cache = self.__dict__.get("_log_factorials")
+        if cache is not None and not sparse.issparse(obs):
+            # Sparse sequences are copies; their log-factorial term is
+            # cheap anyway, as only non-zero counts contribute.
+            for source, log_factorial in cache:
+                bounds = _utils._row_bounds(obs, source)
+                if bounds is not None:
+                    start, end = bounds
+                    return log_multivariate_poisson_density(
+                        obs, self.means_,
+                        log_factorial=log_factorial[start:end])
         return log_multivariate_poisson_density(obs, self.means_)
 
+    def _freeze_log_likelihood(self):
+        return _precompute_log_multivariate_poisson_density(self.means_)
+
+    def _project_params(self):
+        super(PoissonHMM, self)._project_params()
+        self.means_ = np.maximum(self.means_, 1e-3)
+
     def _generate_sample_from_state(self, state, random_state=None):
         rng = check_random_state(random_state)
         return rng.poisson(self.means_[state])
@@ -1095,6 +1919,7 @@ class PoissonHMM(_BaseHMM):
 
         self.n_features = n_features
         if 'm' in self.init_params or not hasattr(self, "means_"):
+            from sklearn import cluster
             kmeans = cluster.KMeans(n_clusters=self.n_components,
                                     random_state=self.random_state)
             kmeans.fit(X)
@@ -1106,14 +1931,14 @@ class PoissonHMM(_BaseHMM):
         stats['obs'] = np.zeros((self.n_components, self.n_features))
         return stats
 
-    def _accumulate_sufficient_statistics(self, stats, obs, framelogprob,
-                                          posteriors, fwdlattice, bwdlattice):
-        super(PoissonHMM, self)._accumulate_sufficient_statistics(
-            stats, obs, framelogprob, posteriors, fwdlattice, bwdlattice)
-
+    def _accumulate_emission_statistics(self, stats, obs, framelogprob,
+                                        posteriors):
         if 'm' in self.params:
             stats['post'] += posteriors.sum(axis=0)
-            stats['obs'] += np.dot(posteriors.T, obs)
+            if sparse.issparse(obs):
+                stats['obs'] += (obs.T @ posteriors).T
+            else:
+                stats['obs'] += np.dot(posteriors.T, obs)
 
     def _do_mstep(self, stats):
         super(PoissonHMM, self)._do_mstep(stats)
@@ -1123,9 +1948,14 @@ class PoissonHMM(_BaseHMM):
 
         denom = stats['post'][:, np.newaxis]
         if 'm' in self.params:
-            self.means_ = ((means_weight * means_prior + stats['obs'])
-                           / (means_weight + denom))
-            self.means_ = np.where(self.means_ > 1e-3, self.means_, 1e-3)
+            with np.errstate(invalid="ignore"):
+                means = ((means_weight * means_prior + stats['obs'])
+                         / (means_weight + denom))
+            means = np.where(means > 1e-3, means, 1e-3)
+            # States with no samples, e.g. on no Viterbi path, keep their
+            # means.
+            self.means_ = _utils._keep_unvisited(
+                means, self.means_, stats['post'])
 
 class MarkedPoissonHMM(_BaseHMM):
     """Hidden Markov Model with independent Poisson emissions, where only marks
@@ -1188,6 +2018,10 @@ class MarkedPoissonHMM(_BaseHMM):
     Examples
     --------
     """
+    # The emission log probabilities also depend on the cluster
+    # parameters and on the sampling options.
+    _derived_from = ("cluster_means", "cluster_covars", "n_samples", "stype",
+                     "random_state", "reorder")
 
     def __init__(self, n_components=1, n_clusters=1,
                  cluster_means=None, cluster_covars=None, covariance_type='diag',
@@ -1196,13 +2030,18 @@ class MarkedPoissonHMM(_BaseHMM):
                  rate_prior=0, rate_weight=0,
                  algorithm="viterbi", random_state=None,
                  n_iter=10, n_samples=1e6, tol=1e-2, verbose=False,
-                 params="str", init_params="strc", stype='unbiased', reorder=False):
+                 params="str", init_params="strc", stype='unbiased', reorder=False,
+                 n_init=1, acceleration=None, profile=False, max_time=None,
+                 callback=None, cache_size=0, batch_size=None):
         _BaseHMM.__init__(self, n_components,
                           startprob_prior=startprob_prior,
                           transmat_prior=transmat_prior, algorithm=algorithm,
                           random_state=random_state, n_iter=n_iter,
                           tol=tol, params=params, verbose=verbose,
-                          init_params=init_params)
+                          init_params=init_params, n_init=n_init,
+                          acceleration=acceleration, profile=profile,
+                          max_time=max_time, callback=callback,
+                          cache_size=cache_size, batch_size=batch_size)
 
         self._BaseHMM__is_clusterless = True
 
@@ -1418,6 +2257,12 @@ class MarkedPoissonHMM(_BaseHMM):
                                           self.random_state,
                                           self.reorder)
 
+    def _project_params(self):
+        super(MarkedPoissonHMM, self)._project_params()
+        self.rate_ = np.maximum(self.rate_, 1e-3)
+        if self.rate_mode == 'relative':
+            self.rate_ = (self.rate_.T/np.sum(self.rate_, axis=1)).T
+
     def _generate_sample_from_state(self, state, random_state=None):
         raise NotImplementedError
 
@@ -1474,6 +2319,8 @@ class MarkedPoissonHMM(_BaseHMM):
 
     def _accumulate_sufficient_statistics(self, stats, obs, framelogprob,
                                           posteriors, fwdlattice, bwdlattice):
+        from scipy.stats import multivariate_normal
+
         super(MarkedPoissonHMM, self)._accumulate_sufficient_statistics(
             stats, obs, framelogprob, posteriors, fwdlattice, bwdlattice)
 
@@ -1537,9 +2384,12 @@ class MarkedPoissonHMM(_BaseHMM):
 
         denom = stats['post'][:, np.newaxis]
         if 'r' in self.params:
-            self.rate_ = ((rate_weight * rate_prior + stats['numerator'])
-                           / (rate_weight + denom))
-            self.rate_ = np.where(self.rate_ > 1e-3, self.rate_, 1e-3)
+            with np.errstate(invalid="ignore"):
+                rate = ((rate_weight * rate_prior + stats['numerator'])
+                        / (rate_weight + denom))
+            rate = np.where(rate > 1e-3, rate, 1e-3)
+            self.rate_ = _utils._keep_unvisited(
+                rate, self.rate_, stats['post'])
             if self.rate_mode == 'relative':
                 self.rate_ = (self.rate_.T/np.sum(self.rate_, axis=1)).T
 
@@ -1572,6 +2422,10 @@ class MultiprobeMarkedPoissonHMM(_BaseHMM):
     ugly, but I don't think we have much of a choice here. *variable number.
 
     """
+    # The emission log probabilities also depend on the cluster
+    # parameters and on the sampling options.
+    _derived_from = ("n_clusters", "cluster_means", "cluster_covars",
+                     "n_samples", "stype", "random_state", "reorder")
 
     def __init__(self, n_components=1, n_clusters=1,
                  cluster_means=None, cluster_covars=None, covariance_type='diag',
@@ -1580,13 +2434,18 @@ class MultiprobeMarkedPoissonHMM(_BaseHMM):
                  rate_prior=0, rate_weight=0,
                  algorithm="viterbi", random_state=None,
                  n_iter=10, n_samples=1e6, tol=1e-2, verbose=False,
-                 params="str", init_params="strc", stype='unbiased', reorder=False):
+                 params="str", init_params="strc", stype='unbiased', reorder=False,
+                 n_init=1, acceleration=None, profile=False, max_time=None,
+                 callback=None, cache_size=0, batch_size=None):
         _BaseHMM.__init__(self, n_components,
                           startprob_prior=startprob_prior,
                           transmat_prior=transmat_prior, algorithm=algorithm,
                           random_state=random_state, n_iter=n_iter,
                           tol=tol, params=params, verbose=verbose,
-                          init_params=init_params)
+                          init_params=init_params, n_init=n_init,
+                          acceleration=acceleration, profile=profile,
+                          max_time=max_time, callback=callback,
+                          cache_size=cache_size, batch_size=batch_size)
 
         self._BaseHMM__is_clusterless = True
 
@@ -1818,6 +2677,12 @@ class MultiprobeMarkedPoissonHMM(_BaseHMM):
                                           self.random_state,
                                           self.reorder)
 
+    def _project_params(self):
+        super(MultiprobeMarkedPoissonHMM, self)._project_params()
+        self.rate_ = np.maximum(self.rate_, 1e-3)
+        if self.rate_mode == 'relative':
+            self.rate_ = (self.rate_.T/np.sum(self.rate_, axis=1)).T
+
     def _generate_sample_from_state(self, state, random_state=None):
         raise NotImplementedError
 
@@ -1894,6 +2759,8 @@ class MultiprobeMarkedPoissonHMM(_BaseHMM):
 
     def _accumulate_sufficient_statistics(self, stats, obs, framelogprob,
                                           posteriors, fwdlattice, bwdlattice):
+        from scipy.stats import multivariate_normal
+
         super(MultiprobeMarkedPoissonHMM, self)._accumulate_sufficient_statistics(
             stats, obs, framelogprob, posteriors, fwdlattice, bwdlattice)
 
@@ -1960,8 +2827,11 @@ class MultiprobeMarkedPoissonHMM(_BaseHMM):
 
         denom = stats['post'][:, np.newaxis]
         if 'r' in self.params:
-            self.rate_ = ((rate_weight * rate_prior + stats['numerator'])
-                           / (rate_weight + denom))
-            self.rate_ = np.where(self.rate_ > 1e-3, self.rate_, 1e-3)
+            with np.errstate(invalid="ignore"):
+                rate = ((rate_weight * rate_prior + stats['numerator'])
+                        / (rate_weight + denom))
+            rate = np.where(rate > 1e-3, rate, 1e-3)
+            self.rate_ = _utils._keep_unvisited(
+                rate, self.rate_, stats['post'])
             if self.rate_mode == 'relative':
                 self.rate_ = (self.rate_.T/np.sum(self.rate_, axis=1)).T
\ No newline at end of file
@@ -1,7 +1,6 @@
 import numpy as np
-from scipy import linalg
+from scipy import sparse
 from scipy.special import logsumexp, gammaln
-from scipy.stats import multivariate_normal, poisson
 from sklearn.utils import check_random_state
 
 MIN_LIKELIHOOD = 1e-300
@@ -65,16 +64,33 @@ def _log_multivariate_normal_density_spherical(X, means, covars):
 
 def _log_multivariate_normal_density_tied(X, means, covars):
     """Compute Gaussian log-density at X for a tied model."""
-    cv = np.tile(covars, (means.shape[0], 1, 1))
-    return _log_multivariate_normal_density_full(X, means, cv)
+    return _log_multivariate_normal_density_cholesky(
+        X, *_cholesky_precompute(means, covars, 'tied'))
 
 
 def _log_multivariate_normal_density_full(X, means, covars, min_covar=1.e-7):
     """Log probability for full covariance matrices."""
-    n_samples, n_dim = X.shape
-    nmix = len(means)
-    log_prob = np.empty((n_samples, nmix))
-    for c, (mu, cv) in enumerate(zip(means, covars)):
+    return _log_multivariate_normal_density_cholesky(
+        X, *_cholesky_precompute(means, covars, 'full', min_covar))
+
+
+def _cholesky_precompute(means, covars, covariance_type='full',
+                         min_covar=1.e-7):
+    """Precompute the Cholesky terms of full or tied Gaussian densities.
+
+    Returns the means, the upper Cholesky factors of the precision
+    matrices and the log normalization constants. A tied covariance is
+    factorized once and yields a single factor.
+    """
+    from scipy import linalg
+
+    covars = np.asarray(covars, dtype=float)
+    if covariance_type == 'tied':
+        covars = covars[np.newaxis]
+    n_dim = covars.shape[-1]
+    prec_chol = np.empty_like(covars)
+    log_norm = np.empty(len(covars))
+    for c, cv in enumerate(covars):
         try:
             cv_chol = linalg.cholesky(cv, lower=True)
         except linalg.LinAlgError:
@@ -86,29 +102,122 @@ def _log_multivariate_normal_density_full(X, means, covars, min_covar=1.e-7):
             except linalg.LinAlgError:
                 raise ValueError("'covars' must be symmetric, "
                                  "positive-definite")
+        prec_chol[c] = linalg.solve_triangular(
+            cv_chol, np.eye(n_dim), lower=True).T
+        log_norm[c] = (-0.5 * n_dim * np.log(2 * np.pi)
+                       - np.sum(np.log(np.diagonal(cv_chol))))
+    return np.asarray(means), prec_chol, log_norm
+
+
+def _log_multivariate_normal_density_cholesky(X, means, prec_chol, log_norm):
+    """Evaluate the terms of :func:`_cholesky_precompute` at ``X``.
+
+    The centered samples of all components are whitened by a single
+    batched matrix product, or a plain one for a tied model.
+    """
+    centered = X[np.newaxis] - means[:, np.newaxis]
+    if len(prec_chol) == 1:
+        cv_sol = np.dot(centered, prec_chol[0])
+    else:
+        cv_sol = np.matmul(centered, prec_chol)
+    return log_norm - 0.5 * np.einsum('kij,kij->ik', cv_sol, cv_sol)
+
+
+def _precompute_log_multivariate_normal_density(means, covars,
+                                                covariance_type='diag'):
+    """Precompute the parameter-dependent terms of
+    :func:`log_multivariate_normal_density`.
+
+    Returns a function of ``X`` equivalent to
+    ``log_multivariate_normal_density(X, means, covars, covariance_type)``.
+    Diagonal models keep the precisions, full models the Cholesky factors
+    of the precision matrices.
+    """
+    n_components, n_dim = means.shape
+    if covariance_type in ('spherical', 'diag'):
+        covars = np.broadcast_to(
+            np.reshape(covars, (n_components, -1)), (n_components, n_dim))
+        precisions = 1. / covars
+        means_precisions = (means * precisions).T
+        precisions = precisions.T
+        log_norm = -0.5 * (n_dim * np.log(2 * np.pi)
+                           + np.sum(np.log(covars), 1)
+                           + np.sum(means ** 2 / covars, 1))
+
+        def log_density(X):
+            return (log_norm + np.dot(X, means_precisions)
+                    - 0.5 * np.dot(X ** 2, precisions))
+    else:
+        terms = _cholesky_precompute(means, covars, covariance_type)
 
-        cv_log_det = 2 * np.sum(np.log(np.diagonal(cv_chol)))
-        cv_sol = linalg.solve_triangular(cv_chol, (X - mu).T, lower=True).T
-        log_prob[:, c] = - .5 * (np.sum(cv_sol ** 2, axis=1) +
-                                 n_dim * np.log(2 * np.pi) + cv_log_det)
+        def log_density(X):
+            return _log_multivariate_normal_density_cholesky(X, *terms)
 
-    return log_prob
+    return log_density
 
-def log_multivariate_poisson_density(X, means) :
+
+# Counts below this value look up their log-factorial in a table rather
+# than evaluating gammaln.
+LOG_FACTORIAL_TABLE_SIZE = 1024
+_LOG_FACTORIAL_TABLE = gammaln(np.arange(LOG_FACTORIAL_TABLE_SIZE) + 1.)
+
+
+def _log_factorial(x):
+    # Small non-negative integer counts, which need not have an integer
+    # dtype, are looked up in a table of log-factorials.
+    if x.size and x.min() >= 0 and x.max() < LOG_FACTORIAL_TABLE_SIZE:
+        counts = x.astype(np.intp, copy=False)
+        if np.issubdtype(x.dtype, np.integer) or (counts == x).all():
+            return _LOG_FACTORIAL_TABLE[counts]
+    return gammaln(x + 1)
+
+
+def _sum_log_factorial(X):
+    """Computes ``np.sum(gammaln(X + 1), axis=1)`` for a dense or sparse
+    ``X``. For a sparse ``X``, only the non-zero counts are evaluated.
+    """
+    if sparse.issparse(X):
+        X = X.tocsr()
+        log_factorial = sparse.csr_matrix(
+            (_log_factorial(X.data), X.indices, X.indptr), shape=X.shape)
+        return np.asarray(log_factorial.sum(axis=1)).ravel()
+    return _log_factorial(X).sum(axis=1)
+
+
+def log_multivariate_poisson_density(X, means, log_factorial=None) :
       # # modeled on log_multivariate_normal_density from sklearn.mixture
     #print("X has shape {}".format(X.shape))
     #print("means has shape {}".format(means.shape))
     n_samples, n_dim = X.shape
     # -lambda + k log(lambda) - log(k!)
     log_means = np.where(means > 1e-3, np.log(means), np.log(1e-3))
-    lpr =  np.dot(X, log_means.T)
+    lpr =  X @ log_means.T
     lpr = lpr - np.sum(means,axis=1) # rates for all elements are summed and then broadcast across the observation dimenension
-    log_factorial = np.sum(gammaln(X + 1), axis=1)
+    if log_factorial is None:
+        # Only depends on X, and can be passed in by callers evaluating
+        # the same X repeatedly.
+        log_factorial = _sum_log_factorial(X)
     lpr = lpr - log_factorial[:,None] # logfactobs vector broadcast across the state dimension
 
     #print("lpr has shape {}".format(lpr.shape))
     return lpr
 
+def _precompute_log_multivariate_poisson_density(means):
+    """Precompute the parameter-dependent terms of
+    :func:`log_multivariate_poisson_density`.
+
+    Returns a function of ``X`` equivalent to
+    ``log_multivariate_poisson_density(X, means)``.
+    """
+    log_means = np.where(means > 1e-3, np.log(means), np.log(1e-3)).T
+    sum_means = np.sum(means, axis=1)
+
+    def log_density(X):
+        return (X @ log_means - sum_means
+                - _sum_log_factorial(X)[:, None])
+
+    return log_density
+
 def sample_IKR(rates, *, n_marks=None, n_clusters=None, n_samples=None, mode='id', random_state=None):
     """Sample I^K|R.
 
@@ -193,6 +302,8 @@ def eval_mark_loglikelihoods(*, marks, ikr, cluster_means, cluster_covars, rates
     -------
     ll : log likelihoods for each sample. Shape (n_samples,)
     """
+    from scipy.stats import multivariate_normal, poisson
+
     n_clusters = len(cluster_means)
     n_samples, n_marks = ikr.shape
 
@@ -269,6 +380,8 @@ def eval_P_Y_given_ISR(*, marks, rates, cluster_means, cluster_covars,
     logP : log probability of observing sequence of marks
 
     """
+    from scipy.stats import multivariate_normal, poisson
+
     n_marks = len(marks)
 
     if n_marks == 0:
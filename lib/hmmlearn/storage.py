@@ -0,0 +1,266 @@
+"""
+The :mod:`hmmlearn.storage` module saves fitted models in a compact binary
+format which can be memory-mapped without copying.
+
+A file consists of
+
+- a 16-byte preamble: the magic string ``b"HMMLEARN"``, followed by the
+  format version and the length of the header, both as little-endian
+  ``uint32``;
+- a UTF-8 encoded JSON header holding the model class, its scalar
+  parameters and attributes, and the dtype, shape and offset of each
+  array, including the fitted arrays of auxiliary scikit-learn
+  estimators such as the cluster mixture of the marked Poisson models;
+- the raw array data, each array starting at a multiple of
+  :data:`ALIGNMENT` bytes.
+"""
+
+import importlib
+import json
+import struct
+
+import numpy as np
+from sklearn.base import BaseEstimator
+
+from .base import _BaseHMM
+from .utils import Vocabulary
+
+__all__ = ["save", "load"]
+
+#: Magic string identifying model files.
+MAGIC = b"HMMLEARN"
+
+#: Version of the file format written by :func:`save`.
+FORMAT_VERSION = 1
+
+#: Alignment of the array data in bytes.
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct("<8sII")
+
+# Attributes which are recreated by the constructor. Derived attributes
+# of the model are recomputed on demand.
+_TRANSIENT = frozenset(("monitor_",))
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("{!r} is not JSON serializable".format(value))
+
+
+def _is_numeric(a):
+    return isinstance(a, np.ndarray) and a.dtype != object
+
+
+def _is_json(value):
+    try:
+        json.dumps(value, default=_json_default)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _class_name(cls):
+    return "{}.{}".format(cls.__module__, cls.__name__)
+
+
+def _import_class(name, base):
+    module_name, _, class_name = name.rpartition(".")
+    cls = getattr(importlib.import_module(module_name), class_name, None)
+    if not (isinstance(cls, type) and issubclass(cls, base)):
+        raise ValueError("Unknown class {!r}".format(name))
+    return cls
+
+
+def save(model, filename):
+    """Save a model in the memory-mappable format.
+
+    Parameters
+    ----------
+    model : _BaseHMM
+        Model to save.
+
+    filename : str
+        Path of the file to write.
+
+    Raises
+    ------
+    ValueError
+        If an attribute of the model is neither an array, nor a list of
+        arrays, nor a :class:`~hmmlearn.utils.Vocabulary`, nor a fitted
+        scikit-learn estimator or an array of them, nor representable in
+        JSON. The estimators are rebuilt from their parameters and
+        their fitted attributes which are arrays or representable in
+        JSON. Constructor parameters which
+        cannot be represented, such as callbacks or ``RandomState``
+        instances, are not saved and are reset to their defaults on load.
+    """
+    param_names = set(model._get_param_names())
+    attributes = {}
+    arrays = []
+    chunks = []
+    offset = 0
+
+    def add_array(a):
+        nonlocal offset
+        a = np.ascontiguousarray(a)
+        offset = _align(offset)
+        entry = {"dtype": a.dtype.str, "shape": list(a.shape),
+                 "offset": offset}
+        chunks.append((offset, a))
+        offset += a.nbytes
+        return entry
+
+    def add_estimator(estimator):
+        fitted = {}
+        fitted_arrays = {}
+        for name, value in vars(estimator).items():
+            if not name.endswith("_"):
+                continue
+            if _is_numeric(value):
+                fitted_arrays[name] = add_array(value)
+            elif _is_json(value):
+                fitted[name] = value
+        # Parameters such as RandomState instances are reset to their
+        # defaults, as for the model itself.
+        params = {name: value
+                  for name, value in estimator.get_params(deep=False).items()
+                  if _is_json(value)}
+        return {"class": _class_name(type(estimator)), "params": params,
+                "attributes": fitted, "arrays": fitted_arrays}
+
+    for name, value in sorted(vars(model).items()):
+        if name in _TRANSIENT or name in model._derived_attributes:
+            continue
+        if isinstance(value, Vocabulary):
+            # Models also accept the array of symbols.
+            value = value.symbols
+        if _is_numeric(value):
+            entry = add_array(value)
+            entry.update(name=name, kind="array")
+            arrays.append(entry)
+        elif (isinstance(value, (list, tuple, np.ndarray)) and len(value)
+                and all(_is_numeric(item) for item in value)):
+            kind = "object_array" if isinstance(value, np.ndarray) else "list"
+            arrays.append({"name": name, "kind": kind,
+                           "items": [add_array(item) for item in value]})
+        elif isinstance(value, BaseEstimator):
+            arrays.append({"name": name, "kind": "estimator",
+                           "estimator": add_estimator(value)})
+        elif (isinstance(value, np.ndarray) and len(value)
+                and all(isinstance(item, BaseEstimator) for item in value)):
+            arrays.append({"name": name, "kind": "estimator_array",
+                           "items": [add_estimator(item) for item in value]})
+        else:
+            if not _is_json(value):
+                if name in param_names:
+                    continue
+                raise ValueError(
+                    "Cannot save attribute {!r} of type {}"
+                    .format(name, type(value).__name__))
+            attributes[name] = value
+
+    header = json.dumps({
+        "class": _class_name(type(model)),
+        "attributes": attributes,
+        "arrays": arrays,
+    }, default=_json_default).encode("utf-8")
+    data_start = _align(_PREAMBLE.size + len(header))
+
+    with open(filename, "wb") as fh:
+        fh.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        fh.write(header)
+        for chunk_offset, a in chunks:
+            fh.seek(data_start + chunk_offset)
+            fh.write(a.data)
+        fh.truncate(data_start + offset)
+
+
+def load(filename, mmap_mode="r"):
+    """Load a model saved by :func:`save`.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the file to read.
+
+    mmap_mode : {None, "r", "c"}, optional
+        If not ``None``, the arrays of the model are memory-mapped views
+        of the file, which are shared by all processes loading the same
+        file: read-only for "r" and copy-on-write for "c". If ``None``,
+        the file is read into memory. Defaults to "r".
+
+    Returns
+    -------
+    model : _BaseHMM
+        The loaded model.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a model file or has an unsupported version.
+    """
+    if mmap_mode not in (None, "r", "c"):
+        raise ValueError("mmap_mode must be one of None, 'r' or 'c'")
+
+    with open(filename, "rb") as fh:
+        preamble = fh.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ValueError("{!r} is not a model file".format(filename))
+        magic, version, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError("{!r} is not a model file".format(filename))
+        if version > FORMAT_VERSION:
+            raise ValueError(
+                "Unsupported model file version {}".format(version))
+        header = json.loads(fh.read(header_length).decode("utf-8"))
+    data_start = _align(_PREAMBLE.size + header_length)
+
+    if mmap_mode is None:
+        buf = np.fromfile(filename, dtype=np.uint8)
+    else:
+        buf = np.memmap(filename, dtype=np.uint8, mode=mmap_mode)
+
+    def get_array(entry):
+        shape = tuple(entry["shape"])
+        return np.frombuffer(
+            buf, dtype=entry["dtype"], count=int(np.prod(shape)),
+            offset=data_start + entry["offset"]).reshape(shape)
+
+    def get_estimator(entry):
+        estimator = _import_class(entry["class"], BaseEstimator)(
+            **entry["params"])
+        vars(estimator).update(entry["attributes"])
+        for name, item in entry["arrays"].items():
+            setattr(estimator, name, get_array(item))
+        return estimator
+
+    state = dict(header["attributes"])
+    for entry in header["arrays"]:
+        if entry["kind"] == "array":
+            state[entry["name"]] = get_array(entry)
+        elif entry["kind"] == "estimator":
+            state[entry["name"]] = get_estimator(entry["estimator"])
+        elif entry["kind"] == "estimator_array":
+            value = np.empty(len(entry["items"]), dtype=object)
+            value[:] = [get_estimator(item) for item in entry["items"]]
+            state[entry["name"]] = value
+        else:
+            items = [get_array(item) for item in entry["items"]]
+            if entry["kind"] == "object_array":
+                value = np.empty(len(items), dtype=object)
+                value[:] = items
+                items = value
+            state[entry["name"]] = items
+
+    cls = _import_class(header["class"], _BaseHMM)
+    params = {name: state.pop(name) for name in cls._get_param_names()
+              if name in state}
+    model = cls(**params)
+    vars(model).update(state)
+    return model
@@ -1,6 +1,9 @@
+import multiprocessing
+
 import numpy as np
 import pytest
 
+from hmmlearn import base, hmm
 from hmmlearn.base import _BaseHMM, ConvergenceMonitor
 from hmmlearn.utils import logsumexp
 
@@ -27,9 +30,19 @@ class TestMonitor(object):
         m = ConvergenceMonitor(tol=1e-3, n_iter=10, verbose=False)
         m.iter = 1
         m.history.append(-0.01)
+        m.full_history.append(-0.01)
         m._reset()
         assert m.iter == 0
         assert not m.history
+        assert not m.full_history
+
+    def test_full_history(self):
+        m = ConvergenceMonitor(tol=1e-3, n_iter=10, verbose=False)
+        for logprob in [-0.03, -0.02, -0.01]:
+            m.report(logprob)
+        m.report_decreasing_logprob(-0.02)
+        assert m.full_history == [-0.03, -0.02, -0.01, -0.02]
+        assert list(m.history) == [-0.01, -0.02]
 
     def test_report_first_iteration(self, capsys):
         m = ConvergenceMonitor(tol=1e-3, n_iter=10, verbose=True)
@@ -160,6 +173,29 @@ class TestBaseConsistentWithGMM(object):
         assert np.allclose(state_sequence, gmmstate_sequence)
 
 
+class IndexStubHMM(_BaseHMM):
+    """An HMM whose samples are row indices into ``framelogprob``."""
+    def _compute_log_likelihood(self, X):
+        return self.framelogprob[X[:, 0].astype(int)]
+
+
+def test_score_chunked(monkeypatch):
+    n_components = 3
+    n_samples = 100
+    rs = np.random.RandomState(0)
+    h = IndexStubHMM(n_components)
+    h.framelogprob = np.log(rs.random_sample((n_samples, n_components)))
+    h.startprob_ = rs.dirichlet(np.ones(n_components))
+    h.transmat_ = rs.dirichlet(np.ones(n_components), size=n_components)
+
+    X = np.arange(n_samples)[:, np.newaxis]
+    lengths = [60, 1, 39]
+    logprob, _posteriors = h.score_samples(X, lengths)
+    assert h.score(X, lengths) == pytest.approx(logprob)
+    monkeypatch.setattr(base, "SCORE_CHUNK_SIZE", 7)
+    assert h.score(X, lengths) == pytest.approx(logprob)
+
+
 def test_base_hmm_attributes():
     n_components = 20
     startprob = np.random.random(n_components)
@@ -196,3 +232,176 @@ def test_base_hmm_attributes():
     with pytest.raises(ValueError):
         h.transmat_ = np.zeros((n_components - 2, n_components))
         h._check()
+
+
+class UnitGaussianHMM(_BaseHMM):
+    """An HMM with univariate Gaussian emissions of unit variance, which
+    implements only the chunk-level emission interface."""
+    def _compute_log_likelihood(self, X):
+        return -.5 * (np.log(2 * np.pi) + (X - self.means_) ** 2)
+
+    def _initialize_sufficient_statistics(self):
+        stats = super(UnitGaussianHMM,
+                      self)._initialize_sufficient_statistics()
+        stats['post'] = np.zeros(self.n_components)
+        stats['obs'] = np.zeros(self.n_components)
+        return stats
+
+    def _accumulate_emission_statistics(self, stats, X, framelogprob,
+                                        posteriors):
+        stats['post'] += posteriors.sum(axis=0)
+        stats['obs'] += X[:, 0] @ posteriors
+
+    def _do_mstep(self, stats):
+        super(UnitGaussianHMM, self)._do_mstep(stats)
+        self.means_ = stats['obs'] / stats['post']
+
+
+class LegacyUnitGaussianHMM(UnitGaussianHMM):
+    """Accumulates the emission statistics sequence by sequence."""
+    def _accumulate_emission_statistics(self, stats, X, framelogprob,
+                                        posteriors):
+        pass
+
+    def _accumulate_sufficient_statistics(self, stats, X, framelogprob,
+                                          posteriors, fwdlattice, bwdlattice):
+        super(LegacyUnitGaussianHMM, self)._accumulate_sufficient_statistics(
+            stats, X, framelogprob, posteriors, fwdlattice, bwdlattice)
+        UnitGaussianHMM._accumulate_emission_statistics(
+            self, stats, X, framelogprob, posteriors)
+
+
+class RandomUnitGaussianHMM(UnitGaussianHMM):
+    """Draws the initial means from ``random_state``."""
+    def _init(self, X, lengths):
+        super(RandomUnitGaussianHMM, self)._init(X, lengths)
+        rs = np.random.RandomState(self.random_state)
+        self.means_ = 3 * rs.randn(self.n_components)
+
+
+class FailingUnitGaussianHMM(UnitGaussianHMM):
+    """Fails in the first M-step."""
+    def _do_mstep(self, stats):
+        raise RuntimeError("M-step failed")
+
+
+class TestEmissionInterface(object):
+    def setup_method(self, method):
+        rs = np.random.RandomState(0)
+        self.lengths = [30, 7, 1, 12, 30, 20]
+        states = rs.randint(2, size=sum(self.lengths))
+        self.X = (np.array([-2., 2.])[states]
+                  + rs.randn(len(states)))[:, np.newaxis]
+
+    def new_hmm(self, cls, n_iter=5, **kwargs):
+        h = cls(2, init_params="", n_iter=n_iter, **kwargs)
+        h.startprob_ = np.array([.6, .4])
+        h.transmat_ = np.array([[.8, .2], [.3, .7]])
+        h.means_ = np.array([-1., 1.])
+        return h
+
+    @pytest.mark.parametrize("cls", [UnitGaussianHMM, LegacyUnitGaussianHMM])
+    def test_fit_batches(self, cls):
+        h = self.new_hmm(cls).fit(self.X, self.lengths)
+        hb = self.new_hmm(cls, batch_size=3)
+        assert hb._use_batches() == (cls is UnitGaussianHMM)
+        hb.fit(self.X, self.lengths)
+        assert np.allclose(hb.means_, h.means_)
+        assert np.allclose(hb.startprob_, h.startprob_)
+        assert np.allclose(hb.transmat_, h.transmat_)
+
+    def test_merge_statistics(self):
+        h = self.new_hmm(UnitGaussianHMM)
+        stats, logprob = h._do_estep(self.X, self.lengths)
+        assert isinstance(stats, base.SufficientStatistics)
+        split = sum(self.lengths[:3])
+        merged, logprob1 = h._do_estep(self.X[:split], self.lengths[:3])
+        stats2, logprob2 = h._do_estep(self.X[split:], self.lengths[3:])
+        assert merged.merge(stats2) is merged
+        assert logprob1 + logprob2 == pytest.approx(logprob)
+        assert merged.keys() == stats.keys()
+        for name in stats:
+            assert np.allclose(merged[name], stats[name])
+
+        del stats2['obs']
+        with pytest.raises(ValueError):
+            merged.merge(stats2)
+
+    def test_fit_n_init_drops_cache(self):
+        h = self.new_hmm(UnitGaussianHMM, cache_size=2)
+        h.score(self.X, self.lengths)
+        h.set_params(n_init=2).fit(self.X, self.lengths)
+        assert "_loglik_cache" not in vars(h)
+        uncached = h.set_params(cache_size=0).score(self.X, self.lengths)
+        assert h.set_params(cache_size=2).score(
+            self.X, self.lengths) == pytest.approx(uncached)
+
+    def test_fit_ends_with_rejected_extrapolation(self):
+        h = self.new_hmm(UnitGaussianHMM, n_iter=3, acceleration="squarem",
+                         tol=-np.inf)
+
+        def squarem_extrapolate(*params):
+            h.means_ = np.array([100., 200.])
+            return True
+
+        # The extrapolation after the second iteration is rejected by
+        # the third and last one.
+        h._squarem_extrapolate = squarem_extrapolate
+        h.fit(self.X, self.lengths)
+        assert h.monitor_.iter == 3
+        assert h.monitor_.converged
+        assert len(h.monitor_.full_history) == 2
+        assert h.final_logprob == h.monitor_.full_history[-1]
+
+        ref = self.new_hmm(UnitGaussianHMM, n_iter=2, tol=-np.inf)
+        ref.fit(self.X, self.lengths)
+        assert np.allclose(h.means_, ref.means_)
+        assert h.final_logprob == pytest.approx(ref.final_logprob)
+
+    def test_fit_n_init_stops_workers(self):
+        h = self.new_hmm(FailingUnitGaussianHMM, n_init=2)
+        with pytest.raises(RuntimeError, match="M-step failed"):
+            h.fit(self.X, self.lengths)
+        assert not multiprocessing.active_children()
+
+    def test_fit_n_init_prunes_restarts(self, monkeypatch):
+        probed, continued = {}, []
+
+        def fit_restart(model, X, lengths, n_iter, init, kwargs,
+                        _fit_restart=base._fit_restart):
+            _fit_restart(model, X, lengths, n_iter, init, kwargs)
+            if init:
+                assert n_iter == 2
+                probed[model.random_state] = base._final_logprob(model)
+            else:
+                assert n_iter == 3
+                continued.append(model.random_state)
+            return model
+
+        monkeypatch.setattr(base, "N_INIT_PROBE_ITER", 2)
+        monkeypatch.setattr(base, "_fit_restart", fit_restart)
+        calls = []
+        h = self.new_hmm(RandomUnitGaussianHMM, n_init=5, random_state=0,
+                         tol=-np.inf,
+                         callback=lambda *args: calls.append(args))
+        # The lambda cannot be pickled, so that the restarts are fitted
+        # in this process.
+        h.fit(self.X, self.lengths)
+        assert h.n_init == 5 and h.random_state == 0
+        assert len(set(probed.values())) == 5
+        # The better half of the restarts is continued, the rest dropped.
+        best = sorted(probed, key=probed.get, reverse=True)[:3]
+        assert sorted(continued) == sorted(best)
+        assert len(calls) == 5 * 2 + 3 * 3
+        assert h.monitor_.iter == 5
+
+
+@pytest.mark.parametrize("h", [hmm.MarkedPoissonHMM(2),
+                               hmm.MultiprobeMarkedPoissonHMM(2, [1])])
+def test_derived_from_cluster_params(h):
+    for name, value in [("cluster_means", np.zeros((1, 2))),
+                        ("cluster_covars", np.ones((1, 2))),
+                        ("n_samples", 100)]:
+        h.__dict__["_loglik_cache"] = {}
+        h.set_params(**{name: value})
+        assert "_loglik_cache" not in vars(h)
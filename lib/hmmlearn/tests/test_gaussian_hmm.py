@@ -1,11 +1,14 @@
 from __future__ import absolute_import
 
+import warnings
 from unittest import TestCase
 
 import numpy as np
 import pytest
 
 from hmmlearn import hmm
+from hmmlearn.stats import log_multivariate_normal_density
+from hmmlearn.utils import Sequences
 
 from . import log_likelihood_increasing, make_covar_matrix, normalized
 
@@ -71,6 +74,111 @@ class GaussianHMMTestMixin(object):
         self.assertEqual(X.shape, (n, self.n_features))
         self.assertEqual(len(state_sequence), n)
 
+    def test_infer(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = self.means
+        h.covars_ = self.covars
+
+        lengths = [10, 5, 15]
+        X, _state_sequence = h.sample(sum(lengths), random_state=self.prng)
+
+        results = h.infer(X, lengths)
+        assert results["logprob"] == pytest.approx(h.score(X, lengths))
+        assert np.allclose(results["posteriors"], h.predict_proba(X, lengths))
+        for algorithm in ["viterbi", "map"]:
+            logprob, state_sequence = h.decode(X, lengths, algorithm)
+            assert results[algorithm][0] == pytest.approx(logprob)
+            assert np.array_equal(results[algorithm][1], state_sequence)
+
+        assert list(h.infer(X, lengths, outputs=["viterbi"])) == ["viterbi"]
+        with pytest.raises(ValueError):
+            h.infer(X, lengths, outputs=["bad_output"])
+
+    def test_freeze(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = self.means
+        h.covars_ = self.covars
+
+        lengths = [10, 1, 15]
+        X, _state_sequence = h.sample(sum(lengths), random_state=self.prng)
+
+        frozen = h.freeze()
+        assert frozen.score(X, lengths) == pytest.approx(h.score(X, lengths))
+        logprob, posteriors = frozen.score_samples(X, lengths)
+        ref_logprob, ref_posteriors = h.score_samples(X, lengths)
+        assert logprob == pytest.approx(ref_logprob)
+        assert np.allclose(posteriors, ref_posteriors)
+        assert np.allclose(frozen.predict_proba(X, lengths), ref_posteriors)
+        for algorithm in ["viterbi", "map"]:
+            logprob, state_sequence = frozen.decode(X, lengths, algorithm)
+            ref_logprob, ref_state_sequence = h.decode(X, lengths, algorithm)
+            assert logprob == pytest.approx(ref_logprob)
+            assert np.array_equal(state_sequence, ref_state_sequence)
+        assert np.array_equal(frozen.predict(X, lengths),
+                              h.predict(X, lengths))
+
+    def test_sequences(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                            n_iter=1)
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = self.means
+        h.covars_ = self.covars
+
+        lengths = [10, 1, 15]
+        X, _state_sequence = h.sample(sum(lengths), random_state=self.prng)
+        seqs = Sequences(X, lengths)
+
+        assert h.score(seqs) == pytest.approx(h.score(X, lengths))
+        assert np.allclose(h.predict_proba(seqs), h.predict_proba(X, lengths))
+        assert np.array_equal(h.predict(seqs), h.predict(X, lengths))
+        assert (h.infer(seqs)["logprob"]
+                == pytest.approx(h.score(X, lengths)))
+        assert (h.freeze().score(seqs)
+                == pytest.approx(h.score(X, lengths)))
+        assert np.allclose(h.freeze().predict_proba(seqs),
+                           h.predict_proba(X, lengths))
+        with pytest.raises(ValueError):
+            h.score(seqs, lengths)
+
+        h.init_params = ""
+        h.fit(seqs, X_valid=seqs[:2])
+        assert np.isfinite(h.monitor_.history[-1])
+
+    def test_batch_size(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = self.means
+        h.covars_ = self.covars
+
+        lengths = [10, 1, 15, 4, 10, 7]
+        X, _state_sequence = h.sample(sum(lengths), random_state=self.prng)
+        ref_logprob, ref_posteriors = h.score_samples(X, lengths)
+        ref_decoded = {algorithm: h.decode(X, lengths, algorithm)
+                       for algorithm in ["viterbi", "map"]}
+        ref_estep = {algorithm: h._do_estep(X, lengths, algorithm=algorithm)
+                     for algorithm in ["baum-welch", "viterbi"]}
+
+        h.batch_size = 4
+        logprob, posteriors = h.score_samples(X, lengths)
+        assert logprob == pytest.approx(ref_logprob)
+        assert np.allclose(posteriors, ref_posteriors)
+        for algorithm, (ref_logprob, ref_state_sequence) \
+                in ref_decoded.items():
+            logprob, state_sequence = h.decode(X, lengths, algorithm)
+            assert logprob == pytest.approx(ref_logprob)
+            assert np.array_equal(state_sequence, ref_state_sequence)
+        for algorithm, (ref_stats, ref_logprob) in ref_estep.items():
+            stats, logprob = h._do_estep(X, lengths, algorithm=algorithm)
+            assert logprob == pytest.approx(ref_logprob)
+            for key, value in ref_stats.items():
+                assert np.allclose(stats[key], value)
+
     def test_fit(self, params='stmc', n_iter=5, **kwargs):
         h = hmm.GaussianHMM(self.n_components, self.covariance_type)
         h.startprob_ = self.startprob
@@ -106,6 +214,311 @@ class GaussianHMMTestMixin(object):
         #             has no identity
         h.fit(X, lengths=lengths)
 
+    def test_fit_early_stopping(self):
+        # Overlapping states and little training data, on which EM
+        # overfits after a few iterations.
+        h = hmm.GaussianHMM(self.n_components, "spherical")
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = self.means / 8
+        h.covars_ = np.ones(self.n_components)
+
+        lengths = [20] * 5
+        X, _state_sequence = h.sample(sum(lengths), random_state=self.prng)
+        X_valid, _state_sequence = h.sample(200, random_state=self.prng)
+
+        for valid_interval, patience in [(2, 1), (1, 3)]:
+            h_learn = hmm.GaussianHMM(self.n_components,
+                                      self.covariance_type,
+                                      n_iter=100, tol=-np.inf,
+                                      random_state=0)
+            h_learn.fit(X, lengths, X_valid=X_valid,
+                        valid_interval=valid_interval, patience=patience)
+
+            # EM stops after ``patience`` evaluations which don't improve
+            # the held-out log probability and restores the best
+            # parameters.
+            history = h_learn.valid_history_
+            best = int(np.argmax(history))
+            assert len(history) == best + 1 + patience < 10
+            assert all(np.diff(history[:best + 1]) > 0)
+            assert h_learn.monitor_.iter == len(history) * valid_interval
+            assert h_learn.score(X_valid) == pytest.approx(history[best])
+            assert h_learn.final_logprob == pytest.approx(
+                h_learn.score(X, lengths))
+
+        for kwargs in [{"valid_interval": 0}, {"patience": 0}]:
+            with pytest.raises(ValueError):
+                h_learn.fit(X, lengths, X_valid=X_valid, **kwargs)
+
+    def test_fit_n_init(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = 20 * self.means
+        h.covars_ = self.covars
+
+        lengths = [50] * 4
+        X, _state_sequence = h.sample(sum(lengths), random_state=self.prng)
+
+        h_learn = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                                  n_init=4, random_state=0)
+        h_learn.fit(X, lengths)
+        assert h_learn.n_init == 4
+        assert h_learn.random_state == 0
+
+        # Restarts are seeded from ``random_state``.
+        h_again = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                                  n_init=4, random_state=0)
+        h_again.fit(X, lengths)
+        assert np.allclose(h_learn.means_, h_again.means_)
+        assert np.isclose(h_learn.score(X, lengths),
+                          h_again.score(X, lengths))
+
+    def test_fit_squarem(self):
+        # Overlapping states, for which plain EM converges slowly.
+        h = hmm.GaussianHMM(self.n_components, "spherical")
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = self.means / 8
+        h.covars_ = np.ones(self.n_components)
+
+        lengths = [100] * 5
+        X, _state_sequence = h.sample(sum(lengths), random_state=self.prng)
+
+        def fit(h):
+            n_esteps = []
+
+            def do_estep(*args, _do_estep=h._do_estep):
+                n_esteps.append(1)
+                return _do_estep(*args)
+
+            h._do_estep = do_estep
+            h.fit(X, lengths)
+            del h._do_estep
+            assert h.monitor_.converged
+            return len(n_esteps)
+
+        h_plain = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                                  n_iter=200, tol=1e-3, random_state=0)
+        h_squarem = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                                    n_iter=200, tol=1e-3, random_state=0,
+                                    acceleration="squarem")
+        # Extrapolation reaches the same tolerance in fewer E-steps.
+        assert fit(h_squarem) < fit(h_plain)
+
+        h_squarem._check()  # the extrapolated parameters must be valid
+        assert (h_squarem.score(X, lengths)
+                >= h_plain.score(X, lengths) - 1)
+
+        with pytest.raises(ValueError):
+            h_squarem.set_params(acceleration="bad_acceleration")
+            h_squarem.fit(X, lengths)
+
+    def test_fit_profile(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = self.means
+        h.covars_ = self.covars
+
+        lengths = [10] * 10
+        X, _state_sequence = h.sample(sum(lengths), random_state=self.prng)
+
+        records = []
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                            n_iter=5, tol=-np.inf, profile=records.append)
+        h.fit(X, lengths)
+        assert h.fit_profile_ == records
+        assert len(records) == h.monitor_.iter
+        for record in records:
+            for phase in ["compute_log_likelihood", "forward_pass",
+                          "backward_pass", "compute_posteriors",
+                          "accumulate_sufficient_statistics"]:
+                assert record[phase]["calls"] == len(lengths)
+                assert record[phase]["time"] >= 0
+                assert record[phase]["bytes"] > 0
+        assert records[0]["do_mstep"]["calls"] == 1
+
+    def test_fit_callback(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = self.means
+        h.covars_ = self.covars
+
+        lengths = [10] * 10
+        X, _state_sequence = h.sample(sum(lengths), random_state=self.prng)
+
+        calls = []
+
+        def callback(iter_time, logprob, history):
+            calls.append((iter_time, logprob, history))
+            return len(history) == 3
+
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                            n_iter=100, tol=-np.inf, callback=callback)
+        h.fit(X, lengths)
+        assert len(calls) == h.monitor_.iter == 3
+        assert calls[-1][2] == h.monitor_.full_history
+        assert all(iter_time >= 0 for iter_time, _, _ in calls)
+        assert h.final_logprob == calls[-1][1]
+
+        # The callback also sees the last iteration, whether EM converged
+        # or stopped early, and rejected SQUAREM extrapolations.
+        X_valid = self.prng.randn(20, self.n_features)
+        for kwargs, fit_kwargs in [({"tol": np.inf}, {}),
+                                   ({}, {"X_valid": X_valid}),
+                                   ({"acceleration": "squarem"}, {})]:
+            calls = []
+            h = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                                n_iter=100, random_state=0,
+                                callback=lambda *args: calls.append(args),
+                                **kwargs)
+            n_esteps = []
+
+            def do_estep(*args, _do_estep=h._do_estep):
+                n_esteps.append(1)
+                return _do_estep(*args)
+
+            h._do_estep = do_estep
+            h.fit(X, lengths, **fit_kwargs)
+            assert len(calls) == len(n_esteps) >= h.monitor_.iter
+
+    def test_fit_max_time(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = self.means
+        h.covars_ = self.covars
+
+        lengths = [10] * 10
+        X, _state_sequence = h.sample(sum(lengths), random_state=self.prng)
+
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                            n_iter=100, tol=-np.inf, max_time=0)
+        h.fit(X, lengths)
+        assert h.monitor_.iter == 0
+        h._check()
+
+    def test_fit_viterbi(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = self.means
+        h.covars_ = self.covars
+
+        lengths = [10] * 10
+        X, _state_sequence = h.sample(sum(lengths), random_state=self.prng)
+
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                            n_iter=10, random_state=0)
+        h.fit(X, lengths, algorithm="viterbi")
+        h._check()
+        assert h.transmat_.sum(axis=1) == pytest.approx(1)
+        # The Viterbi log probability is a lower bound of the likelihood.
+        assert h.monitor_.full_history[-1] <= h.score(X, lengths)
+        assert np.all(np.diff(h.monitor_.full_history) > -1e-6)
+
+        # Hard EM as warm-up for a few Baum-Welch iterations.
+        warm_logprob = h.score(X, lengths)
+        h.set_params(init_params="", n_iter=5)
+        h.fit(X, lengths)
+        assert h.score(X, lengths) >= warm_logprob - 1e-6
+
+        with pytest.raises(ValueError):
+            h.fit(X, lengths, algorithm="bad_algorithm")
+
+    def test_fit_viterbi_unvisited_state(self):
+        # The third state is on no Viterbi path of the two clusters.
+        X = np.concatenate([self.prng.randn(50, self.n_features) - 5,
+                            self.prng.randn(50, self.n_features) + 5])
+        h = hmm.GaussianHMM(3, self.covariance_type, init_params="stc",
+                            n_iter=5)
+        h.means_ = np.array([[-5.] * self.n_features, [5.] * self.n_features,
+                             [100.] * self.n_features])
+        with warnings.catch_warnings():
+            # The updates of the unvisited state are discarded silently.
+            warnings.simplefilter("error", RuntimeWarning)
+            h.fit(X, algorithm="viterbi")
+        assert np.allclose(h.means_[2], 100)
+        assert h.transmat_.sum(axis=1) == pytest.approx(1)
+        assert np.isfinite(h.score(X))
+
+    def test_cache(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                            cache_size=2)
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = self.means
+        h.covars_ = self.covars
+
+        lengths = [10] * 2
+        X, _state_sequence = h.sample(sum(lengths), random_state=self.prng)
+
+        calls = []
+        compute_log_likelihood = h._compute_log_likelihood
+
+        def counting_compute_log_likelihood(X):
+            calls.append(X)
+            return compute_log_likelihood(X)
+
+        h._compute_log_likelihood = counting_compute_log_likelihood
+        logprob = h.score(X, lengths)
+        posteriors = h.predict_proba(X, lengths)
+        h.predict(X, lengths)
+        assert len(calls) == 2
+        assert h.score(X.copy(), lengths) == logprob
+
+        # Setting a parameter invalidates the cache.
+        h.means_ = self.means + 1
+        h.score(X, lengths)
+        assert len(calls) == 4
+
+        # At most ``cache_size`` entries are kept.
+        h.score(X, [5] * 4)
+        h.score(X, lengths)
+        assert len(calls) == 10
+
+        h.means_ = self.means
+        assert np.allclose(h.predict_proba(X, lengths), posteriors)
+
+    def test_compute_log_likelihood(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.means_ = self.means
+        h.covars_ = self.covars
+        X = self.prng.randn(20, self.n_features)
+
+        for _ in range(2):
+            expected = log_multivariate_normal_density(
+                X, h.means_, h._covars_, self.covariance_type)
+            assert np.allclose(h._compute_log_likelihood(X), expected)
+            # Parameters modified in place are picked up.
+            h.means_ += 1
+
+    def test_accumulate_sufficient_statistics(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                            params="c")
+        h.n_features = self.n_features
+        X = self.prng.randn(50, self.n_features)
+        posteriors = self.prng.dirichlet(np.ones(self.n_components), 50)
+
+        chunk_size = hmm.GAUSSIAN_STATS_CHUNK_SIZE
+        hmm.GAUSSIAN_STATS_CHUNK_SIZE = 4 * self.n_features
+        try:
+            stats = h._initialize_sufficient_statistics()
+            h._accumulate_sufficient_statistics(
+                stats, X, None, posteriors, None, None)
+        finally:
+            hmm.GAUSSIAN_STATS_CHUNK_SIZE = chunk_size
+
+        assert np.allclose(stats['obs'], posteriors.T @ X)
+        if self.covariance_type in ('tied', 'full'):
+            assert np.allclose(stats['obs*obs.T'], np.einsum(
+                'ij,ik,il->jkl', posteriors, X, X))
+        else:
+            assert np.allclose(stats['obs**2'], posteriors.T @ X ** 2)
+
     def test_fit_zero_variance(self):
         # Example from issue #2 on GitHub.
         X = np.asarray([
@@ -1,9 +1,11 @@
 import numpy as np
 import pytest
+from scipy.special import logsumexp
 
 from . import log_likelihood_increasing
 from . import normalized
 from ..hmm import GMMHMM
+from ..stats import log_multivariate_normal_density
 
 
 def sample_from_parallelepiped(low, high, n_samples, random_state):
@@ -115,6 +117,52 @@ class GMMHMMTestMixin(object):
         _viterbi_ll, decoded_states = self.h.decode(X)
         assert np.allclose(states, decoded_states)
 
+    def test_compute_log_likelihood(self):
+        X, _states = self.h.sample(100)
+        self.h._check()
+        expected = np.column_stack([
+            logsumexp(log_multivariate_normal_density(
+                X, self.h.means_[i], self.h.covars_[i], self.covariance_type)
+                + np.log(self.h.weights_[i]), axis=1)
+            for i in range(self.n_components)])
+        attributes = set(vars(self.h))
+        framelogprob = self.h._compute_log_likelihood(X)
+        assert np.allclose(framelogprob, expected)
+        # Inference does not modify the model.
+        self.h.score(X)
+        assert set(vars(self.h)) == attributes
+
+        # The densities passed to the accumulation match recomputed ones.
+        framelogprob, log_denses = self.h._compute_emission_terms(X)
+        assert np.allclose(framelogprob, expected)
+        posteriors = normalized(self.prng.rand(100, self.n_components),
+                                axis=1)
+        stats = self.h._initialize_sufficient_statistics()
+        self.h._accumulate_sufficient_statistics(
+            stats, X, framelogprob, posteriors, None, None, log_denses)
+        ref_stats = self.h._initialize_sufficient_statistics()
+        self.h._accumulate_sufficient_statistics(
+            ref_stats, X, framelogprob, posteriors, None, None)
+        for key in ["post_mix_sum", "m_n", "c_n"]:
+            assert np.allclose(stats[key], ref_stats[key])
+
+    def test_accumulate_sufficient_statistics_multiple_sequences(self):
+        X, _states = self.h.sample(100)
+        posteriors = normalized(self.prng.rand(100, self.n_components),
+                                axis=1)
+        self.h._check()
+        stats = self.h._initialize_sufficient_statistics()
+        self.h._accumulate_sufficient_statistics(
+            stats, X, self.h._compute_log_likelihood(X), posteriors,
+            None, None)
+        split_stats = self.h._initialize_sufficient_statistics()
+        for i, j in [(0, 30), (30, 100)]:
+            self.h._accumulate_sufficient_statistics(
+                split_stats, X[i:j], self.h._compute_log_likelihood(X[i:j]),
+                posteriors[i:j], None, None)
+        for key in ["post_mix_sum", "post_sum", "m_n", "c_n"]:
+            assert np.allclose(split_stats[key], stats[key])
+
     def test_fit(self):
         n_iter = 5
         n_samples = 10000
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import hmmlearn
+
+
+# Dependencies which are only needed to initialize models or to plot, and
+# must therefore not be imported together with hmmlearn, unless its hard
+# dependencies already import them.
+LAZY_MODULES = ["scipy.linalg", "scipy.stats", "sklearn.cluster",
+                "sklearn.mixture", "matplotlib", "seaborn", "psutil"]
+
+
+@pytest.mark.parametrize("module", ["hmmlearn.base", "hmmlearn.hmm"])
+def test_lazy_imports(module):
+    # Run in a fresh interpreter, as other tests import these modules.
+    code = ("import sys, numpy, scipy.special, sklearn.base, sklearn.utils; "
+            "preloaded = set(sys.modules); "
+            "import {}; "
+            "print(' '.join(m for m in {!r} "
+            "               if m in sys.modules and m not in preloaded))"
+            .format(module, LAZY_MODULES))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [os.path.dirname(os.path.dirname(hmmlearn.__file__))]
+        + os.environ.get("PYTHONPATH", "").split(os.pathsep)))
+    output = subprocess.check_output([sys.executable, "-c", code], env=env)
+    assert output.decode().split() == []
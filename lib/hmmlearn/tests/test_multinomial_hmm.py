@@ -1,9 +1,12 @@
 from __future__ import absolute_import
 
+import copy
+
 import numpy as np
 import pytest
 
 from hmmlearn import hmm
+from hmmlearn.utils import Sequences, Vocabulary
 
 from . import log_likelihood_increasing, normalized
 
@@ -50,6 +53,23 @@ class TestMultinomialAgainstWikipedia(object):
             [0.86397706, 0.13602294],
         ])
 
+    def test_freeze(self):
+        X = [[0], [1], [2]]
+        frozen = self.h.freeze()
+        logprob, state_sequence = frozen.decode(X, algorithm="viterbi")
+        assert round(np.exp(logprob), 5) == 0.01344
+        assert np.allclose(state_sequence, [1, 0, 0])
+        assert frozen.score(X) == pytest.approx(self.h.score(X))
+        assert np.allclose(frozen.predict_proba(X), self.h.predict_proba(X))
+
+        # Later changes to the model do not affect the frozen copy.
+        self.h.startprob_ = np.array([0.4, 0.6])
+        assert frozen.score(X) != pytest.approx(self.h.score(X))
+        with pytest.raises(AttributeError):
+            frozen.startprob_ = np.array([0.4, 0.6])
+        with pytest.raises(ValueError):
+            frozen.startprob_[0] = 0.4
+
 
 class TestMultinomailHMM(object):
     def setup_method(self, method):
@@ -103,6 +123,19 @@ class TestMultinomailHMM(object):
 
         assert log_likelihood_increasing(h, X, lengths, n_iter)
 
+    def test_accumulate_sufficient_statistics(self):
+        X, _state_sequence = self.h.sample(100)
+        framelogprob = self.h._compute_log_likelihood(X)
+        _logprob, posteriors = self.h.score_samples(X)
+        stats = self.h._initialize_sufficient_statistics()
+        self.h._accumulate_sufficient_statistics(
+            stats, X, framelogprob, posteriors, None, None)
+
+        expected = np.zeros((self.n_components, self.n_features))
+        for t, symbol in enumerate(X[:, 0]):
+            expected[:, symbol] += posteriors[t]
+        assert np.allclose(stats['obs'], expected)
+
     def test_fit_emissionprob(self):
         self.test_fit('e')
 
@@ -130,3 +163,259 @@ class TestMultinomailHMM(object):
         assert not self.h._check_input_symbols([[0., 2., 1., 3.]])
         # d) negative integers
         assert not self.h._check_input_symbols([[0, 0, -2, 1, 3, 1, 1]])
+        # e) too large
+        assert not self.h._check_input_symbols([[0, 1, 2, 2 ** 40]])
+
+    def test_vocabulary(self):
+        vocab = Vocabulary(["dog", "cat", "emu"])
+        lengths = [10] * 10
+        X, _state_sequence = self.h.sample(sum(lengths), random_state=0)
+        words = vocab.decode(X)
+
+        h = hmm.MultinomialHMM(self.n_components, vocabulary=vocab,
+                               n_iter=5, random_state=0)
+        h.fit(words, lengths)
+        assert h.n_features == self.n_features
+        ref = hmm.MultinomialHMM(self.n_components, n_iter=5,
+                                 random_state=0)
+        ref.fit(X, lengths)
+        assert np.allclose(h.emissionprob_, ref.emissionprob_)
+        assert h.score(Sequences(words, lengths)) \
+            == pytest.approx(ref.score(X, lengths))
+
+        sampled, _state_sequence = h.sample(10)
+        assert set(sampled.ravel()) <= set(vocab.symbols)
+        with pytest.raises(ValueError):
+            h.score([["cow"]])
+
+        # An array of symbols is accepted as well.
+        h.set_params(vocabulary=["emu", "dog", "cat"])
+        assert h.score(words) == pytest.approx(ref.score(X))
+
+        # Encoded samples are used as they are.
+        encoded = vocab.encode_sequences(words, lengths)
+        assert encoded.vocabulary is vocab
+        assert np.array_equal(encoded.data, X)
+        assert h.score(encoded) == pytest.approx(ref.score(X, lengths))
+        assert h.score(encoded[2:5]) \
+            == pytest.approx(ref.score(X[20:50], lengths[2:5]))
+        with pytest.raises(ValueError):
+            hmm.MultinomialHMM(self.n_components,
+                               vocabulary=["cat", "dog"]).fit(encoded)
+        with pytest.raises(ValueError):
+            ref.score(encoded)
+        with pytest.raises(ValueError):
+            vocab.encode_sequences(encoded, lengths)
+
+        # The frozen model encodes samples with the vocabulary as well.
+        frozen = h.freeze()
+        assert frozen.score(words, lengths) \
+            == pytest.approx(ref.score(X, lengths))
+        assert frozen.score(encoded) == pytest.approx(ref.score(X, lengths))
+        assert np.array_equal(frozen.predict(Sequences(words, lengths)),
+                              ref.predict(X, lengths))
+        with pytest.raises(ValueError):
+            frozen.score([["cow"]])
+        with pytest.raises(ValueError):
+            ref.freeze().score(encoded)
+
+    def test_integer_vocabulary(self):
+        vocab = Vocabulary([30, 10, 20])
+        lengths = [10] * 10
+        X, _state_sequence = self.h.sample(sum(lengths), random_state=0)
+        symbols = vocab.decode(X)
+
+        h = hmm.MultinomialHMM(self.n_components, vocabulary=vocab,
+                               n_iter=5, random_state=0)
+        h.fit(symbols, lengths)
+        ref = hmm.MultinomialHMM(self.n_components, n_iter=5,
+                                 random_state=0)
+        ref.fit(X, lengths)
+        assert np.allclose(h.emissionprob_, ref.emissionprob_)
+        assert h.score(symbols, lengths) \
+            == pytest.approx(ref.score(X, lengths))
+
+        # Ids are symbols of the vocabulary unless marked as encoded.
+        with pytest.raises(ValueError):
+            h.score(X, lengths)
+        encoded = Sequences(X, lengths, vocabulary=vocab)
+        assert h.score(encoded) == pytest.approx(ref.score(X, lengths))
+        h.set_params(random_state=0)
+        h.fit(vocab.encode_sequences(symbols, lengths))
+        assert np.allclose(h.emissionprob_, ref.emissionprob_)
+        assert np.array_equal(h.predict(encoded), ref.predict(X, lengths))
+
+        frozen = h.freeze()
+        assert frozen.score(symbols, lengths) \
+            == pytest.approx(ref.score(X, lengths))
+        assert frozen.score(encoded) == pytest.approx(ref.score(X, lengths))
+        assert np.array_equal(frozen.predict(symbols, lengths),
+                              ref.predict(X, lengths))
+        with pytest.raises(ValueError):
+            frozen.score(X, lengths)
+
+
+class TestMultinomialHMMTopSymbols(object):
+    def setup_method(self, method):
+        self.n_components = 2
+        self.n_features = 6
+        self.h = hmm.MultinomialHMM(self.n_components, n_top_symbols=2)
+        self.h.n_features = self.n_features
+        self.h.startprob_ = np.array([0.6, 0.4])
+        self.h.transmat_ = np.array([[0.7, 0.3], [0.4, 0.6]])
+        self.h.emission_symbols_ = np.array([[0, 1], [5, 2]])
+        self.h.emissionprob_ = np.array([[0.5, 0.3], [0.6, 0.2]])
+        self.h.emission_floor_ = np.array([0.05, 0.05])
+
+        self.dense = hmm.MultinomialHMM(self.n_components)
+        self.dense.startprob_ = self.h.startprob_
+        self.dense.transmat_ = self.h.transmat_
+        self.dense.emissionprob_ = np.array([
+            [0.5, 0.3, 0.05, 0.05, 0.05, 0.05],
+            [0.05, 0.05, 0.2, 0.05, 0.05, 0.6]])
+
+    def test_attributes(self):
+        with pytest.raises(ValueError):
+            self.h.emission_floor_ = np.array([0.05])
+            self.h._check()
+
+        with pytest.raises(ValueError):
+            self.h.emission_symbols_ = np.array([[0], [5]])
+            self.h._check()
+
+    def test_score_samples(self):
+        X = np.arange(self.n_features)[:, None].repeat(3, axis=0)
+        ll, posteriors = self.h.score_samples(X)
+        dense_ll, dense_posteriors = self.dense.score_samples(X)
+        assert np.allclose(ll, dense_ll)
+        assert np.allclose(posteriors, dense_posteriors)
+
+        self.h.emissionprob_[0] = [0.7, 0.1]
+        self.dense.emissionprob_[0, :2] = [0.7, 0.1]
+        assert np.allclose(self.h.score(X), self.dense.score(X))
+
+    def test_squarem_symbols_change(self):
+        # Iterates slowing down along a line, extrapolated with a step of
+        # -2 to p0 + 4 (p1 - p0) + 4 (p2 - 2 p1 + p0).
+        iterates = [copy.deepcopy(self.h) for _ in range(3)]
+        for h, transmat, emissionprob in zip(
+                iterates, [0.7, 0.68, 0.67], [0.5, 0.52, 0.53]):
+            h.transmat_ = np.array([[transmat, 1 - transmat], [0.4, 0.6]])
+            h.emissionprob_ = np.array([[emissionprob, 0.8 - emissionprob],
+                                        [0.6, 0.2]])
+        params = [h._get_fitted_params() for h in iterates]
+        h = iterates[2]
+        assert h._squarem_extrapolate(*params)
+        assert np.allclose(h.transmat_, [[0.66, 0.34], [0.4, 0.6]])
+        assert np.allclose(h.emissionprob_, [[0.54, 0.26], [0.6, 0.2]])
+
+        # The kept probabilities of the first state are of different
+        # symbols, so the emissions stay those of the last iterate.
+        h = iterates[2] = copy.deepcopy(iterates[1])
+        h.transmat_ = np.array([[0.67, 0.33], [0.4, 0.6]])
+        h.emission_symbols_ = np.array([[0, 3], [5, 2]])
+        h.emissionprob_ = np.array([[0.53, 0.27], [0.6, 0.2]])
+        params[2] = h._get_fitted_params()
+        assert h._squarem_extrapolate(*params)
+        assert np.allclose(h.transmat_, [[0.66, 0.34], [0.4, 0.6]])
+        assert np.array_equal(h.emission_symbols_, [[0, 3], [5, 2]])
+        assert np.array_equal(h.emissionprob_, [[0.53, 0.27], [0.6, 0.2]])
+        assert np.array_equal(h.emission_floor_, [0.05, 0.05])
+        h._check()
+
+    def test_sample(self, n_samples=10000):
+        X, state_sequence = self.h.sample(n_samples, random_state=0)
+        for state in range(self.n_components):
+            frequencies = np.bincount(X[state_sequence == state, 0],
+                                      minlength=self.n_features)
+            assert np.allclose(frequencies / frequencies.sum(),
+                               self.dense.emissionprob_[state], atol=0.02)
+
+    def test_fit(self, n_iter=5):
+        lengths = np.array([10] * 10)
+        X, _state_sequence = self.dense.sample(lengths.sum(), random_state=0)
+
+        h = hmm.MultinomialHMM(self.n_components, n_top_symbols=2,
+                               random_state=0)
+        h._init(X, lengths=lengths)
+        assert log_likelihood_increasing(h, X, lengths, n_iter)
+        assert h.emissionprob_.shape == (self.n_components, 2)
+        assert np.allclose(
+            h.emissionprob_.sum(axis=1)
+            + h.emission_floor_ * (self.n_features - 2), 1)
+
+        # Keeping every symbol is equivalent to dense emissions.
+        h = hmm.MultinomialHMM(self.n_components, n_top_symbols=10,
+                               init_params="", n_iter=1)
+        h.n_features = self.n_features
+        h.startprob_ = self.dense.startprob_
+        h.transmat_ = self.dense.transmat_
+        h.emission_symbols_ = np.tile(np.arange(self.n_features),
+                                      (self.n_components, 1))
+        h.emissionprob_ = self.dense.emissionprob_.copy()
+        h.emission_floor_ = np.zeros(self.n_components)
+        self.dense.init_params = ""
+        self.dense.n_iter = 1
+        h.fit(X, lengths)
+        self.dense.fit(X, lengths)
+        order = np.argsort(h.emission_symbols_, axis=1)
+        assert np.allclose(np.take_along_axis(h.emissionprob_, order, 1),
+                           self.dense.emissionprob_)
+
+
+class TestMultiStreamMultinomialHMM(object):
+    def setup_method(self, method):
+        self.n_components = 2
+        self.n_features = np.array([2, 3])
+        self.h = hmm.MultiStreamMultinomialHMM(self.n_components)
+        self.h.n_features = self.n_features
+        self.h.startprob_ = np.array([0.6, 0.4])
+        self.h.transmat_ = np.array([[0.7, 0.3], [0.4, 0.6]])
+        self.h.emissionprob_ = np.array([[0.2, 0.8, 0.1, 0.4, 0.5],
+                                         [0.7, 0.3, 0.6, 0.3, 0.1]])
+
+    def test_attributes(self):
+        with pytest.raises(ValueError):
+            self.h.emissionprob_ = np.zeros((self.n_components, 6))
+            self.h._check()
+
+        with pytest.raises(ValueError):
+            self.h.n_features = np.array([2, 0, 3])
+            self.h._check()
+
+    def test_score_samples(self):
+        # Equivalent to a single stream over the product of the symbols.
+        product = hmm.MultinomialHMM(self.n_components)
+        product.startprob_ = self.h.startprob_
+        product.transmat_ = self.h.transmat_
+        product.emissionprob_ = np.array([
+            np.outer(row[:2], row[2:]).ravel()
+            for row in self.h.emissionprob_])
+
+        X, _state_sequence = self.h.sample(50, random_state=0)
+        assert X.shape == (50, 2)
+        ll, posteriors = self.h.score_samples(X)
+        product_ll, product_posteriors = product.score_samples(
+            X[:, :1] * 3 + X[:, 1:])
+        assert ll == pytest.approx(product_ll)
+        assert np.allclose(posteriors, product_posteriors)
+
+        with pytest.raises(ValueError):
+            self.h.score(X + 1)
+        with pytest.raises(ValueError):
+            self.h.score(X[:, :1])
+
+    def test_fit(self, params='ste', n_iter=5):
+        lengths = np.array([10] * 10)
+        X, _state_sequence = self.h.sample(lengths.sum(), random_state=0)
+
+        h = hmm.MultiStreamMultinomialHMM(self.n_components, params=params,
+                                          random_state=0)
+        h._init(X, lengths=lengths)
+        assert np.array_equal(h.n_features, self.n_features)
+        assert log_likelihood_increasing(h, X, lengths, n_iter)
+        assert np.allclose(h.emissionprob_[:, :2].sum(axis=1), 1)
+        assert np.allclose(h.emissionprob_[:, 2:].sum(axis=1), 1)
+
+    def test_fit_emissionprob(self):
+        self.test_fit('e')
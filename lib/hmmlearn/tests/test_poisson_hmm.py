@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from scipy.special import gammaln
+
+from hmmlearn import hmm
+from hmmlearn.base import _BaseHMM
+from hmmlearn.stats import (_sum_log_factorial,
+                            log_multivariate_poisson_density)
+
+from . import log_likelihood_increasing
+
+
+def test_sum_log_factorial():
+    counts = np.random.RandomState(0).poisson(5, size=(20, 3))
+    for X in [counts, counts.astype(float), counts + 0.5, counts * 1000]:
+        assert np.allclose(_sum_log_factorial(X),
+                           np.sum(gammaln(X + 1), axis=1))
+
+
+class TestPoissonHMM(object):
+    def setup_method(self, method):
+        self.n_components = 2
+        self.h = hmm.PoissonHMM(self.n_components)
+        self.h.startprob_ = np.array([0.6, 0.4])
+        self.h.transmat_ = np.array([[0.7, 0.3], [0.4, 0.6]])
+        self.h.means_ = np.array([[1., 10., 3.], [6., 2., 0.5]])
+
+    def test_score_samples(self):
+        X, _state_sequence = self.h.sample(100, random_state=0)
+        framelogprob = self.h._compute_log_likelihood(X)
+        expected = (np.dot(X, np.log(self.h.means_).T)
+                    - self.h.means_.sum(axis=1)
+                    - np.sum(gammaln(X + 1), axis=1)[:, None])
+        assert np.allclose(framelogprob, expected)
+        assert np.allclose(
+            log_multivariate_poisson_density(X, self.h.means_), expected)
+        assert self.h.freeze().score(X) == pytest.approx(self.h.score(X))
+
+    def test_fit(self, n_iter=5):
+        lengths = np.array([10] * 10)
+        X, _state_sequence = self.h.sample(lengths.sum(), random_state=0)
+        h = hmm.PoissonHMM(self.n_components, random_state=0)
+        h._init(X, lengths=lengths)
+        assert log_likelihood_increasing(h, X, lengths, n_iter)
+        assert "_log_factorials" not in vars(h)
+
+    def test_fit_viterbi_unvisited_state(self):
+        X, _state_sequence = self.h.sample(100, random_state=0)
+        h = hmm.PoissonHMM(3, init_params="st", n_iter=5)
+        h.means_ = np.vstack([self.h.means_, [100., 100., 100.]])
+        h.fit(X, algorithm="viterbi")
+        assert np.allclose(h.means_[2], 100)
+        assert h.transmat_.sum(axis=1) == pytest.approx(1)
+        assert np.isfinite(h.score(X))
+
+    def test_fit_log_factorial_cache(self, monkeypatch):
+        lengths = np.array([10] * 10)
+        X, _state_sequence = self.h.sample(lengths.sum(), random_state=0)
+        X_valid, _state_sequence = self.h.sample(30, random_state=1)
+        X_other, _state_sequence = self.h.sample(30, random_state=2)
+        checks = []
+
+        def callback(*args):
+            # Arrays created during the fit, possibly at the address of a
+            # freed one, get their own log-factorial term.
+            obs = X_other.copy()
+            checks.append(np.allclose(
+                h._compute_log_likelihood(obs),
+                log_multivariate_poisson_density(obs, h.means_)))
+
+        h = hmm.PoissonHMM(self.n_components, random_state=0, tol=-np.inf,
+                           callback=callback)
+        sources, hits = [], []
+        monkeypatch.setattr(hmm, "_sum_log_factorial",
+                            lambda X: sources.append(X)
+                            or _sum_log_factorial(X))
+        monkeypatch.setattr(
+            hmm, "log_multivariate_poisson_density",
+            lambda X, means, log_factorial=None:
+            hits.append(log_factorial is not None)
+            or log_multivariate_poisson_density(X, means, log_factorial))
+        h.fit(X, lengths, X_valid=X_valid)
+        # The terms of the training and validation samples are computed
+        # once, and looked up for each of their sequences.
+        assert len(sources) == 2
+        assert sum(hits) >= h.n_iter * (len(lengths) + 1)
+        assert len(checks) == h.n_iter and all(checks)
+
+        monkeypatch.setattr(hmm.PoissonHMM, "_fit_em", _BaseHMM._fit_em)
+        uncached = hmm.PoissonHMM(self.n_components, random_state=0,
+                                  tol=-np.inf)
+        uncached.fit(X, lengths, X_valid=X_valid)
+        assert np.allclose(h.means_, uncached.means_)
+        assert np.allclose(h.valid_history_, uncached.valid_history_)
+
+    @pytest.mark.parametrize("kwargs", [{}, {"batch_size": 4},
+                                        {"cache_size": 2}])
+    def test_sparse(self, kwargs):
+        lengths = np.array([10] * 10)
+        X, _state_sequence = self.h.sample(lengths.sum(), random_state=0)
+        X_sparse = sparse.csr_matrix(X)
+        self.h.set_params(**kwargs)
+        assert np.allclose(_sum_log_factorial(X_sparse),
+                           _sum_log_factorial(X))
+        assert self.h.score(X_sparse, lengths) \
+            == pytest.approx(self.h.score(X, lengths))
+        assert np.array_equal(self.h.predict(X_sparse, lengths),
+                              self.h.predict(X, lengths))
+        for algorithm in ["viterbi", "map"]:
+            logprob, state_sequence = self.h.decode(
+                X_sparse, lengths, algorithm=algorithm)
+            expected_logprob, expected = self.h.decode(
+                X, lengths, algorithm=algorithm)
+            assert logprob == pytest.approx(expected_logprob)
+            assert np.array_equal(state_sequence, expected)
+        map_h = hmm.PoissonHMM(self.n_components, algorithm="map")
+        map_h.set_params(**kwargs)
+        map_h.startprob_ = self.h.startprob_
+        map_h.transmat_ = self.h.transmat_
+        map_h.means_ = self.h.means_
+        assert np.array_equal(map_h.predict(X_sparse, lengths),
+                              map_h.predict(X, lengths))
+        assert np.array_equal(map_h.predict(X_sparse[:10]),
+                              map_h.predict(X[:10]))
+        frozen = self.h.freeze()
+        assert frozen.score(X_sparse, lengths) \
+            == pytest.approx(frozen.score(X, lengths))
+        assert np.array_equal(
+            frozen.decode(X_sparse, lengths, algorithm="map")[1],
+            frozen.decode(X, lengths, algorithm="map")[1])
+
+        h = hmm.PoissonHMM(self.n_components, random_state=0, **kwargs)
+        h.fit(X, lengths)
+        h_sparse = hmm.PoissonHMM(self.n_components, random_state=0,
+                                  **kwargs)
+        h_sparse.fit(X_sparse.tocsc(), lengths)
+        assert np.allclose(h_sparse.means_, h.means_)
+        assert np.allclose(h_sparse.transmat_, h.transmat_)
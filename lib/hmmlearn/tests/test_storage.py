@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from hmmlearn import hmm, storage
+from hmmlearn.utils import Vocabulary
+
+
+@pytest.mark.parametrize("covariance_type",
+                         ["spherical", "diag", "full", "tied"])
+def test_save_load_gaussian(tmpdir, covariance_type):
+    X = np.random.RandomState(0).randn(100, 3)
+    h = hmm.GaussianHMM(3, covariance_type, n_iter=5, random_state=0,
+                        startprob_prior=np.full(3, 2.))
+    h.fit(X)
+    filename = str(tmpdir.join("model.hmm"))
+    storage.save(h, filename)
+
+    for mmap_mode in ["r", "c", None]:
+        loaded = storage.load(filename, mmap_mode=mmap_mode)
+        assert type(loaded) is hmm.GaussianHMM
+        assert loaded.covariance_type == covariance_type
+        assert np.array_equal(loaded.startprob_prior, h.startprob_prior)
+        for name in ["startprob_", "transmat_", "means_", "_covars_"]:
+            assert np.array_equal(getattr(loaded, name), getattr(h, name))
+            if mmap_mode is not None:
+                address = getattr(loaded, name).ctypes.data
+                assert address % storage.ALIGNMENT == 0
+        assert loaded.transmat_.flags.writeable == (mmap_mode != "r")
+        assert loaded.score(X) == pytest.approx(h.score(X))
+
+
+def test_save_load_multinomial(tmpdir):
+    X = np.random.RandomState(0).randint(3, size=(100, 1))
+    h = hmm.MultinomialHMM(2, n_iter=5, random_state=0)
+    h.fit(X)
+    filename = str(tmpdir.join("model.hmm"))
+    storage.save(h, filename)
+
+    loaded = storage.load(filename)
+    assert loaded.n_features == h.n_features
+    assert np.array_equal(loaded.emissionprob_, h.emissionprob_)
+    assert np.array_equal(loaded.predict(X), h.predict(X))
+
+    # A read-only model can still be refitted.
+    loaded.set_params(init_params="")
+    loaded.fit(X)
+
+
+def test_save_load_vocabulary(tmpdir):
+    vocab = Vocabulary(["a", "b", "c"])
+    X = vocab.decode(np.random.RandomState(0).randint(3, size=(100, 1)))
+    h = hmm.MultinomialHMM(2, n_iter=5, random_state=0, vocabulary=vocab)
+    h.fit(X)
+    filename = str(tmpdir.join("model.hmm"))
+    storage.save(h, filename)
+
+    loaded = storage.load(filename)
+    np.testing.assert_equal(loaded.vocabulary, vocab.symbols)
+    assert loaded.score(X) == pytest.approx(h.score(X))
+
+
+def _marks(random_state, n_samples):
+    # Two clusters of 2D marks, a few per sample.
+    X = np.empty(n_samples, dtype=object)
+    for t in range(n_samples):
+        X[t] = (random_state.randn(random_state.poisson(3), 2)
+                + random_state.choice([-3, 3]))
+    return X
+
+
+def test_save_load_marked_poisson(tmpdir):
+    rs = np.random.RandomState(0)
+    X = _marks(rs, 40)
+    h = hmm.MarkedPoissonHMM(2, n_clusters=2, random_state=0)
+    h._init(X)
+    filename = str(tmpdir.join("model.hmm"))
+    storage.save(h, filename)
+
+    loaded = storage.load(filename)
+    assert np.array_equal(loaded.rate_, h.rate_)
+    assert np.array_equal(loaded.cluster_means, h.cluster_means)
+    assert np.array_equal(loaded.cluster_covars, h.cluster_covars)
+    flattened = np.concatenate(list(X))
+    assert np.array_equal(loaded._gmm.predict(flattened),
+                          h._gmm.predict(flattened))
+
+
+def test_save_load_multiprobe_marked_poisson(tmpdir):
+    rs = np.random.RandomState(0)
+    X = np.empty((40, 2), dtype=object)
+    for probe in range(2):
+        X[:, probe] = _marks(rs, 40)
+    h = hmm.MultiprobeMarkedPoissonHMM(2, n_clusters=[2, 2], random_state=0)
+    h._init(X)
+    filename = str(tmpdir.join("model.hmm"))
+    storage.save(h, filename)
+
+    loaded = storage.load(filename)
+    assert loaded.n_clusters == [2, 2]
+    assert np.array_equal(loaded.rate_, h.rate_)
+    for probe in range(2):
+        assert np.array_equal(loaded.cluster_means[probe],
+                              h.cluster_means[probe])
+        flattened = np.concatenate(list(X[:, probe]))
+        assert np.array_equal(loaded._gmm[probe].predict(flattened),
+                              h._gmm[probe].predict(flattened))
+
+
+def test_load_invalid(tmpdir):
+    filename = str(tmpdir.join("model.hmm"))
+    with open(filename, "wb") as fh:
+        fh.write(b"not a model file")
+    with pytest.raises(ValueError):
+        storage.load(filename)
@@ -1,6 +1,9 @@
 import numpy as np
 
-from hmmlearn.utils import normalize, fill_covars
+import pytest
+
+from hmmlearn.utils import (normalize, fill_covars, iter_from_X_lengths,
+                           Sequences, Vocabulary)
 
 
 def test_normalize():
@@ -42,3 +45,47 @@ def test_fill_covars():
                          [[3, 0], [0, 3]]])
     np.testing.assert_equal(
         fill_covars(spherical, 'spherical', 3, 2), expected)
+
+
+def test_sequences():
+    seqs = Sequences.from_list([np.zeros((3, 2)), np.ones((1, 2)),
+                                np.full((4, 2), 2.)])
+    assert len(seqs) == 3
+    assert seqs.n_samples == 8
+    assert seqs.offsets.dtype == np.int64
+    np.testing.assert_equal(seqs.offsets, [0, 3, 4, 8])
+    np.testing.assert_equal(seqs.lengths, [3, 1, 4])
+    np.testing.assert_equal(seqs.length_order, [2, 0, 1])
+    assert np.asarray(seqs).shape == (8, 2)
+    assert (seqs[-1] == 2.).all()
+    assert np.shares_memory(seqs[0], seqs.data)
+    assert list(iter_from_X_lengths(seqs.data, seqs)) \
+        == list(iter_from_X_lengths(seqs.data, seqs.lengths))
+
+    tail = seqs[1:]
+    assert np.shares_memory(tail.data, seqs.data)
+    np.testing.assert_equal(tail.offsets, [0, 1, 5])
+    assert all((a == b).all() for a, b in zip(tail, seqs[1:3]))
+
+    with pytest.raises(ValueError):
+        Sequences(np.zeros(5), [2, 2])
+    with pytest.raises(ValueError):
+        list(iter_from_X_lengths(np.zeros(5), seqs))
+
+
+def test_vocabulary():
+    vocab = Vocabulary(["dog", "cat", "emu", "cat"])
+    assert len(vocab) == 3
+    np.testing.assert_equal(vocab.symbols, ["cat", "dog", "emu"])
+    ids = vocab.encode([["emu"], ["cat"], ["emu"]])
+    np.testing.assert_equal(ids, [[2], [0], [2]])
+    np.testing.assert_equal(vocab.decode(ids), [["emu"], ["cat"], ["emu"]])
+    with pytest.raises(ValueError):
+        vocab.encode(["cat", "cow"])
+
+    vocab = Vocabulary([1000, -3, 7])
+    np.testing.assert_equal(vocab.encode([7, 1000, -3]), [1, 2, 0])
+    with pytest.raises(ValueError):
+        vocab.encode([1001])
+    with pytest.raises(ValueError):
+        Vocabulary([])
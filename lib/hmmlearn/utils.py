@@ -48,11 +48,280 @@ def log_normalize(a, axis=None):
     a -= a_lse[:, np.newaxis]
 
 
+class Sequences(object):
+    """A collection of variable length sequences stored contiguously.
+
+    The samples of all sequences are kept in a single ``data`` buffer and
+    the boundaries of the sequences in an ``int64`` array of ``offsets``,
+    so that sequence ``k`` is ``data[offsets[k]:offsets[k + 1]]``. The
+    offsets, lengths and length ordering are computed once and shared by
+    every method receiving the collection.
+
+    :class:`Sequences` can be passed as ``X`` wherever a model accepts
+    ``X`` and ``lengths``; ``lengths`` must then be omitted.
+
+    Parameters
+    ----------
+    data : array-like, shape (n_samples, ...)
+        Concatenated samples of all sequences.
+
+    lengths : array-like of integers, shape (n_sequences, ), optional
+        Lengths of the individual sequences in ``data``. The sum of
+        these should be ``n_samples``. Defaults to a single sequence.
+
+    vocabulary : Vocabulary, optional
+        Vocabulary whose ids make up ``data``, if the samples are already
+        encoded. A model with the same vocabulary then uses them as they
+        are. Defaults to ``None``, i.e. samples are not encoded.
+
+    Attributes
+    ----------
+    data : array, shape (n_samples, ...)
+        Concatenated samples of all sequences.
+
+    offsets : array, shape (n_sequences + 1, )
+        Start of each sequence in ``data``, followed by ``n_samples``.
+
+    vocabulary : Vocabulary or None
+        Vocabulary whose ids make up ``data``, if any.
+
+    Examples
+    --------
+    >>> seqs = Sequences.from_list([np.zeros((3, 2)), np.ones((5, 2))])
+    >>> len(seqs), seqs.n_samples
+    (2, 8)
+    >>> seqs.lengths
+    array([3, 5])
+    >>> seqs[1].shape
+    (5, 2)
+    """
+
+    def __init__(self, data, lengths=None, vocabulary=None):
+        if not isinstance(data, np.ndarray):
+            data = np.asarray(data)
+        n_samples = len(data)
+        if lengths is None:
+            lengths = [n_samples]
+        lengths = np.asarray(lengths, dtype=np.int64)
+        if lengths.ndim != 1 or (lengths < 0).any():
+            raise ValueError("lengths must be a 1D array of non-negative "
+                             "integers")
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        if offsets[-1] != n_samples:
+            raise ValueError("lengths sum to {:d}, but data has {:d} samples"
+                             .format(offsets[-1], n_samples))
+        self.data = data
+        self.offsets = offsets
+        self.vocabulary = vocabulary
+        self._length_order = None
+
+    @classmethod
+    def from_list(cls, sequences):
+        """Concatenates a list of sequences into a :class:`Sequences`.
+
+        Parameters
+        ----------
+        sequences : list of array-like
+            Individual sequences, each of shape (n_samples_k, ...).
+
+        Returns
+        -------
+        seqs : Sequences
+            The concatenated sequences.
+        """
+        sequences = [np.asarray(seq) for seq in sequences]
+        if not sequences:
+            raise ValueError("expected at least one sequence")
+        return cls(np.concatenate(sequences), [len(seq) for seq in sequences])
+
+    @property
+    def lengths(self):
+        """Lengths of the individual sequences."""
+        return np.diff(self.offsets)
+
+    @property
+    def n_samples(self):
+        """Total number of samples in all sequences."""
+        return int(self.offsets[-1])
+
+    @property
+    def length_order(self):
+        """Indices of the sequences sorted by decreasing length.
+
+        Sequences of equal length keep their original order.
+        """
+        if self._length_order is None:
+            self._length_order = np.argsort(-self.lengths, kind="stable")
+        return self._length_order
+
+    def bounds(self):
+        """Iterates over the ``(start, end)`` indices of the sequences."""
+        return zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist())
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for i, j in self.bounds():
+            yield self.data[i:j]
+
+    def __getitem__(self, key):
+        """Returns a sequence or, for a slice, a :class:`Sequences` view.
+
+        Neither copies ``data``.
+        """
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("Sequences only support contiguous slices")
+            stop = max(start, stop)
+            seqs = Sequences.__new__(Sequences)
+            seqs.data = self.data[self.offsets[start]:self.offsets[stop]]
+            seqs.offsets = self.offsets[start:stop + 1] - self.offsets[start]
+            seqs.vocabulary = self.vocabulary
+            seqs._length_order = None
+            return seqs
+        k = range(len(self))[key]
+        return self.data[self.offsets[k]:self.offsets[k + 1]]
+
+    def __array__(self, dtype=None):
+        return np.asarray(self.data, dtype=dtype)
+
+    def __repr__(self):
+        return "{}(n_sequences={:d}, n_samples={:d})".format(
+            self.__class__.__name__, len(self), self.n_samples)
+
+
+class Vocabulary(object):
+    """An index mapping discrete symbols to dense integer ids.
+
+    The distinct symbols are kept sorted, so that encoding samples is a
+    vectorized binary search rather than a dictionary lookup per sample.
+
+    A :class:`~hmmlearn.hmm.MultinomialHMM` given a vocabulary accepts
+    samples of the original symbols, e.g. strings, and no longer scans
+    its input for the number of symbols. Samples used repeatedly can be
+    encoded once with :meth:`encode_sequences`.
+
+    Parameters
+    ----------
+    symbols : array-like, shape (n_symbols, )
+        Symbols of the vocabulary, in any order. Duplicates are ignored.
+
+    Attributes
+    ----------
+    symbols : array, shape (n_symbols, )
+        Distinct symbols in sorted order; ``symbols[i]`` has id ``i``.
+
+    Examples
+    --------
+    >>> vocab = Vocabulary(["b", "a", "c", "a"])
+    >>> len(vocab)
+    3
+    >>> vocab.encode([["c"], ["a"]])
+    array([[2],
+           [0]])
+    >>> vocab.decode([1, 2])
+    array(['b', 'c'], dtype='<U1')
+    """
+
+    def __init__(self, symbols):
+        symbols = np.asarray(symbols)
+        if symbols.ndim != 1 or not len(symbols):
+            raise ValueError("symbols must be a non-empty 1D array")
+        if not (symbols[1:] > symbols[:-1]).all():
+            symbols = np.unique(symbols)
+        self.symbols = symbols
+
+    def encode(self, X):
+        """Maps symbols to their ids.
+
+        Parameters
+        ----------
+        X : array-like
+            Symbols of the vocabulary.
+
+        Returns
+        -------
+        ids : array of integers
+            Ids of the symbols, with the same shape as ``X``.
+
+        Raises
+        ------
+        ValueError
+            If ``X`` contains symbols missing from the vocabulary.
+        """
+        X = np.asarray(X)
+        ids = np.searchsorted(self.symbols, X)
+        unknown = self.symbols[np.minimum(ids, len(self) - 1)] != X
+        if unknown.any():
+            raise ValueError("symbols {} are not in the vocabulary"
+                             .format(np.unique(X[unknown])[:5].tolist()))
+        return ids
+
+    def encode_sequences(self, X, lengths=None):
+        """Maps symbols to their ids, marking the result as encoded.
+
+        Models with this vocabulary take the ids as they are, rather than
+        encoding them again, or mistaking them for symbols of an integer
+        vocabulary.
+
+        Parameters
+        ----------
+        X : array-like or Sequences
+            Symbols of the vocabulary.
+
+        lengths : array-like of integers, shape (n_sequences, ), optional
+            Lengths of the individual sequences in ``X``. Must be omitted
+            if ``X`` is a :class:`Sequences`.
+
+        Returns
+        -------
+        seqs : Sequences
+            Ids of the symbols, encoded with this vocabulary.
+        """
+        if isinstance(X, Sequences):
+            if lengths is not None:
+                raise ValueError(
+                    "lengths must be None when X is a Sequences")
+            X, lengths = X.data, X.lengths
+        return Sequences(self.encode(X), lengths, vocabulary=self)
+
+    def decode(self, ids):
+        """Maps ids back to their symbols.
+
+        Parameters
+        ----------
+        ids : array-like of integers
+            Ids of symbols of the vocabulary.
+
+        Returns
+        -------
+        X : array
+            Symbols with the given ids, with the same shape as ``ids``.
+        """
+        return self.symbols[np.asarray(ids)]
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __repr__(self):
+        return "{}(n_symbols={:d})".format(self.__class__.__name__, len(self))
+
+
 def iter_from_X_lengths(X, lengths):
-    if lengths is None:
-        yield 0, len(X)
+    # The length of sparse matrices is ambiguous.
+    n_samples = X.shape[0]
+    if isinstance(lengths, Sequences):
+        if lengths.n_samples != n_samples:
+            raise ValueError("Sequences hold {:d} samples, X has {:d}"
+                             .format(lengths.n_samples, n_samples))
+        for i, j in lengths.bounds():
+            yield i, j
+    elif lengths is None:
+        yield 0, n_samples
     else:
-        n_samples = X.shape[0]
         end = np.cumsum(lengths).astype(np.int32)
         start = end - lengths
         if end[-1] > n_samples: